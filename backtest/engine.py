@@ -0,0 +1,104 @@
+import numpy as np
+
+from strategies.indicators import rsi_series, sma_series
+
+
+def position_state(entry, exit):
+    """
+    由买入 / 卖出条件得到每根 K 线结束时是否持仓（同一时间最多一笔持仓）。
+    买入条件记为 1、卖出条件记为 0，向前填充后就是持仓状态：
+    持仓中再出现买入、空仓时再出现卖出都不会改变状态，与逐行循环完全一致。
+    """
+    entry = np.asarray(entry, dtype=bool)
+    exit = np.asarray(exit, dtype=bool)
+    if (entry & exit).any():
+        # 买卖阈值重叠时同一根 K 线可能既买又卖，状态依赖上一根，只能逐个事件处理
+        return _position_state_loop(entry, exit)
+
+    n = len(entry)
+    has_event = entry | exit
+    # 每根 K 线对应的最近一次事件下标（-1 表示之前没有事件）
+    last_event = np.where(has_event, np.arange(n), -1)
+    np.maximum.accumulate(last_event, out=last_event)
+    return np.where(last_event >= 0, entry[np.maximum(last_event, 0)], False)
+
+
+def _position_state_loop(entry, exit):
+    state = np.zeros(len(entry), dtype=bool)
+    position = False
+    last = 0
+    for i in np.flatnonzero(entry | exit):
+        state[last:i] = position
+        if not position and entry[i]:
+            position = True
+        elif position and exit[i]:
+            position = False
+        last = i
+    state[last:] = position
+    return state
+
+
+def simulate(entry, exit):
+    """返回 (持仓状态, 买入下标, 卖出下标)"""
+    state = position_state(entry, exit)
+    prev = np.concatenate([[False], state[:-1]])
+    buy_idx = np.flatnonzero(state & ~prev)
+    sell_idx = np.flatnonzero(~state & prev)
+    return state, buy_idx, sell_idx
+
+
+def trade_stats(buy_prices, sell_prices):
+    """胜率与收益统计；最后一笔未平仓的买入不计入"""
+    buy_prices = np.asarray(buy_prices, dtype="float64")
+    sell_prices = np.asarray(sell_prices, dtype="float64")
+    n = min(len(buy_prices), len(sell_prices))
+    profits = sell_prices[:n] - buy_prices[:n]
+
+    total_trades = int(n)
+    win_trades = int((profits > 0).sum())
+    total_profit = float(profits.sum())
+    equity = np.cumsum(profits)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    return {
+        "profits": profits,
+        "total_trades": total_trades,
+        "win_trades": win_trades,
+        "win_rate": win_trades / total_trades if total_trades > 0 else 0,
+        "total_profit": total_profit,
+        "avg_profit": total_profit / total_trades if total_trades > 0 else 0,
+        "max_drawdown": float(drawdown.max()) if n else 0.0,
+    }
+
+
+def rsi_signals(closes, rsi, sma, rsi_buy_thresh=30, rsi_sell_thresh=70):
+    """RSI 超卖买入、超买卖出；SMA / RSI 还没有值的 K 线跳过"""
+    valid = ~(np.isnan(sma) | np.isnan(rsi))
+    entry = valid & (rsi < rsi_buy_thresh)
+    exit = valid & (rsi > rsi_sell_thresh)
+    return entry, exit
+
+
+def run_rsi_backtest(df, rsi_buy_thresh=30, rsi_sell_thresh=70, sma_window=20, rsi_window=14):
+    """
+    对单个标的的 K 线做向量化回测（逻辑与 backtest_and_plot 原来的逐行循环一致）。
+    df 需要有 close 列，会就地加上 sma / rsi 列。
+    """
+    df["sma"] = sma_series(df["close"], window=sma_window).to_numpy()
+    df["rsi"] = rsi_series(df["close"], window=rsi_window).to_numpy()
+
+    closes = df["close"].to_numpy(dtype="float64")
+    entry, exit = rsi_signals(
+        closes, df["rsi"].to_numpy(), df["sma"].to_numpy(), rsi_buy_thresh, rsi_sell_thresh
+    )
+    state, buy_idx, sell_idx = simulate(entry, exit)
+
+    times = df["timestamp"].to_numpy() if "timestamp" in df.columns else df.index.to_numpy()
+    result = trade_stats(closes[buy_idx], closes[sell_idx])
+    result.update({
+        "position": state,
+        "buy_dates": list(times[buy_idx]),
+        "buy_prices": list(closes[buy_idx]),
+        "sell_dates": list(times[sell_idx]),
+        "sell_prices": list(closes[sell_idx]),
+    })
+    return result
@@ -1,31 +1,31 @@
-import os
 import matplotlib
-import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from datetime import datetime, timedelta
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
-import ta
 
+from backtest.engine import run_rsi_backtest
 from config import API_KEY, API_SECRET
 matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei']  # 设置为微软雅黑等支持中文的字体
 matplotlib.rcParams['axes.unicode_minus'] = False
 client = StockHistoricalDataClient(API_KEY, API_SECRET)
 
-def backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=30, rsi_sell_thresh=70):
-    # 1. 获取历史数据
-    end = datetime.now()
-    start = end - timedelta(days=days)
+def backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=30, rsi_sell_thresh=70, bars=None, plot=True, timeframe=TimeFrame.Day):
+    # 1. 获取历史数据（传入 bars 时直接复用 BarProvider 的切片，不再请求 API）
+    if bars is None:
+        end = datetime.now()
+        start = end - timedelta(days=days)
 
-    request = StockBarsRequest(
-        symbol_or_symbols=symbol,
-        timeframe=TimeFrame.Day,
-        start=start,
-        end=end,
-    )
+        request = StockBarsRequest(
+            symbol_or_symbols=symbol,
+            timeframe=timeframe,
+            start=start,
+            end=end,
+        )
 
-    bars = client.get_stock_bars(request).df
+        bars = client.get_stock_bars(request).df
 
     if bars.empty:
         print("❌ 没有拿到历史数据")
@@ -34,69 +34,34 @@ def backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=30, r
     df = bars[bars.index.get_level_values(0) == symbol].copy()
     df.reset_index(inplace=True)
 
-    df["sma"] = df["close"].rolling(window=20).mean()
-    df["rsi"] = ta.momentum.RSIIndicator(df["close"], window=14).rsi()
-
-    # 2. 回测逻辑（与 HybridStrategy 一致）
-    position = False
-    buy_dates, sell_dates = [], []
-    buy_prices, sell_prices = [], []
-
-    for i in range(len(df)):
-        price = df.loc[i, "close"]
-        sma = df.loc[i, "sma"]
-        rsi = df.loc[i, "rsi"]
-
-        if pd.isna(sma) or pd.isna(rsi):
-            continue
-        print(f"{df.loc[i, 'timestamp']}: price={price:.2f}, sma={sma:.2f}, rsi={rsi:.2f}")
-        # 买入逻辑不变（RSI 超卖）
-        if not position and rsi < rsi_buy_thresh:
-            position = True
-            buy_dates.append(df.loc[i, "timestamp"])
-            buy_prices.append(price)
-
-        # 卖出逻辑放宽，只看 RSI 超买
-        elif position and rsi > rsi_sell_thresh:
-            position = False
-            sell_dates.append(df.loc[i, "timestamp"])
-            sell_prices.append(price)
-
-    #混合策略
-        # if not position and price > sma and rsi < rsi_buy_thresh:
-        #     position = True
-        #     buy_dates.append(df.loc[i, "timestamp"])
-        #     buy_prices.append(price)
-        #
-        # elif position and price < sma and rsi > rsi_sell_thresh:
-        #     position = False
-        #     sell_dates.append(df.loc[i, "timestamp"])
-        #     sell_prices.append(price)
-
-    # === 4. 胜率与收益统计 ===
-    profits = []
-    for buy, sell in zip(buy_prices, sell_prices):
-        profits.append(sell - buy)
-
-    total_trades = len(profits)
-    win_trades = sum(p > 0 for p in profits)
-    win_rate = win_trades / total_trades if total_trades > 0 else 0
-    avg_profit = sum(profits) / total_trades if total_trades > 0 else 0
+    # 2. 向量化回测（与 HybridStrategy 一致：买入看 RSI 超卖，卖出放宽只看 RSI 超买）
+    result = run_rsi_backtest(df, rsi_buy_thresh=rsi_buy_thresh, rsi_sell_thresh=rsi_sell_thresh)
 
     # 输出结果
     print(f"📊 回测指标：")
-    print(f"总交易次数: {total_trades}")
-    print(f"胜率: {win_rate:.2%}")
-    print(f"平均每笔收益: {avg_profit:.2f}")
+    print(f"总交易次数: {result['total_trades']}")
+    print(f"胜率: {result['win_rate']:.2%}")
+    print(f"平均每笔收益: {result['avg_profit']:.2f}")
 
-    # 3. 绘图
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    # 3. 绘图（可选）
+    if plot:
+        filepath = f"{save_dir}/{symbol}_b{rsi_buy_thresh}_s{rsi_sell_thresh}.png"
+        plot_backtest(symbol, df, result, filepath)
+    return result
+
+
+def plot_backtest(symbol, df, result, filepath):
+    """把回测结果画成价格 + RSI 两张子图并保存"""
+    # 不用 pyplot 的全局状态，多个线程同时画图也互不干扰
+    fig = Figure(figsize=(14, 8))
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
 
     # 价格图
     ax1.plot(df["timestamp"], df["close"], label="价格", color="blue")
     ax1.plot(df["timestamp"], df["sma"], label="SMA(20)", linestyle="--", color="gray")
-    ax1.scatter(buy_dates, buy_prices, marker="^", color="green", label="BUY", s=100)
-    ax1.scatter(sell_dates, sell_prices, marker="v", color="red", label="SELL", s=100)
+    ax1.scatter(result["buy_dates"], result["buy_prices"], marker="^", color="green", label="BUY", s=100)
+    ax1.scatter(result["sell_dates"], result["sell_prices"], marker="v", color="red", label="SELL", s=100)
     ax1.set_ylabel("价格")
     ax1.set_title(f"{symbol} 回测图表（Hybrid策略）")
     ax1.legend()
@@ -111,11 +76,9 @@ def backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=30, r
     ax2.legend()
     ax2.grid(True)
 
-    plt.tight_layout()
-    filepath = f"{save_dir}/{symbol}_b{rsi_buy_thresh}_s{rsi_sell_thresh}.png"
-    plt.savefig(filepath)
+    fig.tight_layout()
+    fig.savefig(filepath)
     print(f"📈 图表已保存到：{filepath}")
-    plt.close()
 
     # plt.figure(figsize=(14, 6))
     # plt.plot(df["timestamp"], df["close"], label="价格", color="blue")
@@ -138,10 +101,4 @@ def backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=30, r
     #
     # plt.close()
 
-# if __name__ == "__main__":
-#     SYMBOLS = ["AMD", "META", "NVDA", "SHOP","NFLX","MARA","RIOT"]
-#     for symbol in SYMBOLS:
-#         for buy in [25, 30, 35, 40]:
-#             for sell in [60,65, 70, 75]:
-#                 print(f"\n📊 股票: {symbol} | 回测参数: RSI买入<{buy}, 卖出>{sell}")
-#                 backtest_and_plot(symbol, days=90, save_dir="backtest", rsi_buy_thresh=buy, rsi_sell_thresh=sell)
\ No newline at end of file
+# 参数网格搜索见 backtest/sweep.py（多进程 + 共享内存，只给前 N 名画图）
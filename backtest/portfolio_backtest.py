@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+from broker.portfolio_broker import PortfolioBroker
+from strategies.base_strategy import price_matrix
+from strategies.rsi_strategy import RSIStrategy
+
+# 卖出原因，优先级与 main.check_exit 一致：止损 > 止盈 > 卖出信号 > 当日浮盈止盈
+EXIT_REASONS = {1: "stop_loss", 2: "take_profit", 3: "signal", 4: "intraday_profit"}
+
+TRADE_COLUMNS = ["timestamp", "symbol", "action", "qty", "price", "pnl", "reason"]
+
+
+def run_portfolio_backtest(
+    bars,
+    strategy=None,
+    signals=None,
+    starting_cash=100000.0,
+    qty=1,
+    max_position_size=10,
+    stop_loss_pct=0.03,
+    take_profit_pct=0.05,
+    intraday_threshold=1.0,
+    risk=None,
+    commission=None,
+    slippage=None,
+    max_volume_pct=None,
+    sizer=None,
+):
+    """
+    组合级回测：所有标的共用一份资金，按时间同步推进，风控规则与实盘 main() 相同：
+    - 持仓标的按 止损 > 止盈 > 卖出信号 > 当日浮盈（intraday_threshold %）的顺序检查卖出；
+    - 空仓标的出现 BUY 信号且持仓数未达 max_position_size 时买入 qty 股，入场价记为实际成交价（含滑点）。
+    同一时间点先处理卖出再处理买入（卖出腾出的仓位可以立即使用），
+    多个标的同时买入时按列顺序占用剩余仓位。
+
+    只在时间维度上循环，每一步对所有标的做向量运算；没有持仓也没有买入信号的时间点直接跳过，
+    净值曲线在循环结束后按持仓不变的区间整段计算。
+    strategy: BaseStrategy 子类实例，用它的 generate_signals(bars) 生成信号，默认与实盘相同的 RSIStrategy；
+    signals: 也可以直接传入与 price_matrix(bars) 对齐的 时间 × 标的 信号矩阵（1 / -1 / 0）。
+    risk: 可传入 BasicRiskManager，直接使用它的 max_position_size / stop_loss_pct / take_profit_pct。
+    sizer: 可传入 PositionSizer，买入数量按波动率和当时的净值计算（代替固定的 qty）。
+    """
+    if risk is not None:
+        max_position_size = risk.max_position_size
+        stop_loss_pct = risk.stop_loss_pct
+        take_profit_pct = risk.take_profit_pct
+
+    closes = price_matrix(bars)
+    symbols = list(closes.columns)
+    times = closes.index
+    prices = closes.to_numpy(dtype="float64")
+    if signals is None:
+        strategy = strategy or RSIStrategy()
+        signals = strategy.generate_signals(bars, symbols=symbols)
+    signals = np.asarray(signals)
+    volumes = None
+    if max_volume_pct is not None and "volume" in bars.columns:
+        volumes = price_matrix(bars, "volume", symbols).fillna(0).to_numpy(dtype="float64")
+
+    atr = marks = None
+    if sizer is not None:
+        atr = sizer.volatility(bars).reindex(columns=symbols).to_numpy(dtype="float64")
+        marks = closes.ffill().fillna(0.0).to_numpy(dtype="float64")
+
+    broker = PortfolioBroker(
+        starting_cash, symbols, commission=commission, slippage=slippage, max_volume_pct=max_volume_pct
+    )
+    n_steps, n_symbols = prices.shape
+    valid = ~np.isnan(prices)
+    buy_signal = (signals == 1) & valid
+    has_buy = buy_signal.any(axis=1)
+    entry_price = np.full(n_symbols, np.nan)
+    held = np.zeros(0, dtype=np.int64)
+
+    trades = []
+    # 持仓变化的时间点：(t, 成交后的持仓数量, 成交后的现金)
+    changes = [(0, broker.qty[:n_symbols].copy(), broker.cash)]
+
+    for t in range(n_steps):
+        if not len(held) and not has_buy[t]:
+            continue
+        p = prices[t]
+
+        # ---------- 卖出检查（只看持仓标的） ----------
+        exit_idx = np.zeros(0, dtype=np.int64)
+        exit_reason = np.zeros(0, dtype=np.int8)
+        if len(held):
+            hp = p[held]
+            he = entry_price[held]
+            ok = ~np.isnan(hp)
+            change = (hp - he) / he
+            reason = np.select(
+                [ok & (-change >= stop_loss_pct),
+                 ok & (change >= take_profit_pct),
+                 ok & (signals[t, held] == -1),
+                 ok & (change * 100 >= intraday_threshold)],
+                [1, 2, 3, 4],
+                default=0,
+            )
+            hit = reason > 0
+            exit_idx = held[hit]
+            exit_reason = reason[hit]
+
+        # ---------- 买入：剩余仓位按列顺序分配 ----------
+        buy_idx = np.zeros(0, dtype=np.int64)
+        if has_buy[t]:
+            slots = max_position_size - (len(held) - len(exit_idx))
+            if slots > 0:
+                candidates = buy_signal[t].copy()
+                candidates[held] = False
+                buy_idx = np.flatnonzero(candidates)[:slots]
+
+        buy_qty = np.full(len(buy_idx), float(qty))
+        if sizer is not None and len(buy_idx):
+            # 定仓用卖出之后的持仓市值和现金（同一时间点先卖后买）
+            value = broker.qty[:n_symbols] * marks[t]
+            freed = value[exit_idx].sum()
+            buy_qty = sizer.size_array(
+                p[buy_idx], atr[t, buy_idx], broker.cash + value.sum(), value.sum() - freed, broker.cash + freed
+            )
+            buy_idx, buy_qty = buy_idx[buy_qty > 0], buy_qty[buy_qty > 0].astype("float64")
+
+        if not len(exit_idx) and not len(buy_idx):
+            continue
+
+        idx = np.concatenate([exit_idx, buy_idx])
+        order_qty = np.concatenate([-broker.qty[exit_idx], buy_qty])
+        realized_before = broker.realized[exit_idx].copy()
+        filled = broker.execute(idx, order_qty, p[idx], None if volumes is None else volumes[t, idx])
+        fill_price = broker.slippage(np.sign(order_qty), p[idx])
+
+        n_exit = len(exit_idx)
+        pnl = broker.realized[exit_idx] - realized_before
+        for k in np.flatnonzero(filled != 0):
+            i = idx[k]
+            if k < n_exit:
+                trades.append((times[t], symbols[i], "SELL", -filled[k], fill_price[k], pnl[k], EXIT_REASONS[exit_reason[k]]))
+            else:
+                trades.append((times[t], symbols[i], "BUY", filled[k], fill_price[k], np.nan, "signal"))
+
+        # 部分卖出（受成交量限制）时保留入场价，全部卖出才清除
+        closed = exit_idx[broker.qty[exit_idx] <= 0]
+        entry_price[closed] = np.nan
+        # 入场价记为实际成交价（含滑点），止损 / 止盈和盈亏都按它计算
+        bought = filled[n_exit:] > 0
+        entry_price[buy_idx[bought]] = fill_price[n_exit:][bought]
+        held = np.flatnonzero(broker.qty[:n_symbols] > 0)
+        changes.append((t, broker.qty[:n_symbols].copy(), broker.cash))
+
+    equity = _equity_curve(closes, changes)
+    trades = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+    return _summary(equity, trades, broker, starting_cash)
+
+
+def _equity_curve(closes, changes):
+    """持仓在两次成交之间不变，每段的净值 = 现金 + 价格矩阵 @ 持仓"""
+    marks = closes.ffill().fillna(0.0).to_numpy(dtype="float64")
+    equity = np.empty(len(marks))
+    bounds = [t for t, _, _ in changes[1:]] + [len(marks)]
+    for (start, qty, cash), end in zip(changes, bounds):
+        equity[start:end] = cash + marks[start:end] @ qty
+    return pd.Series(equity, index=closes.index, name="equity")
+
+
+def _summary(equity, trades, broker, starting_cash):
+    sells = trades[trades["action"] == "SELL"]
+    win_trades = int((sells["pnl"] > 0).sum())
+    values = equity.to_numpy()
+    peak = np.maximum.accumulate(values) if len(values) else values
+    drawdown = (peak - values) / peak if len(values) else values
+    return {
+        "equity": equity,
+        "trades": trades,
+        "total_trades": len(sells),
+        "win_trades": win_trades,
+        "win_rate": win_trades / len(sells) if len(sells) else 0,
+        "realized_pnl": broker.realized_pnl(),
+        "total_return": (values[-1] / starting_cash - 1) if len(values) else 0.0,
+        "max_drawdown": float(drawdown.max()) if len(values) else 0.0,
+        "exit_reasons": sells["reason"].value_counts().to_dict(),
+        "positions": {p.symbol: p.qty for p in broker.get_all_positions()},
+        "broker": broker,
+    }
+
+
+if __name__ == "__main__":
+    from alpaca.data.historical import StockHistoricalDataClient
+    from config import API_KEY, API_SECRET
+    from data.bar_provider import BarProvider
+
+    SYMBOLS = ["AMD", "META", "NVDA", "SHOP", "NFLX", "MARA", "RIOT"]
+    provider = BarProvider(StockHistoricalDataClient(API_KEY, API_SECRET), SYMBOLS, days=365)
+    bars = provider.refresh()
+
+    result = run_portfolio_backtest(bars, starting_cash=100000.0, max_position_size=10)
+    print(f"📊 组合回测：交易次数 {result['total_trades']}，胜率 {result['win_rate']:.2%}，"
+          f"收益率 {result['total_return']:.2%}，最大回撤 {result['max_drawdown']:.2%}")
+    print(f"📊 卖出原因：{result['exit_reasons']}")
+    print(result["trades"].tail(20).to_string(index=False))
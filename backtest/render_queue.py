@@ -0,0 +1,105 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+
+import pandas as pd
+
+
+def _chart_digest(df, rsi_buy_thresh, rsi_sell_thresh):
+    # 同样的 K 线时间戳 + 同样的参数 -> 同一张图；不看收盘价，
+    # 盘中最后一根日线的价格一直在变，只有出现新 K 线才重画
+    h = hashlib.md5()
+    h.update(pd.DatetimeIndex(df["timestamp"]).as_unit("ns").asi8.tobytes())
+    h.update(f"{len(df)}-{rsi_buy_thresh}-{rsi_sell_thresh}".encode())
+    return h.hexdigest()
+
+
+def _read_digest(filepath):
+    try:
+        with open(filepath + ".md5", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _render_worker(jobs):
+    """子进程：逐个取任务画图，收到 None 退出"""
+    from backtest.engine import run_rsi_backtest
+    from backtest.plot import plot_backtest
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        symbol, df, rsi_buy_thresh, rsi_sell_thresh, filepath, digest = job
+        try:
+            result = run_rsi_backtest(df, rsi_buy_thresh, rsi_sell_thresh)
+            plot_backtest(symbol, df, result, filepath)
+            with open(filepath + ".md5", "w") as f:
+                f.write(digest)
+        except Exception as e:
+            print(f"⚠️ {symbol} 图表生成失败：{e}")
+
+
+class RenderQueue:
+    """
+    后台画图：图表任务放进队列，由单独的进程用 matplotlib 渲染，交易主循环不等待。
+    只有该标的出现新 K 线时才重画；磁盘上已有相同数据生成的图则直接跳过。
+    """
+
+    def __init__(self, save_dir="backtest", max_pending=100):
+        self.save_dir = save_dir
+        self.max_pending = max_pending
+        self.jobs = None
+        self.process = None
+        self.last_digest = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.process is not None and self.process.is_alive():
+                return
+            self._start_process()
+
+    def _start_process(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.jobs = ctx.Queue(maxsize=self.max_pending)
+        self.process = ctx.Process(target=_render_worker, args=(self.jobs,), daemon=True)
+        self.process.start()
+        print("🖼️ 后台画图进程已启动")
+
+    def submit(self, symbol, bars, rsi_buy_thresh=30, rsi_sell_thresh=70):
+        """提交一个图表任务，返回是否真的进入了队列"""
+        if bars is None or bars.empty:
+            return False
+
+        df = bars[["close"]].reset_index()
+        df = df[df["symbol"] == symbol][["timestamp", "close"]].reset_index(drop=True)
+        filepath = os.path.join(self.save_dir, f"{symbol}_b{rsi_buy_thresh}_s{rsi_sell_thresh}.png")
+        digest = _chart_digest(df, rsi_buy_thresh, rsi_sell_thresh)
+
+        # 没有新 K 线，或者磁盘上已经有一模一样的图
+        if self.last_digest.get(filepath) == digest:
+            return False
+        if os.path.exists(filepath) and _read_digest(filepath) == digest:
+            self.last_digest[filepath] = digest
+            return False
+
+        self.start()
+        try:
+            self.jobs.put_nowait((symbol, df, rsi_buy_thresh, rsi_sell_thresh, filepath, digest))
+        except queue.Full:
+            # 队列满了就丢弃，下一轮有新数据时会再提交
+            print(f"⚠️ 画图队列已满，跳过 {symbol}")
+            return False
+        self.last_digest[filepath] = digest
+        return True
+
+    def stop(self, timeout=30):
+        if self.process is None:
+            return
+        self.jobs.put(None)
+        self.process.join(timeout)
+        self.process = None
@@ -0,0 +1,110 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import rsi_signals, simulate, trade_stats
+from strategies.indicators import rsi_series, sma_series
+
+RESULT_COLUMNS = [
+    "symbol", "rsi_buy_thresh", "rsi_sell_thresh", "window",
+    "total_trades", "win_rate", "total_profit", "avg_profit", "max_drawdown",
+]
+
+# 子进程里挂载的共享内存（所有标的收盘价拼成一个 float64 数组）
+_shm = None
+_closes = None
+
+
+def _attach(shm_name, length):
+    global _shm, _closes
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _closes = np.ndarray((length,), dtype="float64", buffer=_shm.buf)
+
+
+def _evaluate(task):
+    """子进程：一个 (symbol, window) 只算一次 RSI，再把所有买卖阈值组合跑完"""
+    symbol, offset, length, window, buy_threshs, sell_threshs, sma_window = task
+    closes = _closes[offset:offset + length]
+    rsi = rsi_series(closes, window=window).to_numpy()
+    sma = sma_series(closes, window=sma_window).to_numpy()
+
+    rows = []
+    for buy, sell in itertools.product(buy_threshs, sell_threshs):
+        entry, exit = rsi_signals(closes, rsi, sma, buy, sell)
+        _, buy_idx, sell_idx = simulate(entry, exit)
+        stats = trade_stats(closes[buy_idx], closes[sell_idx])
+        stats.pop("profits")
+        stats.pop("win_trades")
+        rows.append({"symbol": symbol, "rsi_buy_thresh": buy, "rsi_sell_thresh": sell, "window": window, **stats})
+    return rows
+
+
+def run_sweep(bars, buy_threshs=(25, 30, 35, 40), sell_threshs=(60, 65, 70, 75), windows=(14,),
+              sma_window=20, max_workers=None):
+    """
+    RSI 参数网格搜索。bars 是 (symbol, timestamp) MultiIndex 的 K 线（每个标的只加载一次），
+    (symbol, window) 任务分发到进程池，收盘价通过共享内存传给子进程，不做拷贝。
+    返回按总收益、胜率排序的结果表。
+    """
+    if bars is None or bars.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    groups = [(sym, df["close"].to_numpy(dtype="float64")) for sym, df in bars.groupby(level=0, sort=False)]
+    total = sum(len(c) for _, c in groups)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    try:
+        buf = np.ndarray((total,), dtype="float64", buffer=shm.buf)
+        tasks = []
+        offset = 0
+        for sym, closes in groups:
+            buf[offset:offset + len(closes)] = closes
+            for window in windows:
+                tasks.append((sym, offset, len(closes), window, tuple(buy_threshs), tuple(sell_threshs), sma_window))
+            offset += len(closes)
+
+        workers = max_workers or os.cpu_count() or 1
+        print(f"🧮 参数搜索：{len(groups)} 个标的，{len(tasks)} 个任务，{workers} 个进程")
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, total)) as pool:
+            for result in pool.map(_evaluate, tasks):
+                rows.extend(result)
+        del buf
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    results.sort_values(["total_profit", "win_rate"], ascending=False, inplace=True, ignore_index=True)
+    return results
+
+
+def render_top(results, bars, top_n=5, save_dir="backtest"):
+    """只给排名前 top_n 的参数组合画图"""
+    from backtest.engine import run_rsi_backtest
+    from backtest.plot import plot_backtest
+
+    os.makedirs(save_dir, exist_ok=True)
+    for row in results.head(top_n).itertuples(index=False):
+        df = bars[bars.index.get_level_values(0) == row.symbol].reset_index()
+        result = run_rsi_backtest(df, row.rsi_buy_thresh, row.rsi_sell_thresh, rsi_window=row.window)
+        filepath = f"{save_dir}/{row.symbol}_b{row.rsi_buy_thresh}_s{row.rsi_sell_thresh}_w{row.window}.png"
+        plot_backtest(row.symbol, df, result, filepath)
+
+
+if __name__ == "__main__":
+    from alpaca.data.historical import StockHistoricalDataClient
+    from config import API_KEY, API_SECRET
+    from data.bar_provider import BarProvider
+
+    SYMBOLS = ["AMD", "META", "NVDA", "SHOP", "NFLX", "MARA", "RIOT"]
+    provider = BarProvider(StockHistoricalDataClient(API_KEY, API_SECRET), SYMBOLS, days=90)
+    bars = provider.refresh()
+
+    results = run_sweep(bars, windows=(10, 14, 21))
+    print(results.head(20).to_string(index=False))
+    render_top(results, bars, top_n=5)
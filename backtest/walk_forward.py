@@ -0,0 +1,211 @@
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import rsi_signals, simulate, trade_stats
+from strategies.base_strategy import price_matrix
+from strategies.indicators import rsi_frame, sma_frame
+
+PARAM_COLUMNS = ["window", "rsi_buy_thresh", "rsi_sell_thresh"]
+STAT_COLUMNS = ["total_trades", "win_rate", "total_profit", "avg_profit", "max_drawdown"]
+EVAL_COLUMNS = ["start", "end", *PARAM_COLUMNS, "symbol", *STAT_COLUMNS]
+
+# 子进程里挂载的共享内存：[收盘价, SMA, RSI(window_1), RSI(window_2), ...]，每层都是 时间 × 标的
+_shm = None
+_arrays = None
+_windows = None
+
+
+def make_folds(n_bars, train_size, test_size, step=None, anchored=False):
+    """
+    滚动切分 [(train_start, train_end, test_start, test_end), ...]（左闭右开的 K 线下标）。
+    step 默认等于 test_size（测试区间首尾相接）；anchored=True 时训练区间固定从 0 开始、逐步变长。
+    """
+    step = step or test_size
+    folds = []
+    start = 0
+    while start + train_size + test_size <= n_bars:
+        train_end = start + train_size
+        folds.append((0 if anchored else start, train_end, train_end, train_end + test_size))
+        start += step
+    return folds
+
+
+def _attach(shm_name, shape, windows):
+    global _shm, _arrays, _windows
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _arrays = np.ndarray(shape, dtype="float64", buffer=_shm.buf)
+    _windows = list(windows)
+
+
+def _evaluate_segment(closes, sma, rsi, buy, sell):
+    """单个标的在一段区间上的回测：区间开始时空仓，结束时没平仓的不计"""
+    entry, exit = rsi_signals(closes, rsi, sma, buy, sell)
+    _, buy_idx, sell_idx = simulate(entry, exit)
+    stats = trade_stats(closes[buy_idx], closes[sell_idx])
+    return [stats[c] for c in STAT_COLUMNS]
+
+
+def _evaluate(task):
+    """子进程：一段区间 × 若干参数组合 × 所有标的；指标直接切共享内存里的整段结果，不重新计算"""
+    start, end, params = task
+    closes = _arrays[0, start:end]
+    sma = _arrays[1, start:end]
+    rows = []
+    for window, buy, sell in params:
+        rsi = _arrays[2 + _windows.index(window), start:end]
+        for j in range(closes.shape[1]):
+            rows.append([start, end, window, buy, sell, j, *_evaluate_segment(closes[:, j], sma[:, j], rsi[:, j], buy, sell)])
+    return rows
+
+
+def _fingerprint(closes, sma_window):
+    """数据指纹：同一份 K 线和 SMA 窗口才复用缓存"""
+    h = hashlib.md5()
+    h.update(closes.to_numpy(dtype="float64").tobytes())
+    h.update(closes.index.asi8.tobytes() if hasattr(closes.index, "asi8") else str(list(closes.index)).encode())
+    h.update("|".join(map(str, closes.columns)).encode())
+    h.update(str(sma_window).encode())
+    return h.hexdigest()
+
+
+def _load_cache(path):
+    if path and os.path.exists(path):
+        return pd.read_pickle(path)
+    return pd.DataFrame(columns=EVAL_COLUMNS)
+
+
+def _save_cache(path, evals):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    evals.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def evaluate_segments(bars, segments, params, sma_window=20, max_workers=None, cache_dir="backtest/cache/walk_forward"):
+    """
+    对每个 (区间, 参数组合, 标的) 回测一次，返回结果表（EVAL_COLUMNS）。
+    - 收盘价、SMA、各窗口的 RSI 在整段历史上只算一次（指标只依赖过去的数据，切片后与单独计算一致），
+      放进共享内存给所有子进程使用；
+    - 结果按数据指纹缓存在 cache_dir，之后增加折数或参数只计算缓存里没有的组合；
+    - 缺的组合按区间拆成任务，多进程并行。
+    """
+    closes = price_matrix(bars)
+    symbols = list(closes.columns)
+    cache_path = os.path.join(cache_dir, _fingerprint(closes, sma_window) + ".pkl") if cache_dir else None
+    cached = _load_cache(cache_path)
+
+    done = set(zip(cached["start"], cached["end"], cached["window"], cached["rsi_buy_thresh"], cached["rsi_sell_thresh"]))
+    tasks = []
+    for start, end in sorted(set(segments)):
+        missing = [p for p in params if (start, end, *p) not in done]
+        if missing:
+            tasks.append((start, end, missing))
+
+    if tasks:
+        windows = sorted({p[0] for _, _, missing in tasks for p in missing})
+        shape = (2 + len(windows), *closes.shape)
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)), 1) * 8)
+        try:
+            arrays = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+            arrays[0] = closes.to_numpy(dtype="float64")
+            arrays[1] = sma_frame(closes, sma_window).to_numpy()
+            for k, window in enumerate(windows):
+                arrays[2 + k] = rsi_frame(closes, window).to_numpy()
+
+            workers = max_workers or os.cpu_count() or 1
+            n_evals = sum(len(missing) for _, _, missing in tasks) * len(symbols)
+            print(f"🧮 滚动回测：{len(tasks)} 个区间，{n_evals} 次回测（缓存 {len(cached)} 条），{workers} 个进程")
+            rows = []
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, shape, windows)) as pool:
+                for result in pool.map(_evaluate, tasks):
+                    rows.extend(result)
+            del arrays
+        finally:
+            shm.close()
+            shm.unlink()
+
+        new = pd.DataFrame(rows, columns=EVAL_COLUMNS)
+        new["symbol"] = np.asarray(symbols, dtype=object)[new["symbol"].to_numpy(dtype=np.int64)]
+        cached = new if cached.empty else pd.concat([cached, new], ignore_index=True)
+        _save_cache(cache_path, cached)
+
+    wanted = pd.DataFrame(
+        [(s, e, *p) for s, e in set(segments) for p in params], columns=["start", "end", *PARAM_COLUMNS]
+    )
+    return cached.merge(wanted, on=["start", "end", *PARAM_COLUMNS])
+
+
+def run_walk_forward(bars, buy_threshs=(25, 30, 35, 40), sell_threshs=(60, 65, 70, 75), windows=(14,),
+                     train_size=60, test_size=20, step=None, anchored=False, objective="total_profit",
+                     sma_window=20, max_workers=None, cache_dir="backtest/cache/walk_forward"):
+    """
+    滚动前推（walk-forward）优化：每一折在训练区间上按 objective 为每个标的选出最优参数，
+    再用这组参数在紧接着的测试区间上回测，只有测试区间的结果算样本外表现。
+    train_size / test_size / step 的单位是 K 线根数（按所有标的对齐后的时间轴）。
+    返回每折每个标的一行的表：最优参数、训练区间的 objective、测试区间的各项指标。
+    """
+    times = price_matrix(bars).index
+    folds = make_folds(len(times), train_size, test_size, step, anchored)
+    if not folds:
+        raise ValueError(f"K 线只有 {len(times)} 根，不够一折（训练 {train_size} + 测试 {test_size}）")
+
+    params = list(itertools.product(windows, buy_threshs, sell_threshs))
+    segments = [(a, b) for a, b, _, _ in folds] + [(c, d) for _, _, c, d in folds]
+    evals = evaluate_segments(bars, segments, params, sma_window, max_workers, cache_dir)
+    by_segment = {key: df for key, df in evals.groupby(["start", "end"])}
+
+    rows = []
+    for k, (train_start, train_end, test_start, test_end) in enumerate(folds):
+        train = by_segment[(train_start, train_end)]
+        # 每个标的取训练区间 objective 最高的参数（相同时取胜率高的）
+        best = (train.sort_values([objective, "win_rate"], ascending=False, kind="stable")
+                .drop_duplicates("symbol")[["symbol", *PARAM_COLUMNS, objective]]
+                .rename(columns={objective: f"train_{objective}"}))
+        test = by_segment[(test_start, test_end)].drop(columns=["start", "end"])
+        fold = best.merge(test, on=["symbol", *PARAM_COLUMNS])
+        fold.insert(0, "fold", k)
+        fold.insert(1, "train_start", times[train_start])
+        fold.insert(2, "test_start", times[test_start])
+        fold.insert(3, "test_end", times[test_end - 1])
+        rows.append(fold)
+
+    return pd.concat(rows, ignore_index=True).sort_values(["symbol", "fold"], ignore_index=True)
+
+
+def summarize(results):
+    """按标的汇总所有测试区间（样本外）的表现"""
+    # 胜率按交易笔数加权：先按标的求和再相除，不用 groupby.apply（各 pandas 版本行为一致）
+    wins = (results["win_rate"] * results["total_trades"]).groupby(results["symbol"]).sum()
+    grouped = results.groupby("symbol")
+    trades = grouped["total_trades"].sum()
+    summary = pd.DataFrame({
+        "folds": grouped["fold"].count(),
+        "oos_trades": trades,
+        "oos_profit": grouped["total_profit"].sum(),
+        "oos_win_rate": (wins / trades.where(trades > 0)).fillna(0.0),
+        "worst_fold_profit": grouped["total_profit"].min(),
+    })
+    return summary.sort_values("oos_profit", ascending=False)
+
+
+if __name__ == "__main__":
+    from alpaca.data.historical import StockHistoricalDataClient
+    from config import API_KEY, API_SECRET
+    from data.bar_provider import BarProvider
+
+    SYMBOLS = ["AMD", "META", "NVDA", "SHOP", "NFLX", "MARA", "RIOT"]
+    provider = BarProvider(StockHistoricalDataClient(API_KEY, API_SECRET), SYMBOLS, days=730)
+    bars = provider.refresh()
+
+    results = run_walk_forward(bars, windows=(10, 14, 21), train_size=120, test_size=20)
+    print(results.tail(20).to_string(index=False))
+    print("📊 样本外汇总：")
+    print(summarize(results).to_string())
@@ -0,0 +1,360 @@
+"""
+基准测试：用确定性的合成 K 线和本地假客户端，给各子系统计时，并和基线比较。
+
+    python -m benchmarks.run                              # 默认 small / medium 两档
+    python -m benchmarks.run --scales small medium large --repeat 5
+    python -m benchmarks.run --save-baseline              # 把本次结果存为基线
+    python -m benchmarks.run --threshold 0.2              # 比基线慢 20% 以上记为退化，退出码为 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_bars
+
+SCALES = {
+    "small": {"n_symbols": 10, "n_bars": 250},
+    "medium": {"n_symbols": 100, "n_bars": 1000},
+    "large": {"n_symbols": 500, "n_bars": 2500},
+}
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def benchmark(name, timeframes=None):
+    """
+    注册一个基准测试。被装饰的函数是一个 contextmanager：
+    进入时做准备工作（不计时）并 yield 一个无参函数，计时只针对这个函数；退出时清理。
+    timeframes: 支持的 K 线周期，None 表示任意周期。
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (contextlib.contextmanager(func), timeframes)
+        return func
+    return decorator
+
+
+# ---------- 指标与策略 ----------
+@benchmark("indicators.sync")
+def bench_indicator_sync(bars):
+    from strategies.indicators import IndicatorEngine
+
+    by_symbol = {sym: df for sym, df in bars.groupby(level=0, sort=False)}
+
+    def run():
+        engine = IndicatorEngine(sma_window=20, rsi_window=14)
+        for sym, df in by_symbol.items():
+            engine.sync(sym, df)
+    yield run
+
+
+@benchmark("strategy.get_signal")
+def bench_get_signal(bars):
+    """逐个标的调用 RSIStrategy.get_signal（冷启动，完整历史）"""
+    from strategies.rsi_strategy import RSIStrategy
+
+    by_symbol = {sym: df for sym, df in bars.groupby(level=0, sort=False)}
+
+    def run():
+        strategy = RSIStrategy()
+        for sym, df in by_symbol.items():
+            strategy.get_signal(sym, bars=df)
+    yield run
+
+
+@benchmark("strategy.get_signals_incremental")
+def bench_get_signals_incremental(bars):
+    """热状态下整个面板批量取最新信号（实盘每轮的情况：只有最后一根 K 线是新的）"""
+    try:
+        from data.bar_provider import BarProvider
+    except ImportError as e:
+        raise SkipBenchmark(f"无法导入 BarProvider（{e}）")
+    from strategies.rsi_strategy import RSIStrategy
+
+    # 增量状态只在 bar_provider 路径上保留（传入 bars 时每次从头计算）
+    symbols = list(bars.index.get_level_values(0).unique())
+    provider = BarProvider(None, symbols, capacity=bars.groupby(level=0).size().max())
+    provider.set_bars(bars)
+    strategy = RSIStrategy(bar_provider=provider)
+    strategy.lookback_days = (pd.Timestamp.now(tz="UTC") - bars.index.get_level_values(-1).min()).days + 1
+    strategy.get_signals()
+
+    def run():
+        strategy.get_signals()
+    yield run
+
+
+@benchmark("strategy.generate_signals")
+def bench_generate_signals(bars):
+    from strategies.hybrid_strategy import HybridStrategy
+
+    strategy = HybridStrategy()
+
+    def run():
+        strategy.generate_signals(bars)
+    yield run
+
+
+@benchmark("ensemble.generate_signals")
+def bench_ensemble(bars):
+    from strategies.ensemble import StrategyEnsemble
+    from strategies.hybrid_strategy import HybridStrategy
+    from strategies.rsi_strategy import RSIStrategy
+    from strategies.sma_strategy import SMAStrategy
+
+    ensemble = StrategyEnsemble([SMAStrategy(), RSIStrategy(), HybridStrategy()])
+
+    def run():
+        ensemble.generate_signals(bars)
+    yield run
+
+
+# ---------- 回测 ----------
+@benchmark("backtest.backtest_and_plot")
+def bench_backtest_and_plot(bars):
+    """每个标的调用一次 backtest_and_plot(plot=False)，与 main.evaluate_symbol 相同"""
+    try:
+        from backtest.plot import backtest_and_plot
+    except ImportError as e:
+        raise SkipBenchmark(e)
+
+    by_symbol = {sym: df for sym, df in bars.groupby(level=0, sort=False)}
+
+    def run():
+        for sym, df in by_symbol.items():
+            backtest_and_plot(sym, bars=df, plot=False)
+    yield run
+
+
+@benchmark("backtest.portfolio")
+def bench_portfolio_backtest(bars):
+    from backtest.portfolio_backtest import run_portfolio_backtest
+
+    def run():
+        run_portfolio_backtest(bars, max_position_size=10)
+    yield run
+
+
+# ---------- 实盘一轮 ----------
+@benchmark("live.main_cycle", timeframes=("1Day",))
+def bench_main_cycle(bars):
+    """
+    完整的 main.main() 一轮：FakeDataClient 代替行情接口，PortfolioBroker 代替 Alpaca 模拟盘，
+    在临时目录里运行（日志、入场价、交易库都写在那里），不发送通知。
+    """
+    # 实盘按当前时间取最近 N 天，把合成数据平移到今天为止
+    times = bars.index.get_level_values(-1)
+    shift = pd.Timestamp.now(tz="UTC").normalize() - times.max()
+    bars = bars.set_axis(pd.MultiIndex.from_arrays(
+        [bars.index.get_level_values(0), times + shift], names=bars.index.names
+    ))
+
+    cwd = os.getcwd()
+    tmp = tempfile.TemporaryDirectory()
+    os.chdir(tmp.name)
+    try:
+        # main 和订单管理 / 行情模块都依赖 alpaca-py，没装时跳过而不是让整个套件崩溃
+        try:
+            import main
+            from backtest.render_queue import RenderQueue
+            from broker.order_manager import OrderManager
+            from broker.portfolio_broker import PortfolioBroker
+            from broker.portfolio_snapshot import PortfolioSnapshot
+            from data.bar_provider import BarProvider
+            from data.fake_data_client import FakeDataClient
+            from data.quote_snapshot import QuoteSnapshot
+            from risk.basic_risk import BasicRiskManager
+            from risk.position_sizing import PositionSizer
+            from strategies.ensemble import StrategyEnsemble
+            from strategies.hybrid_strategy import HybridStrategy
+            from strategies.rsi_strategy import RSIStrategy
+            from strategies.sma_strategy import SMAStrategy
+        except ImportError as e:
+            raise SkipBenchmark(f"缺少依赖（{e}）")
+
+        symbols = list(bars.index.get_level_values(0).unique())
+        last_close = bars.groupby(level=0, sort=False)["close"].last()
+        data_client = FakeDataClient(bars)
+        broker = PortfolioBroker(1_000_000, symbols)
+        broker.update_prices(broker.indices(last_close.index), last_close.to_numpy())
+
+        main.SYMBOLS = symbols
+        main.trading_client = broker
+        main.data_client = data_client
+        main.portfolio = PortfolioSnapshot(broker)
+        main.order_manager = OrderManager(broker, on_fill=main.on_order_fill, on_reject=main.on_order_reject)
+        main.risk = BasicRiskManager(max_position_size=10, entry_file=os.path.join(tmp.name, "entry_price.json"))
+        main.sizer = PositionSizer.from_risk(main.risk)
+        main.bar_provider = BarProvider(data_client, symbols, days=(times.max() - times.min()).days + 1)
+        main.strategy = RSIStrategy(bar_provider=main.bar_provider)
+        main.ensemble = StrategyEnsemble(
+            [SMAStrategy(), RSIStrategy(), HybridStrategy()], bar_provider=main.bar_provider, vote="majority"
+        )
+        main.quotes = QuoteSnapshot(data_client, symbols, ttl=30)
+        os.makedirs("charts")
+        main.render_queue = RenderQueue(save_dir="charts")
+        main.send_notification = lambda *args, **kwargs: None
+
+        yield main.main
+
+        # 画图在子进程里异步进行，不在一轮的关键路径上；测完直接结束，不等剩下的图画完
+        render = main.render_queue
+        if render.process is not None:
+            render.jobs.cancel_join_thread()
+            render.process.terminate()
+            render.process.join()
+            render.process = None
+    finally:
+        os.chdir(cwd)
+        tmp.cleanup()
+
+
+# ---------- 运行与比较 ----------
+def time_call(func, repeat=3, warmup=1):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_suite(names=None, scales=("small", "medium"), timeframe="1Day", repeat=3, seed=0, quiet=True):
+    results = {}
+    for scale in scales:
+        params = SCALES[scale]
+        bars = make_bars(timeframe=timeframe, seed=seed, **params)
+        for name, (bench, timeframes) in BENCHMARKS.items():
+            if names and not any(name.startswith(n) for n in names):
+                continue
+            key = f"{name}@{scale}"
+            if timeframes and timeframe not in timeframes:
+                continue
+            sink = io.StringIO()
+            try:
+                # 各子系统的 print 输出不计入结果，也不刷屏
+                with contextlib.redirect_stdout(sink if quiet else sys.stdout):
+                    with bench(bars) as func:
+                        timings = time_call(func, repeat=repeat)
+            except SkipBenchmark as e:
+                print(f"⏭️ 跳过 {key}：{e}")
+                continue
+            results[key] = {
+                "median_s": statistics.median(timings),
+                "min_s": min(timings),
+                "repeat": repeat,
+                "timeframe": timeframe,
+                **params,
+            }
+            per_bar = results[key]["median_s"] / (params["n_symbols"] * params["n_bars"]) * 1e6
+            print(f"⏱️ {key:<44} 中位数 {results[key]['median_s'] * 1000:>10.1f} ms"
+                  f"  最快 {results[key]['min_s'] * 1000:>10.1f} ms  ({per_bar:.2f} µs/bar)")
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """和基线比较中位数耗时，返回退化的项目列表"""
+    regressions = []
+    base_results = baseline.get("results", {})
+    print(f"\n📊 与基线比较（{baseline.get('meta', {}).get('commit')} @ {baseline.get('meta', {}).get('ts')}）：")
+    for key, current in results.items():
+        base = base_results.get(key)
+        if base is None:
+            print(f"  {key:<44} 无基线")
+            continue
+        ratio = current["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        if ratio > 1 + threshold:
+            flag = "⚠️ 变慢"
+            regressions.append((key, ratio))
+        elif ratio < 1 - threshold:
+            flag = "🚀 变快"
+        else:
+            flag = "✅ 持平"
+        print(f"  {key:<44} {base['median_s'] * 1000:>10.1f} -> {current['median_s'] * 1000:>10.1f} ms  x{ratio:.2f} {flag}")
+    return regressions
+
+
+def save(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TradingBot 基准测试")
+    parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES))
+    parser.add_argument("--symbols", type=int, help="自定义规模：标的数（与 --bars 一起使用）")
+    parser.add_argument("--bars", type=int, help="自定义规模：每个标的的 K 线数")
+    parser.add_argument("--timeframe", default="1Day", choices=["1Day", "1Hour", "15Min", "5Min", "1Min"])
+    parser.add_argument("--only", nargs="+", help="只运行名字以这些前缀开头的测试，如 strategy backtest")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数比基线慢超过这个比例记为退化")
+    parser.add_argument("--verbose", action="store_true", help="显示被测代码的输出")
+    args = parser.parse_args()
+
+    scales = list(args.scales)
+    if args.symbols and args.bars:
+        SCALES["custom"] = {"n_symbols": args.symbols, "n_bars": args.bars}
+        scales = ["custom"]
+
+    results = run_suite(args.only, scales, args.timeframe, args.repeat, args.seed, quiet=not args.verbose)
+    latest = os.path.join(RESULTS_DIR, datetime.now().strftime("bench-%Y%m%d-%H%M%S.json"))
+    save(latest, results)
+    print(f"💾 结果已保存：{latest}")
+
+    if args.save_baseline:
+        save(args.baseline, results)
+        print(f"💾 基线已更新：{args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} 项比基线慢 {args.threshold:.0%} 以上")
+            sys.exit(1)
+    else:
+        print("ℹ️ 还没有基线，使用 --save-baseline 保存")
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# 交易时段（UTC，美股常规时段 9:30-16:00 ET 按夏令时算），分钟级 K 线只在这个区间内生成
+SESSION_OPEN = pd.Timedelta(hours=13, minutes=30)
+SESSION_MINUTES = 390
+
+TIMEFRAME_MINUTES = {"1Min": 1, "5Min": 5, "15Min": 15, "1Hour": 60}
+
+
+def symbol_names(n):
+    """确定性的标的代码：S0000, S0001, ..."""
+    return [f"S{i:04d}" for i in range(n)]
+
+
+def _timestamps(n_bars, timeframe, end):
+    end = pd.Timestamp(end).tz_convert("UTC") if pd.Timestamp(end).tz else pd.Timestamp(end, tz="UTC")
+    if timeframe == "1Day":
+        return pd.bdate_range(end=end.normalize(), periods=n_bars, tz="UTC")
+
+    step = TIMEFRAME_MINUTES[timeframe]
+    per_day = SESSION_MINUTES // step
+    days = pd.bdate_range(end=end.normalize(), periods=-(-n_bars // per_day), tz="UTC")
+    offsets = SESSION_OPEN + pd.to_timedelta(np.arange(per_day) * step, unit="min")
+    stamps = (days.values[:, None] + offsets.values[None, :]).ravel()
+    return pd.DatetimeIndex(stamps[-n_bars:], tz="UTC")
+
+
+def make_bars(n_symbols=10, n_bars=250, timeframe="1Day", seed=0, end="2024-12-31", volatility=0.02):
+    """
+    生成确定性的合成 OHLCV（几何布朗运动），返回与 Alpaca 相同的 (symbol, timestamp) MultiIndex DataFrame。
+    相同参数每次生成完全相同的数据，基准测试结果可以横向比较。
+    timeframe: "1Day" / "1Hour" / "15Min" / "5Min" / "1Min"
+    """
+    rng = np.random.default_rng(seed)
+    times = _timestamps(n_bars, timeframe, end)
+    n_bars = len(times)
+    if timeframe != "1Day":
+        volatility = volatility * np.sqrt(TIMEFRAME_MINUTES[timeframe] / SESSION_MINUTES)
+
+    start = rng.uniform(10, 500, size=(1, n_symbols))
+    returns = rng.normal(0, volatility, size=(n_bars, n_symbols))
+    close = start * np.exp(np.cumsum(returns, axis=0))
+    open_ = np.vstack([start, close[:-1]])
+    spread = np.abs(rng.normal(0, volatility / 2, size=(n_bars, n_symbols)))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(1_000, 1_000_000, size=(n_bars, n_symbols)).astype("float64")
+
+    symbols = symbol_names(n_symbols)
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(np.array(symbols, dtype=object), n_bars), np.tile(times, n_symbols)],
+        names=["symbol", "timestamp"],
+    )
+    # 按 symbol 排列（每个标的一段连续的 K 线），与 Alpaca 返回的顺序一致
+    columns = {
+        "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+        "trade_count": np.round(volume / 100), "vwap": (high + low + close) / 3,
+    }
+    return pd.DataFrame({name: col.T.ravel() for name, col in columns.items()}, index=index)
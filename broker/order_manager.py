@@ -0,0 +1,261 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from alpaca.trading.enums import OrderSide, QueryOrderStatus, TimeInForce
+from alpaca.trading.requests import GetOrdersRequest, MarketOrderRequest
+
+from utils.metrics import metrics
+
+# 不会再变化的订单状态
+TERMINAL_STATUSES = {"filled", "canceled", "expired", "rejected", "replaced", "failed"}
+
+
+def make_client_order_id(symbol, side, key, prefix="tb"):
+    """
+    确定性的 client_order_id：同一个标的、方向和决策 key（如本轮开始时间）永远得到同一个 ID，
+    超时重试、进程重启后重复提交都会被券商按重复 ID 拒绝，不会下出两笔单。
+    Alpaca 限制 48 个字符，超长时用哈希截断。
+    """
+    cid = f"{prefix}-{symbol.upper()}-{side.lower()}-{key}"
+    if len(cid) > 48:
+        cid = f"{prefix}-{hashlib.sha1(cid.encode()).hexdigest()[:32]}"
+    return cid
+
+
+def _value(x):
+    # Alpaca 的枚举 / UUID / 数字字符串统一转成普通值
+    return getattr(x, "value", x)
+
+
+class ManagedOrder:
+    """一笔受管理的订单：下单时的意图 + 券商回报的最新状态"""
+
+    def __init__(self, client_order_id, symbol, side, qty, price=None, reason=""):
+        self.client_order_id = client_order_id
+        self.symbol = symbol.upper()
+        self.side = side.upper()
+        self.qty = float(qty)
+        # 做决策时的价格（用于本地预估和日志对比），真实成交价见 filled_avg_price
+        self.price = price
+        self.reason = reason
+        self.id = None
+        self.status = "pending_submit"
+        self.filled_qty = 0.0
+        self.filled_avg_price = None
+        self.submitted_at = None
+        self.error = None
+        # 已经通知过 on_fill 的成交数量 / 金额（部分成交时按增量通知）
+        self.applied_qty = 0.0
+        self.applied_notional = 0.0
+        self.settled = False
+
+    @property
+    def done(self):
+        return self.status in TERMINAL_STATUSES
+
+    def update(self, broker_order):
+        """
+        用券商返回的订单对象（Alpaca Order 或 SimulatedOrder）更新状态。
+        下单回报和推送 / 轮询结果可能乱序到达，成交数量比当前少的是过期状态，直接忽略。
+        """
+        if float(broker_order.filled_qty or 0) < self.filled_qty:
+            return False
+        self.id = str(_value(broker_order.id)) if broker_order.id is not None else self.id
+        self.status = str(_value(broker_order.status)).lower()
+        self.filled_qty = float(broker_order.filled_qty or 0)
+        price = broker_order.filled_avg_price
+        self.filled_avg_price = float(price) if price is not None else None
+        self.error = getattr(broker_order, "error", None)
+        return True
+
+    def __repr__(self):
+        return (f"ManagedOrder({self.client_order_id}, {self.side} {self.symbol} x {self.qty:g}, "
+                f"{self.status}, filled {self.filled_qty:g} @ {self.filled_avg_price})")
+
+
+class SubmitFailure:
+    """重试用尽仍没有送达券商的订单，字段与券商订单对象一致，经 updates 队列交给 poll 应用"""
+
+    def __init__(self, client_order_id, error):
+        self.client_order_id = client_order_id
+        self.id = None
+        self.status = "failed"
+        self.filled_qty = 0
+        self.filled_avg_price = None
+        self.error = error
+
+
+class OrderManager:
+    """
+    订单管理：
+    - submit 立即返回，真正的下单请求在线程池里并发发出，主循环不等待每一笔；
+    - client_order_id 确定性生成，请求超时 / 出错时先按 ID 查询订单是否已经到达券商，没有才用同一个 ID 重试；
+    - 订单状态通过 Alpaca 交易推送（listen）或批量轮询（poll，一次 get_orders 查所有未完成订单）更新；
+    - 成交回调 on_fill(order, qty, price) 拿到的是真实成交价（部分成交按增量），
+      未成交部分在订单结束时通过 on_reject(order, qty) 通知，便于回滚本地的预估状态。
+    回调只在调用 poll / flush 的线程里执行，和主循环的风控、下单逻辑一样是串行的。
+    trading_client 可以是 Alpaca TradingClient，也可以是本地的 PortfolioBroker。
+    """
+
+    def __init__(self, trading_client, on_fill=None, on_reject=None, max_workers=8, retries=2, retry_delay=0.5):
+        self.client = trading_client
+        self.on_fill = on_fill
+        self.on_reject = on_reject
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order")
+        self.lock = threading.Lock()
+        self.orders = {}      # client_order_id -> ManagedOrder
+        self.futures = {}     # client_order_id -> 提交中的 Future
+        self.updates = deque()
+        self.streaming = False
+
+    # ---------- 下单 ----------
+    def submit(self, symbol, side, qty=1, price=None, key=None, reason=""):
+        """
+        提交市价单，立即返回 ManagedOrder。
+        key 标识这次决策（如本轮开始时间、触发的 K 线时间），不传时用当前秒；
+        同一个 key 重复调用返回已有的订单，不会重复下单。
+        """
+        key = key or datetime.now().strftime("%Y%m%d%H%M%S")
+        cid = make_client_order_id(symbol, side, key)
+        with self.lock:
+            order = self.orders.get(cid)
+            if order is not None:
+                print(f"⚠️ {cid} 已提交过，不再重复下单")
+                return order
+            order = self.orders[cid] = ManagedOrder(cid, symbol, side, qty, price, reason)
+            self.futures[cid] = self.pool.submit(self._send, order)
+        return order
+
+    def _send(self, order):
+        """
+        在线程池里发出下单请求。这里不直接改订单字段：券商回报放进 self.updates，
+        由调用 poll 的线程统一应用，和推送 / 轮询来的状态走同一条路径。
+        """
+        request = MarketOrderRequest(
+            symbol=order.symbol,
+            qty=order.qty,
+            side=OrderSide.BUY if order.side == "BUY" else OrderSide.SELL,
+            time_in_force=TimeInForce.DAY,
+            client_order_id=order.client_order_id,
+        )
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.span("order.submit"):
+                    response = self.client.submit_order(request)
+                self.updates.append(response)
+                return order
+            except Exception as e:
+                error = e
+                # 请求可能已经到达券商（超时、连接中断、重复 ID），先按 ID 查一次
+                existing = self._lookup(order.client_order_id)
+                if existing is not None:
+                    self.updates.append(existing)
+                    return order
+                if attempt < self.retries:
+                    print(f"⚠️ {order.client_order_id} 提交失败（{e}），{self.retry_delay * 2 ** attempt:.1f}s 后重试")
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        print(f"❌ {order.client_order_id} 提交失败：{error}")
+        self.updates.append(SubmitFailure(order.client_order_id, error))
+        return order
+
+    def _lookup(self, client_order_id):
+        try:
+            return self.client.get_order_by_client_id(client_order_id)
+        except Exception:
+            return None
+
+    # ---------- 状态跟踪 ----------
+    def listen(self, stream):
+        """订阅 Alpaca 交易推送（alpaca.trading.stream.TradingStream），在后台线程运行；之后 poll 不再请求 API"""
+        async def on_update(data):
+            self.updates.append(data.order)
+
+        stream.subscribe_trade_updates(on_update)
+        threading.Thread(target=stream.run, name="trade-updates", daemon=True).start()
+        self.streaming = True
+        print("📡 已订阅订单推送")
+
+    def open_orders(self):
+        with self.lock:
+            return [o for o in self.orders.values() if not o.done or not o.settled]
+
+    def poll(self):
+        """
+        更新所有未完成订单的状态并触发回调。有推送时只处理推送来的更新，
+        否则一次 get_orders 批量查询（而不是每笔订单一个请求）。
+        """
+        while self.updates:
+            data = self.updates.popleft()
+            order = self.orders.get(data.client_order_id)
+            if order is None or order.done:
+                continue
+            if order.update(data) and order.submitted_at is None and order.status != "failed":
+                order.submitted_at = time.time()
+
+        pending = [o for o in self.open_orders() if not o.done and o.submitted_at is not None]
+        if pending and not self.streaming:
+            since = min(o.submitted_at for o in pending) - 60
+            request = GetOrdersRequest(
+                status=QueryOrderStatus.ALL,
+                after=datetime.fromtimestamp(since, tz=timezone.utc),
+                symbols=sorted({o.symbol for o in pending}),
+                limit=500,
+            )
+            with metrics.span("order.poll"):
+                for data in self.client.get_orders(filter=request):
+                    order = self.orders.get(data.client_order_id)
+                    if order is not None and not order.done:
+                        order.update(data)
+
+        for order in self.open_orders():
+            self._settle(order)
+
+    def _settle(self, order):
+        """把新增的成交通知给 on_fill；订单结束时把没成交的数量通知给 on_reject"""
+        if order.filled_qty > order.applied_qty and order.filled_avg_price is not None:
+            notional = order.filled_qty * order.filled_avg_price
+            qty = order.filled_qty - order.applied_qty
+            price = (notional - order.applied_notional) / qty
+            order.applied_qty, order.applied_notional = order.filled_qty, notional
+            if self.on_fill:
+                self.on_fill(order, qty, price)
+        if order.done and not order.settled:
+            order.settled = True
+            unfilled = order.qty - order.filled_qty
+            if unfilled > 0:
+                print(f"⚠️ {order.side} {order.symbol} 有 {unfilled:g} 股未成交（{order.status}）")
+                if self.on_reject:
+                    self.on_reject(order, unfilled)
+
+    def flush(self, timeout=5.0, interval=0.5):
+        """等本轮提交的请求都发出去，再轮询到所有订单结束或超时；没结束的留到下一次 poll"""
+        with self.lock:
+            futures = list(self.futures.values())
+            self.futures = {}
+        if futures:
+            wait(futures, timeout=timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll()
+            if not any(not o.done for o in self.open_orders()) or time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+        self._forget()
+
+    def _forget(self, keep=timedelta(days=1)):
+        # 结算完的订单保留一天用于去重，之后释放
+        cutoff = time.time() - keep.total_seconds()
+        with self.lock:
+            for cid in [c for c, o in self.orders.items() if o.settled and (o.submitted_at or 0) < cutoff]:
+                del self.orders[cid]
+
+    def shutdown(self):
+        self.flush()
+        self.pool.shutdown(wait=True)
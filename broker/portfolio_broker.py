@@ -0,0 +1,278 @@
+import itertools
+
+import numpy as np
+
+from broker.portfolio_snapshot import LocalAccount, LocalPosition
+
+
+# ---------- 手续费模型：输入成交数量 / 价格数组，返回每笔手续费 ----------
+class NoCommission:
+    def __call__(self, qty, price):
+        return np.zeros_like(qty, dtype="float64")
+
+
+class PerShareCommission:
+    def __init__(self, per_share=0.005, minimum=1.0):
+        self.per_share = per_share
+        self.minimum = minimum
+
+    def __call__(self, qty, price):
+        fee = np.abs(qty) * self.per_share
+        return np.where(qty != 0, np.maximum(fee, self.minimum), 0.0)
+
+
+class PercentCommission:
+    def __init__(self, pct=0.001):
+        self.pct = pct
+
+    def __call__(self, qty, price):
+        return np.abs(qty) * price * self.pct
+
+
+# ---------- 滑点模型：输入方向（+1 买 / -1 卖）和价格数组，返回成交价 ----------
+class NoSlippage:
+    def __call__(self, side, price):
+        return price
+
+
+class BpsSlippage:
+    """按基点滑点：买入价上浮、卖出价下浮"""
+
+    def __init__(self, bps=5.0):
+        self.bps = bps
+
+    def __call__(self, side, price):
+        return price * (1.0 + side * self.bps / 10000.0)
+
+
+class SimulatedOrder:
+    """submit_order 的返回值，字段名与 Alpaca Order 对齐"""
+
+    def __init__(self, id, client_order_id, symbol, side, qty, filled_qty, filled_avg_price):
+        self.id = id
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.filled_qty = filled_qty
+        self.filled_avg_price = filled_avg_price
+        if filled_qty <= 0:
+            self.status = "rejected"
+        elif filled_qty < qty:
+            self.status = "partially_filled"
+        else:
+            self.status = "filled"
+
+
+class PortfolioBroker:
+    """
+    多标的模拟券商：持仓数量、平均成本、已实现盈亏都存在 NumPy 数组里（按 symbol 下标），
+    一根 K 线上成千上万个标的的成交和市值计算都是一次向量运算。
+    支持部分成交（按成交量比例限制）、手续费和滑点模型，不允许卖空、不允许透支现金。
+    同时实现了 get_all_positions / get_account / submit_order，可以在离线测试里代替 Alpaca 模拟盘。
+    """
+
+    def __init__(self, starting_cash, symbols=(), commission=None, slippage=None, max_volume_pct=None):
+        self.cash = float(starting_cash)
+        self.commission = commission or NoCommission()
+        self.slippage = slippage or NoSlippage()
+        # 单笔成交最多占该 K 线成交量的比例，None 表示不限制
+        self.max_volume_pct = max_volume_pct
+
+        self.index = {}
+        self.symbols = []
+        self.qty = np.zeros(0)
+        self.avg_cost = np.zeros(0)
+        self.realized = np.zeros(0)
+        self.last_price = np.zeros(0)
+        self.total_commission = 0.0
+        self._order_ids = itertools.count(1)
+        # 已提交的订单，按 client_order_id 查询；重复的 ID 与 Alpaca 一样拒绝
+        self.orders = {}
+        for symbol in symbols:
+            self._idx(symbol)
+
+    # ---------- 标的下标 ----------
+    def _idx(self, symbol):
+        symbol = symbol.upper()
+        i = self.index.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            self.index[symbol] = i
+            self.symbols.append(symbol)
+            if i >= len(self.qty):
+                # 容量翻倍扩展，摊销 O(1)
+                size = max(8, len(self.qty) * 2)
+                self.qty = _grow(self.qty, size)
+                self.avg_cost = _grow(self.avg_cost, size)
+                self.realized = _grow(self.realized, size)
+                self.last_price = _grow(self.last_price, size)
+        return i
+
+    def indices(self, symbols):
+        return np.array([self._idx(s) for s in symbols], dtype=np.int64)
+
+    # ---------- 批量成交 ----------
+    def execute(self, idx, qty, prices, volumes=None):
+        """
+        批量下单（同一批里每个标的最多出现一次）。
+        idx: 标的下标数组；qty: 带符号的数量（正数买、负数卖）；prices: 参考价；volumes: 可选的 K 线成交量。
+        返回实际成交的带符号数量数组。
+        """
+        idx = np.asarray(idx, dtype=np.int64)
+        qty = np.asarray(qty, dtype="float64")
+        prices = np.asarray(prices, dtype="float64")
+        if len(np.unique(idx)) != len(idx):
+            raise ValueError("同一批成交里标的不能重复")
+
+        side = np.sign(qty)
+        fill = np.abs(qty)
+        # 部分成交：受 K 线成交量限制
+        if self.max_volume_pct is not None and volumes is not None:
+            fill = np.minimum(fill, np.floor(np.asarray(volumes, dtype="float64") * self.max_volume_pct))
+        # 不允许卖空
+        fill = np.where(side < 0, np.minimum(fill, self.qty[idx]), fill)
+
+        fill_price = self.slippage(side, prices)
+        fee = self.commission(fill, fill_price)
+
+        # 现金不够时按比例缩减所有买单（向下取整）
+        buy = side > 0
+        cash_in = np.sum((fill * fill_price - fee)[~buy])
+        cash_out = np.sum((fill * fill_price + fee)[buy])
+        available = self.cash + cash_in
+        if cash_out > available and cash_out > 0:
+            scale = max(available, 0.0) / cash_out
+            fill = np.where(buy, np.floor(fill * scale), fill)
+            fee = self.commission(fill, fill_price)
+            cash_out = np.sum((fill * fill_price + fee)[buy])
+
+        signed = side * fill
+        old_qty = self.qty[idx]
+        new_qty = old_qty + signed
+
+        # 买入更新平均成本；卖出结算已实现盈亏（扣手续费）
+        with np.errstate(invalid="ignore", divide="ignore"):
+            buy_avg = np.where(new_qty > 0, (old_qty * self.avg_cost[idx] + fill * fill_price) / new_qty, 0.0)
+        sell_pnl = (fill_price - self.avg_cost[idx]) * fill
+        self.realized[idx] += np.where(buy, 0.0, sell_pnl) - fee
+        self.avg_cost[idx] = np.where(buy, buy_avg, np.where(new_qty > 0, self.avg_cost[idx], 0.0))
+        self.qty[idx] = new_qty
+        self.last_price[idx] = prices
+
+        self.cash += cash_in - cash_out
+        self.total_commission += float(np.sum(fee))
+        return signed
+
+    # ---------- 单笔接口（兼容原 PaperBroker） ----------
+    def buy(self, symbol, price, qty=1):
+        filled = self.execute([self._idx(symbol)], [qty], [price])[0]
+        if filled > 0:
+            print(f"✅ BUY {symbol} x {filled:g} at {price}")
+        else:
+            print(f"⚠️ 现金不足，{symbol} 买入失败")
+        return filled
+
+    def sell(self, symbol, price, qty=None):
+        i = self._idx(symbol)
+        if self.qty[i] <= 0:
+            print(f"⚠️ 没有持有 {symbol}，无法卖出")
+            return 0.0
+        qty = self.qty[i] if qty is None else qty
+        before = self.realized[i]
+        filled = -self.execute([i], [-qty], [price])[0]
+        print(f"💰 SELL {symbol} x {filled:g} at {price}, PnL: {self.realized[i] - before:.2f}")
+        return filled
+
+    def has_position(self, symbol):
+        i = self.index.get(symbol.upper())
+        return i is not None and self.qty[i] > 0
+
+    def get_entry_price(self, symbol):
+        i = self.index.get(symbol.upper())
+        if i is None or self.qty[i] <= 0:
+            return None
+        return float(self.avg_cost[i])
+
+    # ---------- 市值 ----------
+    def update_prices(self, idx, prices):
+        self.last_price[np.asarray(idx, dtype=np.int64)] = prices
+
+    def mark_to_market(self, prices=None):
+        """prices 为按下标排列的价格向量（长度等于标的数），不传则用最近成交价"""
+        n = len(self.symbols)
+        prices = self.last_price[:n] if prices is None else np.asarray(prices, dtype="float64")
+        return self.cash + float(self.qty[:n] @ prices)
+
+    def get_portfolio_value(self, price_map):
+        n = len(self.symbols)
+        prices = self.last_price[:n].copy()
+        for symbol, price in price_map.items():
+            i = self.index.get(symbol.upper())
+            if i is not None:
+                prices[i] = price
+        return self.mark_to_market(prices)
+
+    def realized_pnl(self):
+        return float(self.realized[:len(self.symbols)].sum())
+
+    # ---------- 与 Alpaca TradingClient 相同的接口 ----------
+    def get_all_positions(self):
+        held = np.flatnonzero(self.qty[:len(self.symbols)] > 0)
+        return [
+            LocalPosition(self.symbols[i], float(self.qty[i]), float(self.avg_cost[i]), float(self.last_price[i]))
+            for i in held
+        ]
+
+    def get_account(self):
+        return LocalAccount(self.cash, self.mark_to_market())
+
+    def submit_order(self, order):
+        """按最近价格立即成交的市价单（order 为 MarketOrderRequest）"""
+        client_order_id = getattr(order, "client_order_id", None)
+        if client_order_id is not None and client_order_id in self.orders:
+            raise ValueError(f"client_order_id {client_order_id} 已存在")
+        i = self._idx(order.symbol)
+        side = getattr(order.side, "value", order.side)
+        sign = 1.0 if str(side).lower() == "buy" else -1.0
+        qty = float(order.qty)
+        price = self.last_price[i]
+        if np.isfinite(price) and price > 0:
+            filled = abs(self.execute([i], [sign * qty], [price])[0])
+            fill_price = float(self.slippage(np.array([sign]), np.array([price]))[0])
+        else:
+            # ⚠️ 还没有 update_prices 过的标的没有可用的成交价，直接拒单，不能按 0 元成交
+            filled, fill_price = 0.0, None
+        result = SimulatedOrder(
+            id=str(next(self._order_ids)),
+            client_order_id=client_order_id,
+            symbol=order.symbol.upper(),
+            side=side,
+            qty=qty,
+            filled_qty=filled,
+            filled_avg_price=fill_price if filled > 0 else None,
+        )
+        if client_order_id is not None:
+            self.orders[client_order_id] = result
+        return result
+
+    def get_order_by_client_id(self, client_id):
+        order = self.orders.get(client_id)
+        if order is None:
+            raise KeyError(f"找不到订单 {client_id}")
+        return order
+
+    def get_orders(self, filter=None):
+        """所有带 client_order_id 的订单；filter 为 GetOrdersRequest 时按 symbols 过滤"""
+        symbols = getattr(filter, "symbols", None)
+        orders = list(self.orders.values())
+        if symbols:
+            symbols = {s.upper() for s in symbols}
+            orders = [o for o in orders if o.symbol in symbols]
+        return orders
+
+
+def _grow(arr, size):
+    out = np.zeros(size, dtype=arr.dtype)
+    out[:len(arr)] = arr
+    return out
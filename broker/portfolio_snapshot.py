@@ -0,0 +1,86 @@
+class LocalPosition:
+    """本地持仓记录，字段名与 Alpaca Position 保持一致"""
+
+    def __init__(self, symbol, qty, avg_entry_price, current_price=None):
+        self.symbol = symbol
+        self.qty = qty
+        self.avg_entry_price = avg_entry_price
+        self.current_price = current_price if current_price is not None else avg_entry_price
+
+
+class LocalAccount:
+    def __init__(self, cash, equity):
+        self.cash = cash
+        self.equity = equity
+
+
+class PortfolioSnapshot:
+    """
+    每轮开始时从券商拉一次持仓和账户，按 symbol 建索引，之后的查询都走本地 O(1) 查找；
+    下单成交后用 apply_fill 在本地更新，不再重复请求 get_all_positions / get_account。
+    提供 get_all_positions / get_account，可以直接当 broker 传给风控和日志模块。
+    """
+
+    def __init__(self, trading_client):
+        self.client = trading_client
+        self.positions = {}
+        self.account = None
+
+    def refresh(self):
+        positions = self.client.get_all_positions()
+        self.positions = {p.symbol.upper(): p for p in positions}
+        account = self.client.get_account()
+        self.account = LocalAccount(float(account.cash), float(account.equity))
+        return self
+
+    def has_position(self, symbol):
+        return symbol.upper() in self.positions
+
+    def get_position(self, symbol):
+        return self.positions.get(symbol.upper())
+
+    def symbols(self):
+        return set(self.positions.keys())
+
+    def get_all_positions(self):
+        return list(self.positions.values())
+
+    def get_account(self):
+        return self.account
+
+    def apply_fill(self, symbol, side, qty, price):
+        """成交后本地更新持仓和现金（side: "BUY" / "SELL"）"""
+        symbol = symbol.upper()
+        qty = float(qty)
+        price = float(price)
+        current = self.positions.get(symbol)
+        held = float(current.qty) if current else 0.0
+        avg = float(current.avg_entry_price) if current else 0.0
+
+        if side == "BUY":
+            new_qty = held + qty
+            new_avg = (held * avg + qty * price) / new_qty
+            self.positions[symbol] = LocalPosition(symbol, new_qty, new_avg, price)
+            cash_change = -qty * price
+        else:
+            new_qty = held - qty
+            if new_qty > 0:
+                self.positions[symbol] = LocalPosition(symbol, new_qty, avg, price)
+            else:
+                self.positions.pop(symbol, None)
+            cash_change = qty * price
+
+        if self.account is not None:
+            self.account.cash += cash_change
+
+    def settle_fill(self, symbol, side, qty, expected_price, fill_price):
+        """apply_fill 用的是下单时的价格，成交回报到达后按真实成交价修正持仓成本和现金"""
+        symbol = symbol.upper()
+        diff = (float(fill_price) - float(expected_price)) * float(qty)
+        current = self.positions.get(symbol)
+        if side == "BUY" and current is not None:
+            held = float(current.qty)
+            avg = (held * float(current.avg_entry_price) + diff) / held
+            self.positions[symbol] = LocalPosition(symbol, held, avg, float(fill_price))
+        if self.account is not None:
+            self.account.cash += -diff if side == "BUY" else diff
@@ -0,0 +1,196 @@
+import math
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+
+from data.bar_store import _timeframe_key
+from data.ring_buffer import BAR_FIELDS, VOLUME, BarRing, empty_window, utc_ns
+
+NY = "America/New_York"
+
+
+class BarProvider:
+    """
+    每轮只发一次多标的 K 线请求，然后按 symbol 切片分给各个策略。
+    每个标的的历史放在定长的 BarRing 里（capacity 默认按 days 和周期估算）：每轮只并入新的 K 线，
+    实时推送原地更新最后一根，运行一整天内存占用也不变；get_window 直接返回缓冲里的视图。
+    """
+
+    def __init__(self, data_client, symbols, days=90, timeframe=TimeFrame.Day, store=None, capacity=None):
+        self.client = data_client
+        # 可选的本地 BarStore：有缓存时只增量请求最新的 K 线；data_client 为 None 时完全离线
+        self.store = store
+        self.symbols = [s.upper() for s in symbols]
+        self.days = days
+        self.timeframe = timeframe
+        self.capacity = capacity or _default_capacity(timeframe, days)
+        # 最近一次请求返回的原始 K 线
+        self.bars = pd.DataFrame()
+        self.rings = {}
+        self._frames = {}
+        self.last_refresh = None
+
+    def refresh(self):
+        """拉取所有标的的 K 线（一次请求），并入各标的的缓冲"""
+        if not self.symbols:
+            return self.bars
+
+        end = datetime.now()
+        start = end - timedelta(days=self.days)
+
+        if self.store is not None:
+            if self.client is not None:
+                self.store.sync(self.client, self.symbols, start, self.timeframe, end=end)
+            bars = self.store.load_many(self.symbols, self.timeframe, start=start)
+        else:
+            request = StockBarsRequest(
+                symbol_or_symbols=self.symbols,
+                timeframe=self.timeframe,
+                start=start,
+                end=end,
+            )
+            bars = self.client.get_stock_bars(request).df
+        self.bars = bars
+        self.ingest(bars)
+        self.last_refresh = end
+        print(f"📥 已批量获取 {len(self.rings)} 个标的的 K 线，共 {len(bars)} 条")
+        return bars
+
+    def set_bars(self, bars):
+        """直接注入一份 (symbol, timestamp) MultiIndex 的 K 线，替换已有的数据"""
+        self.bars = bars
+        self.rings = {}
+        self._frames = {}
+        self.ingest(bars)
+
+    def ingest(self, bars):
+        """
+        并入一块 K 线：每个标的只追加比缓冲里最后一根更新的 K 线，
+        与最后一根时间戳相同的覆盖它（如盘中还在变化的当天日线），更早的忽略。
+        """
+        if bars is None or bars.empty:
+            return
+        for symbol, df in bars.groupby(level=0, sort=False):
+            df = df.sort_index(level=-1)
+            ring = self._ring(symbol.upper())
+            ts = utc_ns(df.index.get_level_values(-1))
+            data = df[BAR_FIELDS].to_numpy(dtype="float64")
+            last_ts = ring.last_ts
+            if last_ts is not None:
+                start = int(ts.searchsorted(last_ts, side="left"))
+                if start < len(ts) and ts[start] == last_ts:
+                    ring.set_last(data[start])
+                    start += 1
+                ts, data = ts[start:], data[start:]
+            ring.extend(ts, data)
+
+    def _ring(self, symbol):
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = BarRing(self.capacity)
+        return ring
+
+    def update_bar(self, event):
+        """
+        实时推送的 K 线（BarEvent）原地并入缓冲。日线模式下同一交易日的分钟 K 线合并进当天那根日线，
+        其他周期按时间戳追加或替换最后一根。
+        """
+        ring = self._ring(event.symbol.upper())
+        ts = pd.Timestamp(event.timestamp)
+        ts = (ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")).value
+
+        last_ts = ring.last_ts
+        if last_ts is not None:
+            if self._same_bar(last_ts, ts):
+                # 日线合并当天的分钟 K 线时成交量累加，同一根 K 线的修正取最新的成交量
+                if self._is_daily() and ts != last_ts:
+                    volume = event.volume
+                else:
+                    volume = event.volume - ring.last()[VOLUME]
+                ring.merge_last(event.high, event.low, event.close, volume)
+                return True
+            if ts < last_ts:
+                return False
+
+        if self._is_daily():
+            # 新交易日：按美东日期对齐成当天 0 点，与 Alpaca 日线的时间戳一致
+            ts = _ny_day(ts)
+        ring.append(ts, [event.open, event.high, event.low, event.close, event.volume])
+        return True
+
+    def _is_daily(self):
+        return _timeframe_key(self.timeframe) == _timeframe_key(TimeFrame.Day)
+
+    def _same_bar(self, last_ts, ts):
+        if ts == last_ts:
+            return True
+        return self._is_daily() and _ny_day(last_ts) == _ny_day(ts)
+
+    def _check(self, timeframe):
+        if timeframe is not None and _timeframe_key(timeframe) != _timeframe_key(self.timeframe):
+            raise ValueError(
+                f"BarProvider 只有 {_timeframe_key(self.timeframe)} 的 K 线，其他周期请使用 MultiTimeframeBars"
+            )
+        if self.last_refresh is None and self.bars.empty:
+            self.refresh()
+
+    def get_bars(self, symbol, days=None, timeframe=None):
+        """返回某个标的的 K 线切片（保留 MultiIndex），days 只取最近 N 天；数据没变时复用上次的 DataFrame"""
+        self._check(timeframe)
+        symbol = symbol.upper()
+        ring = self.rings.get(symbol)
+        if ring is None:
+            return self.bars.iloc[0:0]
+
+        cached = self._frames.get(symbol)
+        if cached is None or cached[0] != ring.version:
+            cached = self._frames[symbol] = (ring.version, ring.frame(symbol))
+        df = cached[1]
+        if days is not None:
+            df = df.iloc[len(df) - ring.since(_cutoff_ns(days)):]
+        return df
+
+    def get_window(self, symbol, days=None, timeframe=None):
+        """与 get_bars 相同的区间，但直接返回缓冲里的视图 (时间戳 ns, 字段 5 × n)，不构造 DataFrame"""
+        self._check(timeframe)
+        ring = self.rings.get(symbol.upper())
+        if ring is None:
+            return empty_window()
+        return ring.window(None if days is None else ring.since(_cutoff_ns(days)))
+
+    def nbytes(self):
+        """所有缓冲占用的内存（字节）"""
+        return sum(ring.nbytes for ring in self.rings.values())
+
+
+# 每个日历日最多的 K 线根数（分钟级按盘前到盘后 4:00 - 20:00 共 16 小时算）
+BARS_PER_DAY = {"Min": 16 * 60, "Hour": 16, "Day": 1, "Week": 1 / 5, "Month": 1 / 21}
+
+
+def _default_capacity(timeframe, days):
+    amount, unit = re.fullmatch(r"(\d+)(\D+)", _timeframe_key(timeframe)).groups()
+    return max(math.ceil(days * BARS_PER_DAY.get(unit, 1) / int(amount)) + 1, 2)
+
+
+def _ny_day(ts):
+    # UTC 纳秒 -> 所在美东交易日 0 点（UTC 纳秒）
+    return pd.Timestamp(ts, tz="UTC").tz_convert(NY).normalize().tz_convert("UTC").value
+
+
+def _cutoff_ns(days):
+    # 与 _as_index_time 一致：本地时间的 datetime.now() 按 UTC 对齐
+    return pd.Timestamp(datetime.now() - timedelta(days=days)).tz_localize("UTC").value
+
+
+def _as_index_time(moment, df):
+    # Alpaca 返回的 timestamp 带 UTC 时区，本地 datetime.now() 不带，需要对齐后才能比较
+    ts = pd.Timestamp(moment)
+    tz = getattr(df.index.get_level_values(-1), "tz", None)
+    if tz is not None and ts.tz is None:
+        ts = ts.tz_localize(tz)
+    elif tz is None and ts.tz is not None:
+        ts = ts.tz_localize(None)
+    return ts
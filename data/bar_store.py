@@ -0,0 +1,174 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+
+from data.data_loader import load_csv_bars
+
+BAR_COLUMNS = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+
+
+class BarStore:
+    """
+    本地 K 线缓存：每个 symbol / timeframe 一个目录，每列一个 .npy 文件（可内存映射读取），
+    meta.json 记录行数和最后一根 K 线的时间，增量同步时只向 API 请求这之后的数据。
+    """
+
+    def __init__(self, root="data/cache"):
+        self.root = root
+
+    # ---------- 路径与元数据 ----------
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.root, _timeframe_key(timeframe), symbol.upper())
+
+    def _read_meta(self, symbol, timeframe):
+        path = os.path.join(self._dir(symbol, timeframe), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def last_timestamp(self, symbol, timeframe=TimeFrame.Day):
+        """返回已缓存的最后一根 K 线时间（UTC），没有缓存时返回 None"""
+        meta = self._read_meta(symbol, timeframe)
+        if not meta or not meta.get("rows"):
+            return None
+        return pd.Timestamp(meta["last_timestamp"], tz="UTC")
+
+    # ---------- 读 ----------
+    def _read_columns(self, symbol, timeframe, mmap=True):
+        meta = self._read_meta(symbol, timeframe)
+        if not meta or not meta.get("rows"):
+            return None
+        folder = self._dir(symbol, timeframe)
+        rows = meta["rows"]
+        mode = "r" if mmap else None
+        # 以 meta 中的行数为准，写到一半的列文件多出来的部分直接忽略
+        cols = {"timestamp": np.load(os.path.join(folder, "timestamp.npy"), mmap_mode=mode)[:rows]}
+        for name in meta["columns"]:
+            cols[name] = np.load(os.path.join(folder, f"{name}.npy"), mmap_mode=mode)[:rows]
+        return cols
+
+    def load(self, symbol, timeframe=TimeFrame.Day, start=None, end=None):
+        """读取某个标的的缓存，返回与 Alpaca 相同的 (symbol, timestamp) MultiIndex DataFrame"""
+        symbol = symbol.upper()
+        cols = self._read_columns(symbol, timeframe)
+        if cols is None:
+            return pd.DataFrame()
+
+        ts = cols["timestamp"]
+        lo = 0 if start is None else np.searchsorted(ts, _to_ns(start), side="left")
+        hi = len(ts) if end is None else np.searchsorted(ts, _to_ns(end), side="right")
+
+        index = pd.MultiIndex.from_arrays(
+            [np.full(hi - lo, symbol, dtype=object), pd.to_datetime(np.asarray(ts[lo:hi]), utc=True)],
+            names=["symbol", "timestamp"],
+        )
+        data = {name: np.asarray(col[lo:hi]) for name, col in cols.items() if name != "timestamp"}
+        return pd.DataFrame(data, index=index)
+
+    def load_many(self, symbols, timeframe=TimeFrame.Day, start=None, end=None):
+        frames = [self.load(s, timeframe, start, end) for s in symbols]
+        frames = [f for f in frames if not f.empty]
+        return pd.concat(frames) if frames else pd.DataFrame()
+
+    # ---------- 写 ----------
+    def append(self, symbol, bars, timeframe=TimeFrame.Day):
+        """
+        追加新 K 线。新数据里最早时间之后的旧行会被覆盖
+        （最后一根日线在收盘前会变，重新拉到时要替换掉）。
+        """
+        if bars is None or bars.empty:
+            return 0
+        symbol = symbol.upper()
+
+        new_ts = _to_ns(bars.index.get_level_values(-1))
+        order = np.argsort(new_ts, kind="stable")
+        new_ts = new_ts[order]
+        columns = [c for c in BAR_COLUMNS if c in bars.columns]
+
+        old = self._read_columns(symbol, timeframe, mmap=False)
+        if old is not None:
+            keep = np.searchsorted(old["timestamp"], new_ts[0], side="left")
+            merged = {"timestamp": np.concatenate([old["timestamp"][:keep], new_ts])}
+            for name in columns:
+                old_col = old.get(name, np.full(len(old["timestamp"]), np.nan))
+                new_col = bars[name].to_numpy(dtype="float64")[order]
+                merged[name] = np.concatenate([old_col[:keep], new_col])
+        else:
+            merged = {"timestamp": new_ts}
+            for name in columns:
+                merged[name] = bars[name].to_numpy(dtype="float64")[order]
+
+        folder = self._dir(symbol, timeframe)
+        os.makedirs(folder, exist_ok=True)
+        for name, col in merged.items():
+            np.save(os.path.join(folder, f"{name}.npy"), col)
+
+        # meta 最后写，写入成功才算这次追加生效
+        meta = {
+            "rows": int(len(merged["timestamp"])),
+            "columns": columns,
+            "last_timestamp": pd.Timestamp(int(merged["timestamp"][-1]), tz="UTC").isoformat(),
+        }
+        tmp_path = os.path.join(folder, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(folder, "meta.json"))
+        return len(new_ts)
+
+    def sync(self, client, symbols, start, timeframe=TimeFrame.Day, end=None):
+        """
+        增量补齐缓存：已有缓存的标的从最后一根 K 线开始请求，没有缓存的从 start 开始。
+        同一起点的标的合并成一个多标的请求。
+        """
+        end = end or datetime.now()
+        groups = {}
+        for symbol in symbols:
+            last = self.last_timestamp(symbol, timeframe)
+            # 最后一根 K 线可能还没收盘，从它开始重新拉一次
+            fetch_from = last.tz_localize(None).to_pydatetime() if last is not None else start
+            groups.setdefault(fetch_from, []).append(symbol.upper())
+
+        fetched = 0
+        for fetch_from, group in groups.items():
+            request = StockBarsRequest(
+                symbol_or_symbols=group,
+                timeframe=timeframe,
+                start=fetch_from,
+                end=end,
+            )
+            bars = client.get_stock_bars(request).df
+            if bars.empty:
+                continue
+            for sym, df in bars.groupby(level=0, sort=False):
+                fetched += self.append(sym, df, timeframe)
+        print(f"💾 K 线缓存已同步：{len(groups)} 次请求，新增/更新 {fetched} 条")
+        return fetched
+
+    def import_csv(self, symbol, file_path, timeframe=TimeFrame.Day):
+        """把本地 CSV 导入缓存（离线回测用），按列式解析，不再逐行构造 dict"""
+        bars = load_csv_bars(file_path, symbol=symbol, cache_root=None)
+        if bars.empty:
+            return 0
+        return self.append(symbol, bars, timeframe)
+
+
+def _to_ns(value):
+    # 统一转成 UTC 纳秒整数，naive 时间按 UTC 处理（与 Alpaca 请求一致）
+    if isinstance(value, (pd.DatetimeIndex, pd.Index)):
+        idx = pd.DatetimeIndex(value)
+        idx = idx.tz_localize("UTC") if idx.tz is None else idx.tz_convert("UTC")
+        return idx.tz_localize(None).values.astype("datetime64[ns]").view("int64").copy()
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+def _timeframe_key(timeframe):
+    # TimeFrame.Day -> "1Day"；也允许直接传字符串
+    return getattr(timeframe, "value", None) or str(timeframe)
@@ -1,4 +1,10 @@
 import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
 
 def load_csv_data(file_path):
     with open(file_path, newline='') as csvfile:
@@ -15,3 +21,199 @@ def load_csv_data(file_path):
             for row in reader
         ]
     return data
+
+
+# ---------- 列式读取：按块解析成带类型的 NumPy 数组 ----------
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+DATE_NAMES = ("date", "datetime", "timestamp", "time")
+COLUMN_DTYPES = {
+    "timestamp": "int64",   # UTC 纳秒
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "int64",
+    "symbol": "int32",      # 标的编码，对应 meta 里的 symbols 列表
+}
+
+
+def _header(file_path):
+    """CSV 表头（不区分大小写）-> 原始列名"""
+    names = pd.read_csv(file_path, nrows=0).columns
+    lower = {str(n).strip().lower(): n for n in names}
+    date_col = next((lower[n] for n in DATE_NAMES if n in lower), None)
+    if date_col is None:
+        raise ValueError(f"{file_path} 没有日期列（{', '.join(DATE_NAMES)}）")
+    mapping = {"timestamp": date_col}
+    for name in PRICE_COLUMNS + ["volume", "symbol"]:
+        if name in lower:
+            mapping[name] = lower[name]
+    return mapping
+
+
+def iter_csv_columns(file_path, chunksize=500_000):
+    """
+    流式读取 CSV：每次解析 chunksize 行，产出 {列名: NumPy 数组}。
+    时间为 UTC 纳秒整数（naive 时间按 UTC 处理），价格 float64，成交量 int64，
+    有 Symbol 列时产出 "symbol"（字符串数组）。内存占用只与 chunksize 有关，可以处理比内存大的文件。
+    """
+    mapping = _header(file_path)
+    dtypes = {mapping[n]: "float64" for n in PRICE_COLUMNS + ["volume"] if n in mapping}
+    if "symbol" in mapping:
+        dtypes[mapping["symbol"]] = "str"
+    reader = pd.read_csv(
+        file_path,
+        usecols=list(mapping.values()),
+        dtype=dtypes,
+        chunksize=chunksize,
+        engine="c",
+    )
+    for chunk in reader:
+        ts = pd.to_datetime(chunk[mapping["timestamp"]], utc=True)
+        cols = {"timestamp": ts.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").view("int64")}
+        for name in PRICE_COLUMNS:
+            if name in mapping:
+                cols[name] = chunk[mapping[name]].to_numpy(dtype="float64")
+        if "volume" in mapping:
+            cols["volume"] = chunk[mapping["volume"]].fillna(0).to_numpy(dtype="float64").astype("int64")
+        if "symbol" in mapping:
+            cols["symbol"] = chunk[mapping["symbol"]].str.upper().to_numpy()
+        yield cols
+
+
+def iter_csv_bars(file_path, symbol=None, chunksize=500_000):
+    """流式读取，每块产出与 Alpaca 相同的 (symbol, timestamp) MultiIndex DataFrame"""
+    for cols in iter_csv_columns(file_path, chunksize):
+        yield _to_bars(cols, symbol)
+
+
+def load_csv_columns(file_path, cache_root="data/cache/csv", chunksize=500_000):
+    """
+    读取整份 CSV 的列式数组。第一次读取时边解析边把每列追加写成二进制文件，
+    之后（源文件大小和修改时间不变）直接内存映射返回，几乎不耗时也不占内存。
+    cache_root=None 时不缓存，直接拼接各块。
+    """
+    if cache_root is None:
+        chunks = list(iter_csv_columns(file_path, chunksize))
+        if not chunks:
+            return {}
+        return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+    folder = _cache_dir(file_path, cache_root)
+    stat = os.stat(file_path)
+    meta = _read_meta(folder)
+    if not meta or meta["size"] != stat.st_size or meta["mtime"] != stat.st_mtime:
+        meta = _build_cache(file_path, folder, stat, chunksize)
+    return _open_cache(folder, meta)
+
+
+def load_csv_bars(file_path, symbol=None, cache_root="data/cache/csv", start=None, end=None):
+    """
+    读取 CSV 为 (symbol, timestamp) MultiIndex DataFrame，可直接交给 BarProvider.set_bars、
+    策略和回测。文件没有 Symbol 列时用 symbol 参数（默认取文件名）。
+    start / end 在内存映射数组上二分查找，只物化需要的区间（要求时间有序）。
+    """
+    cols = load_csv_columns(file_path, cache_root)
+    if not cols:
+        return pd.DataFrame()
+    if symbol is None and "symbol" not in cols:
+        symbol = os.path.splitext(os.path.basename(file_path))[0]
+
+    ts = cols["timestamp"]
+    lo, hi = 0, len(ts)
+    if start is not None or end is not None:
+        lo = 0 if start is None else int(np.searchsorted(ts, _utc_ns(start), side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _utc_ns(end), side="right"))
+    return _to_bars({name: col[lo:hi] for name, col in cols.items()}, symbol)
+
+
+def _utc_ns(value):
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+def _to_bars(cols, symbol=None):
+    n = len(cols["timestamp"])
+    if "symbol" in cols:
+        symbols = np.asarray(cols["symbol"], dtype=object)
+    else:
+        symbols = np.full(n, (symbol or "").upper(), dtype=object)
+    index = pd.MultiIndex.from_arrays(
+        [symbols, pd.to_datetime(np.asarray(cols["timestamp"]), utc=True)],
+        names=["symbol", "timestamp"],
+    )
+    data = {name: np.asarray(cols[name]) for name in PRICE_COLUMNS + ["volume"] if name in cols}
+    return pd.DataFrame(data, index=index)
+
+
+# ---------- 二进制缓存：每列一个原始二进制文件 + meta.json ----------
+def _cache_dir(file_path, cache_root):
+    path = os.path.abspath(file_path)
+    digest = hashlib.md5(path.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(cache_root, f"{os.path.basename(path)}-{digest}")
+
+
+def _read_meta(folder):
+    path = os.path.join(folder, "meta.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _build_cache(file_path, folder, stat, chunksize):
+    os.makedirs(folder, exist_ok=True)
+    meta_path = os.path.join(folder, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    rows = 0
+    columns = None
+    symbol_codes = {}
+    files = {}
+    try:
+        for cols in iter_csv_columns(file_path, chunksize):
+            if "symbol" in cols:
+                # 标的字符串编码成 int32，缓存里只存编码
+                uniques, inverse = np.unique(cols["symbol"], return_inverse=True)
+                codes = np.array([symbol_codes.setdefault(s, len(symbol_codes)) for s in uniques], dtype="int32")
+                cols["symbol"] = codes[inverse]
+            if columns is None:
+                columns = list(cols)
+                files = {name: open(os.path.join(folder, f"{name}.bin"), "wb") for name in columns}
+            for name in columns:
+                np.ascontiguousarray(cols[name], dtype=COLUMN_DTYPES[name]).tofile(files[name])
+            rows += len(cols["timestamp"])
+    finally:
+        for f in files.values():
+            f.close()
+
+    # meta 最后写，写入成功才算缓存有效
+    meta = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "rows": rows,
+        "columns": columns or [],
+        "symbols": list(symbol_codes),
+    }
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    print(f"💾 已缓存 {os.path.basename(file_path)}：{rows} 行")
+    return meta
+
+
+def _open_cache(folder, meta):
+    rows = meta["rows"]
+    if not rows:
+        return {}
+    cols = {}
+    for name in meta["columns"]:
+        path = os.path.join(folder, f"{name}.bin")
+        cols[name] = np.memmap(path, dtype=COLUMN_DTYPES[name], mode="r", shape=(rows,))
+    if "symbol" in cols:
+        # 标的编码还原成字符串（按需物化，只在有 Symbol 列时发生）
+        cols["symbol"] = np.asarray(meta["symbols"], dtype=object)[cols["symbol"]]
+    return cols
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from data.bar_provider import _as_index_time
+
+
+class _BarSet:
+    def __init__(self, df):
+        self.df = df
+
+
+class _Trade:
+    def __init__(self, symbol, price, timestamp):
+        self.symbol = symbol
+        self.price = price
+        self.timestamp = timestamp
+
+
+class FakeDataClient:
+    """本地假数据客户端，接口与 StockHistoricalDataClient 一致，用于离线测试"""
+
+    def __init__(self, bars):
+        # bars: (symbol, timestamp) MultiIndex 的 DataFrame，列与 Alpaca 相同
+        self.bars = bars
+        self.calls = 0
+
+    def get_stock_bars(self, request):
+        self.calls += 1
+        symbols = request.symbol_or_symbols
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        df = self.bars[self.bars.index.get_level_values(0).isin(symbols)]
+        times = df.index.get_level_values(-1)
+        if getattr(request, "start", None) is not None:
+            df = df[times >= _as_index_time(request.start, df)]
+            times = df.index.get_level_values(-1)
+        if getattr(request, "end", None) is not None:
+            df = df[times <= _as_index_time(request.end, df)]
+        return _BarSet(df.copy() if not df.empty else pd.DataFrame())
+
+    def get_stock_latest_trade(self, request):
+        """每个标的最后一根 K 线的收盘价当作最新成交价"""
+        self.calls += 1
+        symbols = request.symbol_or_symbols
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        df = self.bars[self.bars.index.get_level_values(0).isin([s.upper() for s in symbols])]
+        last = df.groupby(level=0, sort=False).tail(1)
+        return {
+            sym: _Trade(sym, float(close), ts)
+            for (sym, ts), close in zip(last.index, last["close"].to_numpy())
+        }
@@ -0,0 +1,277 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+
+from data.bar_provider import NY, _as_index_time, _cutoff_ns, _default_capacity, _ny_day
+from data.bar_store import _timeframe_key
+from data.ring_buffer import BAR_FIELDS, CLOSE, HIGH, LOW, OPEN, VOLUME, BarRing, empty_window, utc_ns
+
+BASE_TIMEFRAME = "1Min"
+# 分钟级周期的长度（纳秒）；1Day 按美东交易日切分，与 Alpaca 日线的时间戳一致
+TIMEFRAME_NS = {
+    "1Min": 60 * 10**9,
+    "5Min": 5 * 60 * 10**9,
+    "15Min": 15 * 60 * 10**9,
+    "1Hour": 60 * 60 * 10**9,
+}
+TIMEFRAMES = ("1Min", "5Min", "15Min", "1Hour", "1Day")
+
+# 每个周期至少保留的 K 线数（按正常交易时段约 5 / 10 / 20 / 50 / 250 个交易日）；
+# 实际容量还会按 days 天的盘前盘后 K 线数放大，保证第一次拉取的数据放得下
+DEFAULT_CAPACITY = {"1Min": 1950, "5Min": 780, "15Min": 520, "1Hour": 350, "1Day": 250}
+# 分钟 K 线可能延迟发布（如免费行情延迟 15 分钟），每次都重新请求上次请求结束前这一段
+FEED_DELAY = timedelta(minutes=15)
+
+
+def _bucket(ts, timeframe):
+    """一根分钟 K 线（UTC 纳秒）所属的周期起点"""
+    if timeframe == "1Day":
+        return _ny_day(ts)
+    step = TIMEFRAME_NS[timeframe]
+    return ts - ts % step
+
+
+def _buckets(ts, timeframe):
+    """_bucket 的向量化版本"""
+    if timeframe == "1Day":
+        return pd.DatetimeIndex(ts, tz="UTC").tz_convert(NY).normalize().tz_convert("UTC").asi8
+    step = TIMEFRAME_NS[timeframe]
+    return ts - ts % step
+
+
+class SymbolBars:
+    """一个标的的分钟 K 线和由它聚合出的各周期 K 线，新分钟 K 线到来时增量更新所有周期"""
+
+    def __init__(self, symbol, timeframes, capacity):
+        self.symbol = symbol
+        self.buffers = {tf: BarRing(capacity[tf]) for tf in timeframes}
+        self.derived = [tf for tf in timeframes if tf != BASE_TIMEFRAME]
+        self._frames = {}
+
+    @property
+    def last_ts(self):
+        return self.buffers[BASE_TIMEFRAME].last_ts
+
+    def update(self, ts, bar):
+        """
+        并入一根分钟 K 线。时间戳与最后一根相同视为修正（Alpaca 的 updatedBars），早于最后一根则忽略。
+        各周期的最后一根：最高 / 最低取极值、收盘取最新、成交量累加。
+        """
+        base = self.buffers[BASE_TIMEFRAME]
+        last_ts = base.last_ts
+        if last_ts is not None and ts < last_ts:
+            return False
+        if ts == last_ts:
+            # 修正时成交量只加差值；最高 / 最低只会扩大，不会因为修正而收窄
+            volume = bar[VOLUME] - base.last()[VOLUME]
+            base.set_last(bar)
+        else:
+            volume = bar[VOLUME]
+            base.append(ts, bar)
+
+        for tf in self.derived:
+            buf = self.buffers[tf]
+            bucket = _bucket(ts, tf)
+            if buf.last_ts == bucket:
+                buf.merge_last(bar[HIGH], bar[LOW], bar[CLOSE], volume)
+            elif buf.last_ts is None or bucket > buf.last_ts:
+                buf.append(bucket, bar)
+        return True
+
+    def extend(self, ts, data):
+        """
+        批量并入分钟 K 线（ts 升序），所有周期一次向量化聚合。
+        与最后一根相同的时间戳按修正处理，早于最后一根的忽略；
+        聚合出的第一根如果和已有的最后一根是同一个周期，合并进去。
+        """
+        last_ts = self.last_ts
+        if last_ts is not None:
+            keep = ts >= last_ts
+            ts, data = ts[keep], data[keep]
+            if len(ts) and ts[0] == last_ts:
+                self.update(int(ts[0]), data[0])
+                ts, data = ts[1:], data[1:]
+        if not len(ts):
+            return
+
+        self.buffers[BASE_TIMEFRAME].extend(ts, data)
+        for tf in self.derived:
+            buf = self.buffers[tf]
+            buckets = _buckets(ts, tf)
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(ts)] - 1
+            agg = np.column_stack([
+                data[starts, OPEN],
+                np.maximum.reduceat(data[:, HIGH], starts),
+                np.minimum.reduceat(data[:, LOW], starts),
+                data[ends, CLOSE],
+                np.add.reduceat(data[:, VOLUME], starts),
+            ])
+            buckets = buckets[starts]
+            if buf.last_ts == buckets[0]:
+                buf.merge_last(agg[0, HIGH], agg[0, LOW], agg[0, CLOSE], agg[0, VOLUME])
+                buckets, agg = buckets[1:], agg[1:]
+            if len(buckets):
+                buf.extend(buckets, agg)
+
+    def frame(self, timeframe):
+        """某个周期的 K 线，(symbol, timestamp) MultiIndex，与 Alpaca 返回的格式相同；数据没变时直接复用"""
+        buf = self.buffers[timeframe]
+        cached = self._frames.get(timeframe)
+        if cached is not None and cached[0] == buf.version:
+            return cached[1]
+        df = buf.frame(self.symbol)
+        self._frames[timeframe] = (buf.version, df)
+        return df
+
+
+class MultiTimeframeBars:
+    """
+    分钟 K 线数据源：每轮只发一次多标的分钟 K 线请求（第一次拉最近 days 天，之后只拉上次之后的），
+    在本地增量聚合出 5Min / 15Min / 1Hour / 1Day，策略选周期不需要额外的 API 调用。
+    每个标的每个周期最多保留 capacity 根（环形缓冲），内存占用与运行时长无关；
+    capacity 必须放得下 days 天的 K 线，否则直接报错，而不是悄悄丢掉最早的数据。
+    接口与 BarProvider 相同，可以直接交给策略、main.py 和回测：
+        get_bars(symbol, days=None, timeframe=None)，timeframe 不传时用 self.timeframe；
+        get_window(...) 参数相同，返回缓冲里的零拷贝视图。
+    """
+
+    def __init__(self, data_client, symbols, days=5, timeframe="1Day", timeframes=TIMEFRAMES, capacity=None):
+        self.client = data_client
+        self.symbols = [s.upper() for s in symbols]
+        self.days = days
+        self.timeframes = [BASE_TIMEFRAME] + [_timeframe_key(tf) for tf in timeframes if _timeframe_key(tf) != BASE_TIMEFRAME]
+        self.timeframe = self._check(timeframe)
+        self.capacity = self._capacity(capacity or {})
+        self.by_symbol = {}
+        # 每个标的上一次请求的结束时间，下次从这里（或它最后一根 K 线）接着拉
+        self.fetched = {}
+        self.last_refresh = None
+
+    def _capacity(self, capacity):
+        result = {}
+        for tf in self.timeframes:
+            need = _default_capacity(tf, self.days)
+            if tf in capacity:
+                if capacity[tf] < need:
+                    raise ValueError(f"{tf} 的 capacity={capacity[tf]} 放不下 {self.days} 天的 K 线（至少 {need}）")
+                result[tf] = capacity[tf]
+            else:
+                result[tf] = max(DEFAULT_CAPACITY.get(tf, need), need)
+        return result
+
+    def _check(self, timeframe):
+        key = _timeframe_key(timeframe)
+        if key not in self.timeframes:
+            raise ValueError(f"不支持的周期 {key}，可选：{self.timeframes}")
+        return key
+
+    def _symbol(self, symbol):
+        bars = self.by_symbol.get(symbol)
+        if bars is None:
+            bars = self.by_symbol[symbol] = SymbolBars(symbol, self.timeframes, self.capacity)
+        return bars
+
+    def _start(self, symbol, end):
+        """
+        某个标的这次请求的起点：从没请求过的拉最近 days 天；
+        否则从最后一根 K 线开始（这根会作为修正重新并入），但不早于上次请求结束前 FEED_DELAY，
+        长时间没有成交的标的不会拖着每轮都重新拉一大段。
+        """
+        fetched = self.fetched.get(symbol)
+        if fetched is None:
+            return end - timedelta(days=self.days)
+        start = fetched - FEED_DELAY
+        bars = self.by_symbol.get(symbol)
+        if bars is not None and bars.last_ts is not None:
+            start = max(start, pd.Timestamp(bars.last_ts, tz="UTC").tz_localize(None).to_pydatetime())
+        return start
+
+    def refresh(self):
+        """拉取所有标的上次之后的分钟 K 线，同一起点的标的合并成一个多标的请求，并入各周期"""
+        if not self.symbols:
+            return pd.DataFrame()
+
+        end = datetime.now()
+        groups = {}
+        for symbol in self.symbols:
+            groups.setdefault(self._start(symbol, end), []).append(symbol)
+
+        chunks = []
+        for start, group in groups.items():
+            request = StockBarsRequest(
+                symbol_or_symbols=group,
+                timeframe=TimeFrame.Minute,
+                start=start,
+                end=end,
+            )
+            bars = self.client.get_stock_bars(request).df
+            self.ingest(bars)
+            chunks.append(bars)
+            for symbol in group:
+                self.fetched[symbol] = end
+        self.last_refresh = end
+
+        bars = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+        print(f"📥 已获取 {len(self.symbols)} 个标的的分钟 K 线（{len(groups)} 次请求），共 {len(bars)} 条")
+        return bars
+
+    def ingest(self, bars):
+        """并入一块 (symbol, timestamp) MultiIndex 的分钟 K 线"""
+        if bars is None or bars.empty:
+            return
+        for symbol, df in bars.groupby(level=0, sort=False):
+            df = df.sort_index(level=-1)
+            ts = utc_ns(df.index.get_level_values(-1))
+            self._symbol(symbol.upper()).extend(ts, df[BAR_FIELDS].to_numpy(dtype="float64"))
+
+    def update_bar(self, event):
+        """实时推送的分钟 K 线（BarEvent）并入所有周期"""
+        symbol = event.symbol.upper()
+        ts = pd.Timestamp(event.timestamp)
+        ts = (ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")).value
+        bar = np.array([event.open, event.high, event.low, event.close, event.volume])
+        return self._symbol(symbol).update(ts, bar)
+
+    def get_bars(self, symbol, days=None, timeframe=None):
+        """返回某个标的某个周期的 K 线（保留 MultiIndex），days 只取最近 N 天"""
+        if self.last_refresh is None and not self.by_symbol:
+            self.refresh()
+
+        timeframe = self._check(timeframe or self.timeframe)
+        bars = self.by_symbol.get(symbol.upper())
+        if bars is None:
+            return pd.DataFrame(columns=BAR_FIELDS)
+
+        df = bars.frame(timeframe)
+        if days is not None and not df.empty:
+            start = _as_index_time(datetime.now() - timedelta(days=days), df)
+            df = df.iloc[df.index.get_level_values(-1).searchsorted(start):]
+        return df
+
+    def get_window(self, symbol, days=None, timeframe=None):
+        """
+        与 get_bars 相同的区间，但直接返回环形缓冲里的视图 (时间戳 ns, 字段 5 × n)，不构造 DataFrame。
+        """
+        if self.last_refresh is None and not self.by_symbol:
+            self.refresh()
+
+        timeframe = self._check(timeframe or self.timeframe)
+        bars = self.by_symbol.get(symbol.upper())
+        if bars is None:
+            return empty_window()
+        buf = bars.buffers[timeframe]
+        return buf.window(None if days is None else buf.since(_cutoff_ns(days)))
+
+    @property
+    def bars(self):
+        """所有标的默认周期的 K 线拼成一块，与 BarProvider.bars 相同"""
+        frames = [bars.frame(self.timeframe) for bars in self.by_symbol.values()]
+        return pd.concat(frames) if frames else pd.DataFrame(columns=BAR_FIELDS)
+
+    def nbytes(self):
+        """所有缓冲占用的内存（字节）"""
+        return sum(buf.nbytes for bars in self.by_symbol.values() for buf in bars.buffers.values())
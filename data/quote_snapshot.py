@@ -0,0 +1,40 @@
+import time
+
+from alpaca.data.requests import StockLatestTradeRequest
+
+
+class QuoteSnapshot:
+    """
+    每轮一次批量请求所有标的的最新成交价，之后从内存读取。
+    超过 ttl 秒的价格视为过期，读取时会单独重新请求该标的。
+    """
+
+    def __init__(self, data_client, symbols, ttl=30):
+        self.client = data_client
+        self.symbols = [s.upper() for s in symbols]
+        self.ttl = ttl
+        self.prices = {}  # symbol -> (price, 获取时间)
+
+    def refresh(self, symbols=None):
+        symbols = [s.upper() for s in (symbols or self.symbols)]
+        if not symbols:
+            return self.prices
+        request = StockLatestTradeRequest(symbol_or_symbols=symbols)
+        response = self.client.get_stock_latest_trade(request)
+        now = time.monotonic()
+        for sym, trade in response.items():
+            self.prices[sym.upper()] = (float(trade.price), now)
+        print(f"💹 已批量获取 {len(response)} 个标的的最新成交价")
+        return self.prices
+
+    def update(self, symbol, price):
+        """外部推送的价格（如实时成交流）直接写入快照"""
+        self.prices[symbol.upper()] = (float(price), time.monotonic())
+
+    def get_price(self, symbol):
+        symbol = symbol.upper()
+        cached = self.prices.get(symbol)
+        if cached is None or time.monotonic() - cached[1] > self.ttl:
+            self.refresh([symbol])
+            cached = self.prices[symbol]
+        return cached[0]
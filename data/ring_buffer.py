@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+BAR_FIELDS = ["open", "high", "low", "close", "volume"]
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+
+def utc_ns(times):
+    """时间索引 -> UTC 纳秒 int64 数组（不带时区的按 UTC 处理）"""
+    times = pd.DatetimeIndex(times)
+    if times.tz is None:
+        times = times.tz_localize("UTC")
+    return times.tz_convert("UTC").as_unit("ns").asi8
+
+
+def bar_arrays(bars, field="close"):
+    """(symbol, timestamp) K 线 -> (UTC 纳秒时间戳, 某个字段) 两个数组，格式与 BarRing.window 相同"""
+    if bars is None or bars.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    return utc_ns(bars.index.get_level_values(-1)), bars[field].to_numpy(dtype="float64")
+
+
+def empty_window():
+    """没有数据时与 BarRing.window 格式相同的空结果"""
+    return np.empty(0, dtype=np.int64), np.empty((len(BAR_FIELDS), 0))
+
+
+class BarRing:
+    """
+    单个标的的定长 OHLCV 环形缓冲：时间戳（UTC 纳秒）和 5 个字段都是预先分配好的 NumPy 数组，
+    最多保留 capacity 根，写满后覆盖最旧的；不管运行多久、写入多少根，占用的内存都不变。
+
+    每根 K 线写两份（位置 i 和 i + capacity），所以最近 n 根永远是一段连续内存，
+    window / times / column 返回的都是视图，不复制、不为每根 K 线创建 Python 对象，
+    可以直接交给指标计算。数据按字段存放（5 × 2capacity），单个字段（如收盘价）的窗口也是连续的。
+    视图会随之后的写入变化，需要保留时自行 copy。
+    """
+
+    __slots__ = ("capacity", "ts", "data", "head", "size", "version")
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"capacity 必须大于 0：{capacity}")
+        self.capacity = int(capacity)
+        self.ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self.data = np.zeros((len(BAR_FIELDS), 2 * self.capacity))
+        # 下一根写入的位置（0 ~ capacity - 1）和当前根数
+        self.head = 0
+        self.size = 0
+        # 每次写入加 1，用来判断由它生成的缓存（如 DataFrame）是否过期
+        self.version = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.data.nbytes
+
+    @property
+    def last_ts(self):
+        return int(self.ts[self.head + self.capacity - 1]) if self.size else None
+
+    def last(self):
+        """最后一根 K 线（副本，修改请用 set_last / merge_last）"""
+        return self.data[:, self.head + self.capacity - 1].copy()
+
+    def _write(self, pos, ts, bar):
+        self.ts[pos] = self.ts[pos + self.capacity] = ts
+        self.data[:, pos] = self.data[:, pos + self.capacity] = bar
+
+    def append(self, ts, bar):
+        self._write(self.head, ts, bar)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.version += 1
+
+    def extend(self, ts, data):
+        """批量追加（ts 升序，data 为 n × 5），超过 capacity 时只保留最后 capacity 根"""
+        ts = np.asarray(ts, dtype=np.int64)[-self.capacity:]
+        data = np.asarray(data, dtype="float64")[-self.capacity:]
+        n = len(ts)
+        if not n:
+            return
+        pos = (self.head + np.arange(n)) % self.capacity
+        self._write(pos, ts, data.T)
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        self.version += 1
+
+    def set_last(self, bar):
+        """整体替换最后一根（同一时间戳的修正）"""
+        self._write((self.head - 1) % self.capacity, self.last_ts, bar)
+        self.version += 1
+
+    def merge_last(self, high, low, close, volume):
+        """把同一周期内的新数据并入最后一根：最高 / 最低取极值，收盘取最新，volume 为成交量增量"""
+        bar = self.last()
+        bar[HIGH] = max(bar[HIGH], high)
+        bar[LOW] = min(bar[LOW], low)
+        bar[CLOSE] = close
+        bar[VOLUME] += volume
+        self.set_last(bar)
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.version += 1
+
+    # ---------- 零拷贝视图 ----------
+    def _span(self, n):
+        n = self.size if n is None else max(min(int(n), self.size), 0)
+        end = self.head + self.capacity
+        return end - n, end
+
+    def window(self, n=None):
+        """最近 n 根（默认全部）：(时间戳 n, 字段 5 × n) 两个视图，按时间升序"""
+        start, end = self._span(n)
+        return self.ts[start:end], self.data[:, start:end]
+
+    def times(self, n=None):
+        start, end = self._span(n)
+        return self.ts[start:end]
+
+    def column(self, field, n=None):
+        """单个字段最近 n 根的连续视图，field 为 "close" 或 CLOSE 这样的下标"""
+        start, end = self._span(n)
+        row = BAR_FIELDS.index(field) if isinstance(field, str) else field
+        return self.data[row, start:end]
+
+    def values(self, n=None):
+        """n × 5 的视图（与 DataFrame 的行列方向一致）"""
+        start, end = self._span(n)
+        return self.data[:, start:end].T
+
+    def since(self, ts):
+        """时间戳 >= ts 的 K 线根数，配合 window(n) 按时间截取"""
+        times = self.times()
+        return len(times) - int(times.searchsorted(ts, side="left"))
+
+    def frame(self, symbol):
+        """复制成 (symbol, timestamp) MultiIndex DataFrame，与 Alpaca 返回的格式相同"""
+        times, data = self.window()
+        index = pd.MultiIndex.from_arrays(
+            [np.full(len(times), symbol, dtype=object), pd.DatetimeIndex(times, tz="UTC")],
+            names=["symbol", "timestamp"],
+        )
+        return pd.DataFrame(data.T, index=index, columns=BAR_FIELDS, copy=True)
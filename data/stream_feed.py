@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+
+class TradeEvent:
+    def __init__(self, symbol, price, timestamp):
+        self.symbol = symbol.upper()
+        self.price = float(price)
+        self.timestamp = timestamp
+
+
+class BarEvent:
+    def __init__(self, symbol, timestamp, open, high, low, close, volume):
+        self.symbol = symbol.upper()
+        self.timestamp = timestamp
+        self.open = float(open)
+        self.high = float(high)
+        self.low = float(low)
+        self.close = float(close)
+        self.volume = float(volume)
+
+
+class AlpacaStreamFeed:
+    """
+    Alpaca websocket 实时推送（成交 + 分钟 K 线）。
+    SDK 的 StockDataStream 自带阻塞事件循环，放到后台线程里跑，
+    收到的数据通过 call_soon_threadsafe 转进当前 asyncio 循环的队列。
+    """
+
+    def __init__(self, api_key, api_secret, symbols, trades=True, bars=True):
+        from alpaca.data.live import StockDataStream
+
+        self.stream = StockDataStream(api_key, api_secret)
+        self.symbols = [s.upper() for s in symbols]
+        self.trades = trades
+        self.bars = bars
+
+    async def events(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        async def on_trade(trade):
+            loop.call_soon_threadsafe(queue.put_nowait, TradeEvent(trade.symbol, trade.price, trade.timestamp))
+
+        async def on_bar(bar):
+            event = BarEvent(bar.symbol, bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume)
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        if self.trades:
+            self.stream.subscribe_trades(on_trade, *self.symbols)
+        if self.bars:
+            self.stream.subscribe_bars(on_bar, *self.symbols)
+
+        thread = threading.Thread(target=self.stream.run, daemon=True)
+        thread.start()
+        print(f"📡 已订阅实时行情：{self.symbols}")
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.stream.stop()
+
+
+class ReplayFeed:
+    """
+    本地回放：把 (symbol, timestamp) MultiIndex 的 K 线按时间顺序推送出来，代替 Alpaca 实时流。
+    每根 K 线先推一笔收盘价成交，再推这根 K 线；speed=0 表示不等待，尽快回放。
+    """
+
+    def __init__(self, bars, speed=0.0):
+        self.bars = bars
+        self.speed = speed
+
+    async def events(self):
+        if self.bars is None or self.bars.empty:
+            return
+        ordered = self.bars.sort_index(level=-1, kind="stable")
+        last_ts = None
+        for (symbol, ts), row in zip(ordered.index, ordered.itertuples(index=False)):
+            if self.speed and last_ts is not None and ts != last_ts:
+                await asyncio.sleep((ts - last_ts).total_seconds() / self.speed)
+            last_ts = ts
+            yield TradeEvent(symbol, row.close, ts)
+            yield BarEvent(symbol, ts, row.open, row.high, row.low, row.close, row.volume)
+            # 让出控制权，模拟网络推送
+            await asyncio.sleep(0)
@@ -1,37 +1,50 @@
+import argparse
+import asyncio
 import os
+import tempfile
 from utils.logger import log_pnl
 
 from strategies.sma_strategy import SMAStrategy
 from strategies.rsi_strategy import RSIStrategy
 from strategies.hybrid_strategy import HybridStrategy
+from strategies.ensemble import StrategyEnsemble
 
 from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockLatestTradeRequest
+from alpaca.data.timeframe import TimeFrame
 from config import API_KEY, API_SECRET, BASE_URL
 from risk.basic_risk import BasicRiskManager
+from risk.position_sizing import PositionSizer
 from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce
 from backtest.plot import backtest_and_plot
-from utils.logger import log_trade, clean_old_logs, log_pnl
+from backtest.render_queue import RenderQueue
+from broker.order_manager import OrderManager
+from broker.portfolio_broker import PortfolioBroker
+from broker.portfolio_snapshot import PortfolioSnapshot
+from data.bar_provider import BarProvider
+from data.bar_store import BarStore
+from data.multi_timeframe import TIMEFRAMES, MultiTimeframeBars
+from data.quote_snapshot import QuoteSnapshot
+from data.stream_feed import AlpacaStreamFeed, BarEvent, ReplayFeed, TradeEvent
+from utils.logger import log_trade, clean_old_logs_daily, log_pnl, start_async_logging, add_log_sink, remove_log_sink, flush_logs
+from utils.trade_store import TradeStore
+from utils.metrics import InstrumentedClient, metrics, profile_cycle
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 from utils.notifier import send_notification
 
-# 1. 初始化交易客户端（用于下单）
-trading_client = TradingClient(API_KEY, API_SECRET, paper=True)
+# 交易 / 盈亏日志目录（回放模式改为临时目录）
+LOG_DIR = "logs"
 
-# 2. 初始化数据客户端（用于获取价格）
-data_client = StockHistoricalDataClient(API_KEY, API_SECRET)
+# 运行时组件都由 build() 创建。模块本身只定义函数和常量，被导入时（基准测试、
+# 画图子进程以 spawn 方式重新导入 __main__）不创建客户端、不打开交易库、不注册日志 sink
+trading_client = data_client = None
+risk = sizer = portfolio = None
+SYMBOLS = []
+bar_store = bar_provider = strategy = ensemble = quotes = None
+trade_store = render_queue = order_manager = None
 
-# 3. 初始化策略（根据你需要可以切换）
-# strategy = SMAStrategy(API_KEY, API_SECRET)
-strategy = RSIStrategy(API_KEY, API_SECRET)
-#strategy = HybridStrategy(API_KEY, API_SECRET)
-
-# 4. 初始化风控
-risk = BasicRiskManager(max_position_size=10)
 
 def load_symbols(file_path="symbol/symbols.txt"):
     try:
@@ -44,136 +57,293 @@ def load_symbols(file_path="symbol/symbols.txt"):
         print("❌ 找不到 symbol/symbols.txt，默认使用空列表")
         return []
 
-SYMBOLS = load_symbols()
 
+def build():
+    """按实盘配置创建所有组件（只在直接运行 main.py 时调用）"""
+    global trading_client, data_client, risk, sizer, portfolio, SYMBOLS, bar_store, bar_provider
+    global strategy, ensemble, quotes, trade_store, render_queue, order_manager
+
+    # 1. 初始化交易客户端（用于下单）
+    #    所有客户端调用都计数并记录耗时（api.trading.* / api.data.*）
+    trading_client = InstrumentedClient(TradingClient(API_KEY, API_SECRET, paper=True), "trading")
+
+    # 2. 初始化数据客户端（用于获取价格）
+    data_client = InstrumentedClient(StockHistoricalDataClient(API_KEY, API_SECRET), "data")
+
+    # 3. 初始化风控
+    risk = BasicRiskManager(max_position_size=10)
+    # 按波动率定仓：每笔止损时最多亏 max_risk_per_trade × 净值，所有持仓市值不超过净值
+    sizer = PositionSizer.from_risk(risk, max_exposure=1.0)
+
+    # 持仓 / 账户快照：每轮开始拉一次，之后持仓判断、风控、日志都读本地
+    portfolio = PortfolioSnapshot(trading_client)
 
+    SYMBOLS = load_symbols()
+
+    # 4. 初始化 K 线提供者：每轮一次批量请求，所有策略 / 回测共用
+    #    K 线落盘到 data/cache，之后每轮只增量请求最新的 K 线
+    bar_store = BarStore("data/cache")
+    bar_provider = BarProvider(data_client, SYMBOLS, days=90, store=bar_store)
+
+    # 初始化策略（根据你需要可以切换）
+    # strategy = SMAStrategy(bar_provider=bar_provider)
+    strategy = RSIStrategy(bar_provider=bar_provider)
+    #strategy = HybridStrategy(bar_provider=bar_provider)
+
+    # 多策略组合：三个策略共用一套增量指标（SMA(20) / RSI(14) 只算一次），按多数票合并
+    #（--strategy ensemble 时作为交易策略，收盘报告的明日预测也用它）
+    ensemble = StrategyEnsemble(
+        [SMAStrategy(), RSIStrategy(), HybridStrategy()],
+        bar_provider=bar_provider,
+        vote="majority",
+    )
 
-# 5. 判断是否已有持仓
+    # 5. 最新成交价快照：每轮一次批量请求，30 秒内的价格直接复用
+    quotes = QuoteSnapshot(data_client, SYMBOLS, ttl=30)
+
+    # 交易历史库：日志记录同时写入 SQLite，收盘报告和绩效汇总直接查询
+    trade_store = TradeStore(os.path.join(LOG_DIR, "trades.db"))
+    add_log_sink(trade_store.record_trades)
+
+    # 回测图表交给后台进程渲染，只有出现新 K 线时才重画
+    render_queue = RenderQueue(save_dir="backtest")
+
+    # 订单管理：并发提交、确定性 client_order_id 防重复、批量轮询成交状态
+    order_manager = OrderManager(trading_client, on_fill=on_order_fill, on_reject=on_order_reject)
+
+
+
+# 6. 判断是否已有持仓（读本轮的持仓快照）
 def has_position(symbol):
     #return True
-    positions = trading_client.get_all_positions()
+    return portfolio.has_position(symbol)
+
+
+def print_positions():
     print("📋 当前所有持仓：")
-    for p in positions:
+    for p in portfolio.get_all_positions():
         print(f"➡️ {p.symbol} x {p.qty} @ {p.avg_entry_price}")
-        if p.symbol.upper() == symbol.upper():
-            return True
-    return False
 
-# 获取当前价格
+# 获取当前价格（读本轮的报价快照，过期才重新请求）
 def get_current_price(symbol):
-    request_params = StockLatestTradeRequest(symbol_or_symbols=[symbol])
-    response = data_client.get_stock_latest_trade(request_params)
-    return response[symbol].price
-
-
-# 6. 买入
-def buy(symbol):
-    order = MarketOrderRequest(
-        symbol=symbol,
-        qty=1,
-        side=OrderSide.BUY,
-        time_in_force=TimeInForce.DAY
-    )
-    #trading_client.submit_order(order)
-    order_response = trading_client.submit_order(order)
-    print("📤 订单提交响应：", order_response)
-    print("✅ 已下单 BUY")
-    log_trade("BUY", symbol, get_current_price(symbol), reason="策略信号 + 风控通过", broker=trading_client)
-    send_notification("🟢 已下单 BUY", f"{symbol} @ {get_current_price(symbol):.2f}")
-
-
-# 7. 卖出
-def sell(symbol):
-    order = MarketOrderRequest(
-        symbol=symbol,
-        qty=1,
-        side=OrderSide.SELL,
-        time_in_force=TimeInForce.DAY
-    )
-    trading_client.submit_order(order)
-    print("✅ 已下单 SELL")
-    log_trade("SELL", symbol, get_current_price(symbol), reason="卖出信号或风控触发", broker=trading_client)
-    send_notification("🔴 已下单 SELL", f"{symbol} @ {get_current_price(symbol):.2f}")
+    return quotes.get_price(symbol)
+
+
+# 7. 买入（price 为做决策时用的价格；真实成交价在成交回报 on_order_fill 里处理）
+#    key 标识这次决策（本轮开始时间 / 触发的 K 线时间），用来生成确定性的 client_order_id
+def buy(symbol, price, qty=1, key=None):
+    order = order_manager.submit(symbol, "BUY", qty, price=price, key=key, reason="策略信号 + 风控通过")
+    print(f"📤 已提交 BUY {symbol} x {qty:g}（{order.client_order_id}）")
+    # 先按决策价在本地记上持仓，同一轮后面的仓位检查才准确；成交后按真实价格修正
+    portfolio.apply_fill(symbol, "BUY", qty, price)
+
+
+# 8. 卖出（整个持仓）
+def sell(symbol, price, key=None):
+    position = portfolio.get_position(symbol)
+    qty = float(position.qty) if position else 1
+    order = order_manager.submit(symbol, "SELL", qty, price=price, key=key, reason="卖出信号或风控触发")
+    print(f"📤 已提交 SELL {symbol} x {qty:g}（{order.client_order_id}）")
+    portfolio.apply_fill(symbol, "SELL", qty, price)
+
+
+def plan_entries(signals):
+    """
+    本轮所有 BUY 信号一次定仓：按各标的最新 ATR 和当前净值算数量，再在总敞口上限内按顺序分配。
+    返回 {symbol: 股数}，为 0 表示预算或敞口已用完。
+    """
+    candidates = [s for s, signal in signals.items() if signal == "BUY" and not has_position(s)]
+    if not candidates:
+        return {}
+    prices = []
+    for s in candidates:
+        try:
+            prices.append(get_current_price(s))
+        except Exception:
+            prices.append(float("nan"))  # 拿不到价格的本轮不买
+    account = portfolio.get_account()
+    exposure = sum(float(p.qty) * float(p.current_price) for p in portfolio.get_all_positions())
+    return sizer.size(candidates, prices, float(account.equity), exposure, float(account.cash))
 
 
+def on_order_fill(order, qty, price):
+    """成交回报：用真实成交价修正持仓快照和入场价，并记录交易日志"""
+    portfolio.settle_fill(order.symbol, order.side, qty, order.price, price)
+    if order.side == "BUY":
+        # 部分成交时 price 只是这一笔增量的均价，入场价用整张订单的成交均价
+        risk.record_entry_price(order.symbol, order.filled_avg_price)
+    elif order.filled_qty >= order.qty:
+        # 卖单全部成交才清除入场价；没卖完的部分仍按原入场价做止损 / 止盈
+        risk.clear_entry_price(order.symbol)
+    print(f"✅ {order.side} {order.symbol} x {qty:g} 成交 @ {price:.2f}（决策价 {order.price:.2f}）")
+    with metrics.span("logging"):
+        log_trade(order.side, order.symbol, price, reason=order.reason, broker=portfolio, log_dir=LOG_DIR, qty=qty)
+    icon = "🟢" if order.side == "BUY" else "🔴"
+    send_notification(f"{icon} 已成交 {order.side}", f"{order.symbol} x {qty:g} @ {price:.2f}")
 
 
-# 8. 主逻辑
-def main():
-    #backtest_and_plot("AAPL", days=90)
-    clean_old_logs()
-    #每轮同步持仓与entry_price，避免旧记录
-    sync_entry_prices()
-    for symbol in SYMBOLS:
-        print(f"\n🔁 处理标的：{symbol}")
+def on_order_reject(order, qty):
+    """没成交的部分：撤销本地预估的持仓；卖单只在全部成交时清除入场价，没卖出去的持仓入场价不变"""
+    opposite = "SELL" if order.side == "BUY" else "BUY"
+    portfolio.apply_fill(order.symbol, opposite, qty, order.price)
+    if order.side == "BUY" and not portfolio.has_position(order.symbol):
+        risk.clear_entry_price(order.symbol)
+    send_notification("⚠️ 订单未成交", f"{order.side} {order.symbol} x {qty:g}（{order.status}）")
+
+
+# 每轮最多等待订单成交的秒数，没结束的订单下一轮继续跟踪
+ORDER_TIMEOUT = 5.0
+
+
+# 9. 主逻辑
+# 并发拉取价格 / 计算信号的线程数；设为 1 即退化为原来的逐个串行处理
+MAX_WORKERS = 8
+
+
+# symbol -> 上次回测 / 画图时的 (K 线根数, 最后一根时间戳)
+_evaluated = {}
+
+
+def evaluate_symbol(symbol):
+    """并发阶段：只做拉价格、回测这些只读操作，不下单、不改风控状态"""
+    print(f"\n🔁 处理标的：{symbol}")
     # 获取当前价格
-        request_params = StockLatestTradeRequest(symbol_or_symbols=[symbol])
-        response = data_client.get_stock_latest_trade(request_params)
-        current_price = response[symbol].price
+    with metrics.span("data.price"):
+        current_price = get_current_price(symbol)
+
+    # 回测和画图需要 DataFrame，只在出现新 K 线时才从缓冲复制一份
+    times, _ = bar_provider.get_window(symbol)
+    key = (len(times), int(times[-1]) if len(times) else None)
+    if _evaluated.get(symbol) != key:
+        bars = bar_provider.get_bars(symbol)
+        with metrics.span("backtest"):
+            backtest_and_plot(symbol, days=90, bars=bars, plot=False)
+        with metrics.span("render.submit"):
+            render_queue.submit(symbol, bars)
+        _evaluated[symbol] = key
+    return current_price
+
+
+def check_exit(symbol, current_price, signal=None, key=None):
+    """持仓中的卖出检查（止损 > 止盈 > 卖出信号 > 当日浮盈止盈），触发则卖出并返回 True"""
+    entry_price = risk.get_entry_price(symbol)  # ✅ 统一提前获取
+    if risk.should_stop_loss(symbol, current_price):
+        print("⚠️ 持仓中，止损触发卖出")
+        send_notification("⚠️ 持仓中，止损触发卖出", f"{symbol} @ {current_price:.2f}")
+    elif risk.should_take_profit(symbol,current_price):
+        print("🎯 持仓中，止盈触发卖出")
+        send_notification("🎯 持仓中，止盈触发卖出", f"{symbol} @ {current_price:.2f}")
+    elif signal == "SELL":
+        pass
+    # ✅ 新增：当日盈利达到阈值（如 1%）时也止盈
+    elif risk.should_take_intraday_profit(entry_price, current_price, threshold=1.0):
+        print("💰 当日浮盈已达阈值，立即卖出止盈")
+        send_notification("💰 浮盈止盈", f"{symbol} 盈利超 {1.0:.2f}%，卖出止盈")
+    else:
+        return False
+    sell(symbol, current_price, key=key)
+    return True
 
-        backtest_and_plot(symbol, days=90)
 
+def handle_symbol(symbol, current_price, signal, key=None, qty=1):
+    """串行阶段：持仓判断、风控和下单，同一时间只有一个调用，max_position_size 检查不会并发"""
+    with metrics.span("decision"):
+        _handle_symbol(symbol, current_price, signal, key, qty)
 
-    # 获取信号
-        signal = strategy.get_signal(symbol)
-        #signal = "SELL"
-    #signal = "BUY"
-        print("🧪 是否持仓中:", has_position(symbol))
-        print("📦 entry_price = ", risk.get_entry_price(symbol))
+
+def _handle_symbol(symbol, current_price, signal, key=None, qty=1):
+    print(f"\n🧾 {symbol} 信号：{signal}，现价：{current_price:.2f}")
+    print("🧪 是否持仓中:", has_position(symbol))
+    print("📦 entry_price = ", risk.get_entry_price(symbol))
     # 执行逻辑
-        if signal == "BUY" and not has_position(symbol) and risk.allow_entry(trading_client, current_price):
-            print("✅ 进入下单逻辑")
-            buy(symbol)
-            risk.record_entry_price(symbol, current_price)
-        elif has_position(symbol):
-            entry_price = risk.get_entry_price(symbol)  # ✅ 统一提前获取
-            if risk.should_stop_loss(symbol, current_price):
-                print("⚠️ 持仓中，止损触发卖出")
-                send_notification("⚠️ 持仓中，止损触发卖出", f"{symbol} @ {current_price:.2f}")
-                sell(symbol)
-                risk.clear_entry_price(symbol)
-            elif risk.should_take_profit(symbol,current_price):
-                print("🎯 持仓中，止盈触发卖出")
-                send_notification("🎯 持仓中，止盈触发卖出", f"{symbol} @ {current_price:.2f}")
-                sell(symbol)
-                risk.clear_entry_price(symbol)
-            elif signal == "SELL":
-                sell(symbol)
-                risk.clear_entry_price(symbol)
-            # ✅ 新增：当日盈利达到阈值（如 1%）时也止盈
-            elif risk.should_take_intraday_profit(entry_price, current_price, threshold=1.0):
-                print("💰 当日浮盈已达阈值，立即卖出止盈")
-                send_notification("💰 浮盈止盈", f"{symbol} 盈利超 {1.0:.2f}%，卖出止盈")
-                sell(symbol)
-                risk.clear_entry_price(symbol)
-            else:
-                print("📈 持仓中，无止损无止盈无卖出")
-
-
-                entry_price = risk.get_entry_price(symbol)
-                if entry_price:
-                    pnl = (current_price - entry_price) / entry_price * 100
-                    direction = "浮盈" if pnl >= 0 else "浮亏"
-                    print(f"📊 持仓中，入场价: {entry_price:.2f}，现价: {current_price:.2f}，{direction}: {pnl:.2f}%")
-                    log_pnl(entry_price, current_price, symbol)
+    if signal == "BUY" and not has_position(symbol) and risk.allow_entry(portfolio, current_price):
+        if qty <= 0:
+            print("⚠️ 定仓数量为 0（风险预算不足或总敞口已满），不下单")
+            return
+        print("✅ 进入下单逻辑")
+        buy(symbol, current_price, qty=qty, key=key)
+    elif has_position(symbol):
+        if not check_exit(symbol, current_price, signal, key=key):
+            print("📈 持仓中，无止损无止盈无卖出")
+
+
+            entry_price = risk.get_entry_price(symbol)
+            if entry_price:
+                pnl = (current_price - entry_price) / entry_price * 100
+                direction = "浮盈" if pnl >= 0 else "浮亏"
+                print(f"📊 持仓中，入场价: {entry_price:.2f}，现价: {current_price:.2f}，{direction}: {pnl:.2f}%")
+                log_pnl(entry_price, current_price, symbol, log_dir=LOG_DIR)
+    else:
+        if has_position(symbol):
+            entry_price = risk.get_entry_price(symbol)
+            if entry_price:
+                price = current_price
+                pnl = (price - entry_price) / entry_price * 100
+                direction = "浮盈" if pnl >= 0 else "浮亏"
+                print(f"📊 持仓中，入场价: {entry_price:.2f}，现价: {price:.2f}，{direction}: {pnl:.2f}%")
+                log_pnl(entry_price, price, symbol, log_dir=LOG_DIR)
         else:
-            if has_position(symbol):
-                entry_price = risk.get_entry_price(symbol)
-                if entry_price:
-                    price = current_price
-                    pnl = (price - entry_price) / entry_price * 100
-                    direction = "浮盈" if pnl >= 0 else "浮亏"
-                    print(f"📊 持仓中，入场价: {entry_price:.2f}，现价: {price:.2f}，{direction}: {pnl:.2f}%")
-                    log_pnl(entry_price, price, symbol)
-            else:
-                print("⏳ 无操作")
-                #send_notification("没有触发策略条件，因此无操作", f"{symbol} @ {get_current_price(symbol):.2f}")
+            print("⏳ 无操作")
+            #send_notification("没有触发策略条件，因此无操作", f"{symbol} @ {get_current_price(symbol):.2f}")
+
+
+def main():
+    with metrics.cycle():
+        run_cycle()
+
+
+def run_cycle():
+    #backtest_and_plot("AAPL", days=90)
+    clean_old_logs_daily(LOG_DIR)  # 每天只真正清理一次
+    # 本轮的决策 key，本轮所有订单的 client_order_id 都由它和标的、方向生成
+    key = datetime.now().strftime("%Y%m%d%H%M%S")
+    # 处理上一轮还没结束的订单
+    order_manager.poll()
+    # 每轮只拉一次持仓和账户
+    with metrics.span("data.positions"):
+        portfolio.refresh()
+    print_positions()
+    #每轮同步持仓与entry_price，避免旧记录
+    with metrics.span("risk.sync_entry_prices"):
+        sync_entry_prices()
+    # 每轮只拉一次所有标的的 K 线和最新成交价
+    with metrics.span("data.bars"):
+        bar_provider.refresh()
+    with metrics.span("data.quotes"):
+        quotes.refresh()
+    # 所有标的的信号一次批量算出（同一份 K 线，增量指标）
+    with metrics.span("signals"):
+        signals = strategy.get_signals(SYMBOLS)
+    # 所有 BUY 一次向量化定仓，不随同时触发的信号数增加请求或循环
+    with metrics.span("risk.sizing"):
+        for symbol in SYMBOLS:
+            sizer.sync(symbol, *bar_provider.get_window(symbol))
+        sizes = plan_entries(signals)
+    #signals = {s: "SELL" for s in SYMBOLS}
+    #signals = {s: "BUY" for s in SYMBOLS}
+
+    # 各标的并发拉价格、回测；下单逻辑在主线程里按 SYMBOLS 顺序串行执行，
+    # 持仓数和资金的分配顺序与 plan_entries 一致，每次运行结果相同
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = [(symbol, pool.submit(evaluate_symbol, symbol)) for symbol in SYMBOLS]
+        for symbol, future in futures:
+            try:
+                current_price = future.result()
+            except Exception as e:
+                print(f"⚠️ {symbol} 获取价格失败：{e}")
+                continue
+            handle_symbol(symbol, current_price, signals.get(symbol, "HOLD"), key=key, qty=sizes.get(symbol, 0))
+
+    # 本轮的订单已经并发发出，统一等一次成交回报
+    with metrics.span("order.flush"):
+        order_manager.flush(timeout=ORDER_TIMEOUT)
+
+
 def generate_eod_report():
 
 
     now = datetime.now()
     today_str = now.strftime('%Y-%m-%d')
-    log_path = os.path.join("logs", f"{today_str}.txt")
 
     report = f"📊【每日收盘报告 - {today_str}】\n\n"
 
@@ -191,39 +361,63 @@ def generate_eod_report():
     else:
         report += "- 当前无持仓\n"
 
-    # 2. 今日交易日志概要
+    # 2. 今日交易概要（查交易历史库，不再扫描文本日志）
+    flush_logs()
     report += "\n📝 今日交易操作：\n"
-    if os.path.exists(log_path):
-        with open(log_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        today_logs = [line for line in lines if "BUY" in line or "SELL" in line]
-        if today_logs:
-            report += "".join(today_logs[-5:])  # 最多展示5条
-        else:
-            report += "- 今日无买卖操作\n"
+    today_trades = trade_store.trades(today_str, today_str, limit=5)  # 最多展示5条
+    if today_trades:
+        for t in reversed(today_trades):
+            report += f"- [{t['ts']}] {t['action']} {t['symbol']} x {t['qty']:g} @ {t['price']:.2f}\n"
+        stats = trade_store.summary(today_str, today_str)
+        report += (f"- 共 {stats['trade_count']} 笔，已实现盈亏 {stats['realized_pnl']:.2f}，"
+                   f"胜率 {stats['win_rate']:.2%}，持仓成本 {stats['exposure']:.2f}\n")
     else:
-        report += "- 日志文件不存在\n"
+        report += "- 今日无买卖操作\n"
 
     # 3. 明日信号预测（RSI）
-    report += "\n🔮 明日预测信号（RSI策略）:\n"
-    rsi = RSIStrategy(API_KEY, API_SECRET)
-    for sym in SYMBOLS:
-        try:
-            signal = rsi.get_signal(sym)
-            report += f"- {sym}: {signal}\n"
-        except Exception as e:
-            report += f"- {sym}: 获取失败（{e}）\n"
+    report += "\n🔮 明日预测信号（多策略投票）:\n"
+    bar_provider.refresh()
+    try:
+        for sym, signal in ensemble.get_signals(SYMBOLS).items():
+            detail = "，".join(f"{name} {v}" for name, v in ensemble.last_votes[sym].items())
+            report += f"- {sym}: {signal}（{detail}）\n"
+    except Exception as e:
+        report += f"- 获取失败（{e}）\n"
 
     # 4. 通过 Telegram 发送报告
     send_notification("📊 每日收盘报告", report)
 
 
 
+def generate_performance_summary(days=30):
+    """最近 N 天的绩效汇总（按天列出交易次数、已实现盈亏、胜率）"""
+    flush_logs()
+    end = datetime.now().date()
+    start = end - timedelta(days=days)
+    stats = trade_store.summary(start, end)
+
+    report = f"📈【近 {days} 天绩效汇总 {start} ~ {end}】\n\n"
+    report += (f"- 交易 {stats['trade_count']} 笔，平仓 {stats['closed_trades']} 笔，"
+               f"已实现盈亏 {stats['realized_pnl']:.2f}，胜率 {stats['win_rate']:.2%}\n")
+    report += f"- 当前持仓成本：{stats['exposure']:.2f}\n\n"
+    for date, count, pnl, closed, wins in trade_store.daily_summary(start, end):
+        win_rate = wins / closed if closed else 0
+        report += f"- {date}: {count} 笔，盈亏 {pnl:.2f}，胜率 {win_rate:.2%}\n"
+
+    send_notification("📈 绩效汇总", report)
+    return report
+
+
 def is_market_open():
     now = datetime.now()
     return now.weekday() < 5 and now.hour >= 9 and now.hour < 16
     #return True
 
+# 每轮用 cProfile 采样（--profile 开启），耗时汇总间隔（秒）
+PROFILE_CYCLES = False
+METRICS_INTERVAL = 300
+
+
 def run_bot_loop():
     print("⏳ 等待开盘时间 9:30 AM 开始运行")
     while True:
@@ -232,27 +426,200 @@ def run_bot_loop():
         if now.hour == 16 and now.minute == 0:
             print("📈 收盘时间到，今天交易结束。正在生成报告...")
             generate_eod_report()
+            generate_performance_summary(days=30)
+            render_queue.stop()
+            order_manager.shutdown()
+            print(metrics.format_summary())
+            metrics.write_summary(os.path.join(LOG_DIR, "metrics.json"))
             break
 
         if is_market_open():
             print(f"\n🕒 当前时间：{now.strftime('%Y-%m-%d %H:%M:%S')}，执行策略检查")
             try:
-                main()
+                with profile_cycle(PROFILE_CYCLES, out_dir=os.path.join(LOG_DIR, "profile")):
+                    main()
             except Exception as e:
                 print(f"⚠️ 出现错误：{e}")
+            # 定期打印各阶段耗时分布并写入 LOG_DIR/metrics.json（回放时是临时目录）
+            metrics.maybe_report(METRICS_INTERVAL, os.path.join(LOG_DIR, "metrics.json"))
             time.sleep(30)
         else:
             print(f"⏳ 交易时间未到（当前 {now.strftime('%H:%M')}），等待中...")
             time.sleep(60)
 
 def sync_entry_prices():
-    """自动清理没有持仓但还留在entry_price里的记录"""
-    current_positions = trading_client.get_all_positions()
-    current_symbols = [p.symbol.upper() for p in current_positions]
+    """自动清理没有持仓但还留在entry_price里的记录；有持仓但没有记录的按券商平均成本补上"""
+    current_symbols = portfolio.symbols()
+
+    with risk.batch():  # 多条清除合并成一次写入
+        for sym in list(risk.entry_price.keys()):
+            if sym.upper() not in current_symbols:  # 如果本地有但账户没有
+                risk.clear_entry_price(sym)  # 自动清除
+        for sym in current_symbols:
+            if risk.get_entry_price(sym) is None:  # 如卖单未成交，持仓还在
+                risk.record_entry_price(sym, float(portfolio.get_position(sym).avg_entry_price))
+
+async def run_stream_loop(feed, refresh_interval=60, broker=None):
+    """
+    事件驱动模式：成交推送到达时立即做止损 / 止盈检查，K 线推送到达时重新计算信号。
+    事件在一个 asyncio 循环里逐个处理，下单和风控状态更新天然串行；
+    阻塞的券商调用放到线程里执行，不卡住事件循环。
+    broker: 回放模式的本地 PortfolioBroker，推送来的成交价同时作为它的撮合价格。
+    """
+    portfolio.refresh()
+    sync_entry_prices()
+    if bar_provider.last_refresh is None:
+        bar_provider.refresh()
+    last_refresh = last_poll = time.monotonic()
+
+    async for event in feed.events():
+        # 持仓快照定期和券商对一次账
+        if time.monotonic() - last_refresh > refresh_interval:
+            await asyncio.to_thread(portfolio.refresh)
+            last_refresh = time.monotonic()
+
+        symbol = event.symbol
+        # 触发这次决策的事件时间作为订单 key，同一个事件重放也不会重复下单
+        key = event.timestamp.strftime("%Y%m%d%H%M%S")
+        if isinstance(event, TradeEvent):
+            quotes.update(symbol, event.price)
+            if broker is not None:
+                broker.update_prices(broker.indices([symbol]), [event.price])
+            if has_position(symbol):
+                with metrics.span("stream.trade_exit_check"):
+                    await asyncio.to_thread(check_exit, symbol, event.price, None, key)
+        elif isinstance(event, BarEvent):
+            # 比已有数据旧的 K 线没有并入，信号不会变，也不能按它的收盘价下单
+            if bar_provider.update_bar(event):
+                with metrics.span("signals"):
+                    signal = strategy.get_signal(symbol)
+                with metrics.span("risk.sizing"):
+                    sizer.sync(symbol, *bar_provider.get_window(symbol))
+                    sizes = plan_entries({symbol: signal})
+                await asyncio.to_thread(handle_symbol, symbol, event.close, signal, key, sizes.get(symbol, 0))
+
+        # 订单状态：回放时本地券商立即撮合，每个事件之后就结算（按事件推进，不按真实时间），
+        # 下一个事件就能看到入场价；订阅了交易推送时只处理推送队列，否则最多每秒批量查询一次
+        if broker is not None:
+            await asyncio.to_thread(order_manager.flush, ORDER_TIMEOUT)
+        elif order_manager.streaming or time.monotonic() - last_poll >= 1.0:
+            await asyncio.to_thread(order_manager.poll)
+            last_poll = time.monotonic()
+        metrics.maybe_report(METRICS_INTERVAL, os.path.join(LOG_DIR, "metrics.json"))
+
+
+def setup_replay(bars, replay_days=5, timeframe=TimeFrame.Day, starting_cash=100_000.0):
+    """
+    回放模式不碰真实账户：
+    - 下单交给本地 PortfolioBroker，按回放推送的价格成交，持仓快照和订单管理都接到它上面；
+    - 入场价、交易日志和交易库写到临时目录，不发通知；
+    - BarProvider 只放入回放起点（最后 replay_days 天之前）的 K 线，之后的 K 线由回放事件逐根并入，
+      每次决策只用到当时已有的数据。
+    返回 (要回放的 K 线, 本地券商)。
+    """
+    global trading_client, portfolio, order_manager, risk, sizer, bar_provider, quotes, trade_store
+    global send_notification, LOG_DIR
+
+    if bars is None or bars.empty:
+        raise ValueError("没有可回放的 K 线")
+    times = bars.index.get_level_values(-1)
+    start = times.max() - timedelta(days=replay_days)
+    history, replay = bars[times <= start], bars[times > start]
+    last_close = history.groupby(level=0, sort=False)["close"].last()
+
+    _evaluated.clear()
+    folder = tempfile.mkdtemp(prefix="tradingbot-replay-")
+    broker = PortfolioBroker(starting_cash, SYMBOLS)
+    broker.update_prices(broker.indices(last_close.index), last_close.to_numpy())
+    trading_client = broker
+    portfolio = PortfolioSnapshot(broker)
+    order_manager = OrderManager(broker, on_fill=on_order_fill, on_reject=on_order_reject)
+    risk = BasicRiskManager(
+        max_risk_per_trade=risk.max_risk_per_trade,
+        max_position_size=risk.max_position_size,
+        stop_loss_pct=risk.stop_loss_pct,
+        take_profit_pct=risk.take_profit_pct,
+        entry_file=os.path.join(folder, "entry_price.json"),
+    )
+    sizer = PositionSizer.from_risk(risk, max_exposure=sizer.max_exposure)
+
+    bar_provider = BarProvider(None, SYMBOLS, days=(times.max() - times.min()).days + 1, timeframe=timeframe)
+    bar_provider.set_bars(history)
+    bar_provider.last_refresh = datetime.now()
+    strategy.bar_provider = bar_provider
+    ensemble.bar_provider = bar_provider
+
+    quotes = QuoteSnapshot(None, SYMBOLS, ttl=float("inf"))
+    for sym, price in last_close.items():
+        quotes.update(sym, price)
+
+    remove_log_sink(trade_store.record_trades)
+    trade_store.close()
+    trade_store = TradeStore(os.path.join(folder, "trades.db"))
+    add_log_sink(trade_store.record_trades)
+    LOG_DIR = os.path.join(folder, "logs")
+    send_notification = lambda *args, **kwargs: None
+
+    print(f"⏪ 回放 {len(replay)} 根 K 线（{start} 之后），本地撮合，记录保存在 {folder}")
+    return replay, broker
 
-    for sym in list(risk.entry_price.keys()):
-        if sym.upper() not in current_symbols:  # 如果本地有但账户没有
-            risk.clear_entry_price(sym)  # 自动清除
 
 if __name__ == "__main__":
-    run_bot_loop()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["poll", "stream", "replay"], default="poll",
+                        help="poll: 每 30 秒轮询；stream: Alpaca 实时推送；replay: 用本地缓存的 K 线回放")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay 模式的回放倍速，0 表示不等待")
+    parser.add_argument("--replay-days", type=int, default=5, help="replay 模式回放最近 N 天的 K 线，之前的作为已有历史")
+    parser.add_argument("--strategy", choices=["rsi", "sma", "hybrid", "ensemble"], default="rsi",
+                        help="交易使用的策略，ensemble 为 SMA / RSI / 混合策略多数投票")
+    parser.add_argument("--timeframe", choices=list(TIMEFRAMES), default="1Day",
+                        help="策略使用的 K 线周期；日内周期每轮只拉一次分钟 K 线，本地聚合出各周期")
+    parser.add_argument("--profile", action="store_true", help="每轮用 cProfile 采样，结果保存到 logs/profile/")
+    parser.add_argument("--metrics-port", type=int, default=None, help="开启本地耗时统计接口 http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--metrics-interval", type=int, default=300, help="耗时汇总打印 / 写入 logs/metrics.json 的间隔（秒）")
+    args = parser.parse_args()
+    build()
+
+    PROFILE_CYCLES = args.profile
+    METRICS_INTERVAL = args.metrics_interval
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    if args.strategy == "sma":
+        strategy = SMAStrategy(bar_provider=bar_provider)
+    elif args.strategy == "hybrid":
+        strategy = HybridStrategy(bar_provider=bar_provider)
+    elif args.strategy == "ensemble":
+        strategy = ensemble
+
+    if args.timeframe != "1Day":
+        # 分钟 K 线缓冲按所选策略的回看天数分配，否则 get_window 只能拿到默认的 5 天
+        bar_provider = MultiTimeframeBars(data_client, SYMBOLS, days=strategy.lookback_days, timeframe=args.timeframe)
+        strategy.bar_provider = bar_provider
+        ensemble.bar_provider = bar_provider
+
+    replay_broker = None
+    if args.mode == "replay":
+        # 只有日线会落盘到 BarStore，分钟 K 线（MultiTimeframeBars）只在内存里
+        if args.timeframe != "1Day":
+            parser.error("replay 模式只支持 --timeframe 1Day（日内周期的 K 线不写入本地缓存）")
+        cached = bar_store.load_many(SYMBOLS, TimeFrame.Day)
+        if cached.empty:
+            raise SystemExit(f"❌ 本地没有日线缓存（{bar_store.root}），先用 poll 模式运行一轮补齐后再回放")
+        replay_bars, replay_broker = setup_replay(cached, args.replay_days, TimeFrame.Day)
+
+    # 交易 / 盈亏日志由后台线程批量写入，下单路径上不再有文件 I/O
+    start_async_logging(LOG_DIR)
+
+    if args.mode == "stream":
+        from alpaca.trading.stream import TradingStream
+
+        order_manager.listen(TradingStream(API_KEY, API_SECRET, paper=True))
+        asyncio.run(run_stream_loop(AlpacaStreamFeed(API_KEY, API_SECRET, SYMBOLS)))
+    elif args.mode == "replay":
+        asyncio.run(run_stream_loop(ReplayFeed(replay_bars, speed=args.speed), broker=replay_broker))
+        order_manager.flush(timeout=ORDER_TIMEOUT)
+        account = replay_broker.get_account()
+        print(f"📊 回放结束：净值 {account.equity:.2f}，已实现盈亏 {replay_broker.realized_pnl():.2f}")
+    else:
+        run_bot_loop()
@@ -1,5 +1,6 @@
-import json
-import os
+from contextlib import contextmanager
+
+from risk.entry_journal import EntryPriceJournal
 
 class BasicRiskManager:
     def __init__(self, max_risk_per_trade=0.02, max_position_size=1, stop_loss_pct=0.03, take_profit_pct=0.05, entry_file="entry_price.json"):
@@ -8,33 +9,51 @@ class BasicRiskManager:
         self.stop_loss_pct = stop_loss_pct
         self.take_profit_pct = take_profit_pct
         self.entry_file = entry_file
+        # entry_file 作为快照，更新只追加到 entry_file.journal
+        self.journal = EntryPriceJournal(entry_file)
+        self._pending = None
         self.entry_price = self.load_entry_price()
 
     def load_entry_price(self):
-        if os.path.exists(self.entry_file):
-            try:
-                with open(self.entry_file, "r") as f:
-                    return json.load(f)  # 返回整个 dict
-            except:
-                return {}
-        return {}
+        return self.journal.load()  # 返回整个 dict（快照 + 日志重放）
 
     def save_entry_price(self, price):
-        with open(self.entry_file, "w") as f:
-            json.dump(price, f)
+        # 立即把完整 dict 写成快照（原子替换），同时清空日志
+        self.journal.compact(price)
+
+    def _write(self, record):
+        if self._pending is not None:
+            self._pending.append(record)
+            return
+        self.journal.append([record])
+        if self.journal.needs_compaction():
+            self.save_entry_price(self.entry_price)
+
+    @contextmanager
+    def batch(self):
+        """批量更新：with 块里的所有记录在结束时一次写入日志"""
+        self._pending = []
+        try:
+            yield self
+        finally:
+            records, self._pending = self._pending, None
+            self.journal.append(records)
+            if self.journal.needs_compaction():
+                self.save_entry_price(self.entry_price)
 
     def record_entry_price(self, symbol, price):
         self.entry_price[symbol] = price  # 存每个 symbol 的入场价
-        self.save_entry_price(self.entry_price)  # 保存整个 dict
+        self._write({"op": "set", "symbol": symbol, "price": price})
         print(f"✅ 已记录 {symbol} 买入价格：{price}")
 
     def clear_entry_price(self, symbol):
         if symbol in self.entry_price:
             self.entry_price.pop(symbol)
-            self.save_entry_price(self.entry_price)
+            self._write({"op": "clear", "symbol": symbol})
             print(f"🗑️ 已清除 {symbol} 的 entry_price")
 
     def allow_entry(self, broker, current_price):
+        # broker 可以是 TradingClient，也可以是本轮的 PortfolioSnapshot（不再请求 API）
         positions = broker.get_all_positions()
         if len(positions) >= self.max_position_size:
             print(f"⚠️ 已达到最大仓位限制 ({len(positions)})，禁止继续加仓")
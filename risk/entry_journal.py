@@ -0,0 +1,91 @@
+import json
+import os
+
+
+class EntryPriceJournal:
+    """
+    入场价的预写日志：每次更新只往 <entry_file>.journal 追加一行 JSON（O(1) I/O），
+    启动时读快照 <entry_file> 再按顺序重放日志；日志累积到 compact_every 行时
+    把当前状态原子地写成新快照并清空日志。
+
+    崩溃恢复：快照通过临时文件 + os.replace 写入，不会出现半个文件；
+    日志里只有最后一行可能写了一半，重放时丢弃它，其余记录全部精确恢复。
+    """
+
+    def __init__(self, entry_file="entry_price.json", compact_every=200, fsync=False):
+        self.snapshot_file = entry_file
+        self.journal_file = entry_file + ".journal"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.journal_records = 0
+
+    def load(self):
+        state = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "r") as f:
+                content = f.read()
+            if content.strip():
+                try:
+                    state = json.loads(content)
+                except json.JSONDecodeError as e:
+                    # 旧版本直接覆盖写可能留下截断的文件，不再悄悄当成空 dict
+                    print(f"⚠️ {self.snapshot_file} 已损坏（{e}），仅从日志恢复")
+
+        self.journal_records = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+            valid_bytes = 0
+            for i, raw in enumerate(lines):
+                try:
+                    if not raw.endswith(b"\n"):
+                        raise ValueError("未以换行结尾")
+                    record = json.loads(raw.decode("utf-8"))
+                except ValueError:
+                    if i == len(lines) - 1:
+                        # 截掉写了一半的尾巴，后续追加才不会接在坏行后面
+                        print(f"⚠️ 丢弃日志中未写完的最后一条记录：{raw!r}")
+                        os.truncate(self.journal_file, valid_bytes)
+                        break
+                    print(f"⚠️ 日志第 {i + 1} 行损坏，已跳过：{raw!r}")
+                    valid_bytes += len(raw)
+                    continue
+                _apply(state, record)
+                valid_bytes += len(raw)
+                self.journal_records += 1
+        return state
+
+    def append(self, records):
+        """批量追加记录，一次 write"""
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.journal_records += len(records)
+
+    def needs_compaction(self):
+        return self.journal_records >= self.compact_every
+
+    def compact(self, state):
+        """把完整状态写成快照并清空日志（重放是幂等的，两步之间崩溃也不会出错）"""
+        tmp_path = self.snapshot_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_file)
+        open(self.journal_file, "w").close()
+        self.journal_records = 0
+
+
+def _apply(state, record):
+    op = record.get("op")
+    if op == "set":
+        state[record["symbol"]] = record["price"]
+    elif op == "clear":
+        state.pop(record["symbol"], None)
@@ -0,0 +1,191 @@
+import numpy as np
+
+from data.ring_buffer import CLOSE, HIGH, LOW
+from strategies.indicators import _new_bars
+
+
+# ---------- 波动率（时间 × 标的 矩阵，整块向量化计算） ----------
+def atr_frame(high, low, close, window=14):
+    """
+    Wilder ATR：真实波幅 TR = max(高 - 低, |高 - 前收|, |低 - 前收|)，再做 1/window 的指数平滑。
+    输入为 时间 × 标的 的 DataFrame，缺失的 K 线跳过（前收取上一根有效收盘）。
+    """
+    prev_close = close.ffill().shift(1)
+    tr = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+    tr = tr.where(close.notna())
+    return tr.ewm(alpha=1.0 / window, adjust=False, ignore_na=True, min_periods=window).mean()
+
+
+class WilderATR:
+    """
+    单个标的的 Wilder ATR，增量更新 O(1)，公式与 atr_frame 一致：
+    第一根 K 线的 TR 为 高 - 低，满 window 根后才有值。
+    同一根 K 线（相同时间戳）再次传入时回滚到它之前的状态重算；比最后一根早的忽略。
+    """
+
+    __slots__ = ("window", "alpha", "count", "avg", "prev_close", "last_close", "last_timestamp", "_before_last")
+
+    def __init__(self, window=14):
+        self.window = window
+        self.alpha = 1.0 / window
+        self.count = 0
+        self.avg = 0.0
+        self.prev_close = None
+        self.last_close = None
+        self.last_timestamp = None
+        self._before_last = None
+
+    def update(self, high, low, close, timestamp):
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return self.value
+        if timestamp == self.last_timestamp and self._before_last is not None:
+            self.count, self.avg, self.prev_close = self._before_last
+        else:
+            self.prev_close = self.last_close
+        self._before_last = (self.count, self.avg, self.prev_close)
+
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.avg = tr if self.count == 0 else self.avg + self.alpha * (tr - self.avg)
+        self.count += 1
+        self.last_close = close
+        self.last_timestamp = timestamp
+        return self.value
+
+    @property
+    def value(self):
+        return self.avg if self.count >= self.window else None
+
+
+def volatility_frame(close, window=20):
+    """收益率的滚动标准差 × 价格，换算成和 ATR 一样的价格单位"""
+    returns = close / close.ffill().shift(1) - 1
+    return returns.rolling(window, min_periods=window).std() * close
+
+
+def size_positions(prices, stops, equity, max_risk_per_trade=0.02, max_position_pct=0.2, room=np.inf):
+    """
+    一次算出所有候选标的的下单数量（向量运算，通常只需一两轮）：
+    1. 每笔风险预算 = equity × max_risk_per_trade，数量 = 预算 / 每股止损距离 stops；
+    2. 单个标的市值不超过 equity × max_position_pct；
+    3. 按传入顺序在 room（还能新增的市值）内分配，放不下的部分截断；
+       截断取整后剩下的零头继续按顺序分给后面买得起的标的。
+    返回整数股数数组，价格或止损距离无效的位置为 0。
+    """
+    prices = np.asarray(prices, dtype="float64")
+    stops = np.asarray(stops, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qty = np.floor(equity * max_risk_per_trade / stops)
+        qty = np.fmin(qty, np.floor(equity * max_position_pct / prices))
+        valid = (prices > 0) & (stops > 0) & np.isfinite(qty)
+        qty = np.where(valid, qty, 0.0)
+        cost = np.where(valid, prices, 0.0)
+
+    result = np.zeros(len(qty))
+    start = 0
+    while start < len(qty) and room > 0:
+        # 排在前面的先占用额度：已占用的市值按取整后的股数累加
+        notional = qty[start:] * cost[start:]
+        before = np.cumsum(notional) - notional
+        with np.errstate(divide="ignore", invalid="ignore"):
+            take = np.fmin(qty[start:], np.floor(np.maximum(room - before, 0.0) / cost[start:]))
+        cut = np.flatnonzero(take < qty[start:])
+        if not len(cut):
+            result[start:] = take
+            break
+        # 第一个被截断的标的之前都按原数量；它之后的标的用取整后剩下的额度重新分配
+        end = start + cut[0] + 1
+        result[start:end] = take[:end - start]
+        room -= float(result[start:end] @ cost[start:end])
+        start = end
+    return np.maximum(result, 0).astype(np.int64)
+
+
+class PositionSizer:
+    """
+    波动率定仓：每笔交易在止损时最多亏 equity × max_risk_per_trade。
+    每股止损距离 = max(atr_mult × ATR, stop_loss_pct × 价格)：波动越大仓位越小，
+    且不小于风控的固定止损比例（实际止损按 stop_loss_pct 触发时亏损不会超过预算）。
+    所有新开仓加上已有持仓的市值不超过 equity × max_exposure，也不超过可用现金。
+
+    实盘每轮调用 sync(symbol, times, data) 用缓冲里的 K 线增量刷新各标的最新的 ATR，
+    再用 size(symbols, prices, ...) 一次算出本轮所有 BUY 的数量；
+    回测用 volatility(bars) 预先算好整块 ATR 矩阵，逐个时间点调用 size_array。
+    method: "atr"（需要 high / low 列）或 "std"（收盘价收益率标准差）。
+    """
+
+    def __init__(self, max_risk_per_trade=0.02, stop_loss_pct=0.03, max_exposure=1.0, max_position_pct=0.2,
+                 atr_window=14, atr_mult=2.0, method="atr"):
+        self.max_risk_per_trade = max_risk_per_trade
+        self.stop_loss_pct = stop_loss_pct
+        self.max_exposure = max_exposure
+        self.max_position_pct = max_position_pct
+        self.atr_window = atr_window
+        self.atr_mult = atr_mult
+        self.method = method
+        self.atr = {}  # symbol -> 最新 ATR
+        self._states = {}  # symbol -> WilderATR（sync 的增量状态）
+
+    @classmethod
+    def from_risk(cls, risk, **kwargs):
+        """直接使用 BasicRiskManager 的 max_risk_per_trade / stop_loss_pct"""
+        return cls(max_risk_per_trade=risk.max_risk_per_trade, stop_loss_pct=risk.stop_loss_pct, **kwargs)
+
+    # ---------- 波动率 ----------
+    def volatility(self, bars):
+        """(symbol, timestamp) K 线 -> 时间 × 标的 的 ATR 矩阵"""
+        close = bars["close"].unstack(level=0).sort_index()
+        if self.method == "atr" and {"high", "low"} <= set(bars.columns):
+            high = bars["high"].unstack(level=0).reindex_like(close)
+            low = bars["low"].unstack(level=0).reindex_like(close)
+            return atr_frame(high, low, close, self.atr_window)
+        return volatility_frame(close, self.atr_window)
+
+    def sync(self, symbol, times, data):
+        """
+        用某个标的的 K 线刷新它的 ATR，输入为 BarRing.window / get_window 返回的 (时间戳 ns, 字段 5 × n) 视图。
+        atr 方法只处理上次之后（含最后一根）的 K 线；std 方法只用最后 atr_window + 1 根收盘价。不构造 DataFrame。
+        """
+        symbol = symbol.upper()
+        if self.method == "atr":
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = WilderATR(self.atr_window)
+            start = _new_bars(times, state.last_timestamp)
+            for ts, high, low, close in zip(
+                times[start:].tolist(), data[HIGH, start:].tolist(), data[LOW, start:].tolist(), data[CLOSE, start:].tolist()
+            ):
+                state.update(high, low, close, ts)
+            value = state.value
+        else:
+            closes = data[CLOSE, -(self.atr_window + 1):]
+            value = None
+            if len(closes) > self.atr_window:
+                value = float(np.std(closes[1:] / closes[:-1] - 1, ddof=1) * closes[-1])
+        if value is not None:
+            self.atr[symbol] = value
+        return self.atr.get(symbol)
+
+    def stops(self, prices, atr):
+        """每股止损距离；ATR 还没有值时退回固定止损比例"""
+        prices = np.asarray(prices, dtype="float64")
+        atr = np.asarray(atr, dtype="float64")
+        return np.fmax(self.atr_mult * atr, self.stop_loss_pct * prices)
+
+    # ---------- 定仓 ----------
+    def size_array(self, prices, atr, equity, exposure=0.0, cash=np.inf):
+        """prices / atr 为候选标的的数组（按优先级排列），返回整数股数数组"""
+        room = min(equity * self.max_exposure - exposure, cash)
+        return size_positions(
+            prices, self.stops(prices, atr), equity,
+            max_risk_per_trade=self.max_risk_per_trade,
+            max_position_pct=self.max_position_pct,
+            room=max(room, 0.0),
+        )
+
+    def size(self, symbols, prices, equity, exposure=0.0, cash=np.inf):
+        """实盘：本轮所有候选标的一次定仓，返回 {symbol: 股数}"""
+        atr = [self.atr.get(s.upper(), np.nan) for s in symbols]
+        qty = self.size_array(prices, atr, equity, exposure, cash)
+        return dict(zip(symbols, qty.tolist()))
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from data.ring_buffer import CLOSE, bar_arrays
+from strategies.indicator_graph import IndicatorPanel
+from strategies.indicators import IndicatorEngine
+from utils.metrics import metrics
+
+SIGNAL_NAMES = {1: "BUY", -1: "SELL", 0: "HOLD"}
+
+
+def price_matrix(bars, field="close", symbols=None):
+    """把 (symbol, timestamp) 的 K 线展开成 时间 × 标的 的矩阵，缺失处为 NaN"""
+    matrix = bars[field].unstack(level=0).sort_index()
+    if symbols is not None:
+        matrix = matrix.reindex(columns=list(symbols))
+    return matrix
+
+
+def bar_window(bar_provider, symbol, days=None, timeframe=None):
+    """
+    某个标的最近 days 天的 (UTC 纳秒时间戳, 收盘价) 数组。
+    数据源有环形缓冲（get_window）时直接是缓冲里的视图，不复制也不构造 DataFrame；否则从 get_bars 转换。
+    """
+    kwargs = {"days": days} if timeframe is None else {"days": days, "timeframe": timeframe}
+    if hasattr(bar_provider, "get_window"):
+        times, values = bar_provider.get_window(symbol, **kwargs)
+        return times, values[CLOSE]
+    return bar_arrays(bar_provider.get_bars(symbol, **kwargs))
+
+
+class BaseStrategy:
+    """
+    策略基类：K 线由外部传入（BarProvider 或一整块 (symbol, timestamp) K 线），策略本身不请求数据。
+    子类只需要实现 rule(price, sma, rsi)：输入 NumPy 数组，返回 1（BUY）/ -1（SELL）/ 0（HOLD）数组。
+    同一条规则用在两个地方：
+    - generate_signals(bars)：整块历史一次向量化算出 时间 × 标的 的信号矩阵（回测用）；
+    - get_signals(symbols, bars)：用增量指标取每个标的的最新值，再一次性套用规则（实盘 / 推送模式用）。
+    """
+
+    name = "策略"
+    sma_window = None
+    rsi_window = None
+    lookback_days = 30
+    min_bars = 15
+    # K 线周期（"1Day" / "1Hour" / "15Min" / "5Min" / "1Min"），None 表示用 bar_provider 的默认周期
+    timeframe = None
+
+    def __init__(self, *, bar_provider=None):
+        # 只接受关键字参数：旧版本的 RSIStrategy(API_KEY, API_SECRET) 会直接报错，而不是把密钥当成 bar_provider
+        self.bar_provider = bar_provider
+        # 每个标的的 SMA / RSI 增量状态，每轮只计算新到的 K 线
+        self.indicators = IndicatorEngine(sma_window=self.sma_window or 20, rsi_window=self.rsi_window or 14)
+
+    def rule(self, price, sma, rsi):
+        raise NotImplementedError
+
+    def decide(self, price, sma, rsi, counts):
+        """套用规则得到 int8 信号数组；K 线数不足 min_bars 的位置为 0（HOLD）"""
+        with np.errstate(invalid="ignore"):
+            codes = self.rule(price, sma, rsi)
+        return np.where(np.asarray(counts) >= self.min_bars, codes, 0).astype(np.int8)
+
+    # ---------- 整块历史（回测） ----------
+    def generate_signals(self, bars, symbols=None, panel=None):
+        """
+        返回 时间 × 标的 的信号矩阵（int8），指标没有值或 K 线数不足 min_bars 的位置为 0。
+        panel: 可传入共享的 IndicatorPanel，多个策略共用同一份指标计算结果。
+        """
+        panel = panel or IndicatorPanel(price_matrix(bars, symbols=symbols))
+        signals = self.decide(panel.prices(), panel.sma(self.sma_window), panel.rsi(self.rsi_window), panel.counts())
+        return pd.DataFrame(signals, index=panel.closes.index, columns=panel.closes.columns)
+
+    # ---------- 最新信号（实盘） ----------
+    def get_bars(self, symbol, days=None):
+        if self.bar_provider is None:
+            raise ValueError(f"{type(self).__name__} 没有 bar_provider，请传入 bars")
+        if self.timeframe is None:
+            return self.bar_provider.get_bars(symbol, days=days or self.lookback_days)
+        return self.bar_provider.get_bars(symbol, days=days or self.lookback_days, timeframe=self.timeframe)
+
+    def get_window(self, symbol, days=None):
+        """与 get_bars 相同的区间，返回 (时间戳, 收盘价) 数组"""
+        if self.bar_provider is None:
+            raise ValueError(f"{type(self).__name__} 没有 bar_provider，请传入 bars")
+        return bar_window(self.bar_provider, symbol, days or self.lookback_days, self.timeframe)
+
+    def get_signals(self, symbols=None, bars=None):
+        """
+        批量计算最新信号，返回 {symbol: "BUY" / "SELL" / "HOLD"}。
+        bars 为 (symbol, timestamp) MultiIndex K 线；不传时从 bar_provider 取最近 lookback_days 天
+        （数据源是环形缓冲时直接读其中的视图）。同一份 bars 可以交给多个策略，不会重复请求数据。
+        只有 bar_provider 这条路径使用策略自身的增量指标状态；传入的 bars 每次用新的指标状态从头计算，
+        同一个策略对象同时用于实盘和回测时两边互不影响。
+        """
+        if bars is not None:
+            by_symbol = {sym: df for sym, df in bars.groupby(level=0, sort=False)}
+            symbols = list(by_symbol) if symbols is None else symbols
+            get = lambda s: bar_arrays(by_symbol.get(s.upper()))
+            indicators = IndicatorEngine(sma_window=self.sma_window or 20, rsi_window=self.rsi_window or 14)
+        else:
+            symbols = self.bar_provider.symbols if symbols is None else symbols
+            get = self.get_window
+            indicators = self.indicators
+
+        latest = np.full((len(symbols), 3), np.nan)
+        counts = np.zeros(len(symbols))
+        with metrics.span("indicators"):
+            for i, symbol in enumerate(symbols):
+                times, closes = get(symbol)
+                counts[i] = len(times)
+                if len(times) < max(self.min_bars, 1):
+                    print(f"[{self.name}] ❌ {symbol} 数据不足（共 {len(times)} 条）")
+                    continue
+                indicators.sync_arrays(symbol, times, closes)
+                latest[i] = [np.nan if v is None else v for v in indicators.latest(symbol)]
+
+        price, sma, rsi = latest.T
+        codes = self.decide(price, sma if self.sma_window else np.nan, rsi if self.rsi_window else np.nan, counts)
+
+        signals = {}
+        for i, symbol in enumerate(symbols):
+            signals[symbol] = SIGNAL_NAMES[int(codes[i])]
+            if not np.isnan(price[i]):
+                print(f"[{self.name}] {symbol} {self.describe(price[i], sma[i], rsi[i])} -> {signals[symbol]}")
+        return signals
+
+    def get_signal(self, symbol, bars=None):
+        return self.get_signals([symbol], bars)[symbol]
+
+    def describe(self, price, sma, rsi):
+        text = f"当前价格: {price:.2f}"
+        if self.sma_window:
+            text += f", SMA({self.sma_window}): {sma:.2f}"
+        if self.rsi_window:
+            text += f", RSI({self.rsi_window}): {rsi:.2f}"
+        return text
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from data.ring_buffer import bar_arrays
+from strategies.base_strategy import SIGNAL_NAMES, bar_window, price_matrix
+from strategies.indicator_graph import IndicatorGraph, IndicatorPanel
+from utils.metrics import metrics
+
+
+# ---------- 投票规则：输入 策略数 × ... 的投票数组（1 / -1 / 0），输出合并后的信号 ----------
+def majority_vote(votes, weights=None):
+    """超过半数策略同向才给出信号"""
+    k = len(votes)
+    buys = (votes == 1).sum(axis=0)
+    sells = (votes == -1).sum(axis=0)
+    return np.select([buys * 2 > k, sells * 2 > k], [1, -1], 0)
+
+
+def unanimous_vote(votes, weights=None):
+    """所有策略一致才给出信号"""
+    return np.select([(votes == 1).all(axis=0), (votes == -1).all(axis=0)], [1, -1], 0)
+
+
+def any_vote(votes, weights=None):
+    """任一策略卖出就卖出（偏保守），否则任一策略买入就买入"""
+    return np.select([(votes == -1).any(axis=0), (votes == 1).any(axis=0)], [-1, 1], 0)
+
+
+class WeightedVote:
+    """加权得分 = Σ 权重 × 投票 / Σ 权重，得分 >= threshold 买入，<= -threshold 卖出"""
+
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+
+    def __call__(self, votes, weights=None):
+        weights = np.ones(len(votes)) if weights is None else np.asarray(weights, dtype="float64")
+        score = np.tensordot(weights, votes, axes=1) / weights.sum()
+        return np.select([score >= self.threshold, score <= -self.threshold], [1, -1], 0)
+
+
+VOTE_RULES = {
+    "majority": majority_vote,
+    "unanimous": unanimous_vote,
+    "any": any_vote,
+    "weighted": WeightedVote(),
+}
+
+
+class StrategyEnsemble:
+    """
+    多策略组合：所有策略共用一个 IndicatorGraph（实盘）或 IndicatorPanel（回测），
+    同一个 (指标, 窗口) 每个标的每根 K 线只算一次，各策略只执行自己的 rule，再按投票规则合并。
+    对外接口与 BaseStrategy 相同（get_signals / get_signal / generate_signals），
+    可以直接替换 main.py 里的 strategy 或传给 run_portfolio_backtest。
+    vote: "majority" / "unanimous" / "any" / "weighted"，或自定义函数 vote(votes, weights)。
+    """
+
+    name = "组合策略"
+
+    def __init__(self, strategies, bar_provider=None, vote="majority", weights=None):
+        self.strategies = list(strategies)
+        self.bar_provider = bar_provider
+        self.vote = VOTE_RULES[vote] if isinstance(vote, str) else vote
+        self.weights = weights
+        self.lookback_days = max(s.lookback_days for s in self.strategies)
+        # 共用一套指标，所有策略必须在同一个周期上
+        timeframes = {s.timeframe for s in self.strategies}
+        if len(timeframes) > 1:
+            raise ValueError(f"组合内的策略周期不一致：{timeframes}")
+        self.timeframe = timeframes.pop()
+        self.graph = self._new_graph()
+        # 最近一次 get_signals 中每个策略的投票 {symbol: {策略名: 信号}}
+        self.last_votes = {}
+
+    def _new_graph(self):
+        graph = IndicatorGraph()
+        for strategy in self.strategies:
+            graph.add_strategy(strategy)
+        return graph
+
+    def _votes(self, symbols, graph):
+        """每个策略对每个标的的投票，返回 策略数 × 标的数 的数组"""
+        price = graph.closes(symbols)
+        counts = graph.counts(symbols)
+        votes = np.zeros((len(self.strategies), len(symbols)), dtype=np.int8)
+        for k, strategy in enumerate(self.strategies):
+            sma = graph.latest(symbols, "sma", strategy.sma_window)
+            rsi = graph.latest(symbols, "rsi", strategy.rsi_window)
+            votes[k] = strategy.decide(price, sma, rsi, counts)
+        return votes
+
+    def get_signals(self, symbols=None, bars=None):
+        """
+        批量计算合并后的最新信号，返回 {symbol: "BUY" / "SELL" / "HOLD"}。
+        与 BaseStrategy.get_signals 相同，传入的 bars 用新的指标图计算，不影响 bar_provider 路径的增量状态。
+        """
+        if bars is not None:
+            by_symbol = {sym: df for sym, df in bars.groupby(level=0, sort=False)}
+            symbols = list(by_symbol) if symbols is None else symbols
+            get = lambda s: bar_arrays(by_symbol.get(s.upper()))
+            graph = self._new_graph()
+        else:
+            symbols = self.bar_provider.symbols if symbols is None else symbols
+            get = lambda s: bar_window(self.bar_provider, s, self.lookback_days, self.timeframe)
+            graph = self.graph
+
+        with metrics.span("indicators"):
+            for symbol in symbols:
+                graph.sync_arrays(symbol, *get(symbol))
+
+        votes = self._votes(symbols, graph)
+        combined = self.vote(votes, self.weights)
+
+        signals = {}
+        self.last_votes = {}
+        for i, symbol in enumerate(symbols):
+            signals[symbol] = SIGNAL_NAMES[int(combined[i])]
+            self.last_votes[symbol] = {s.name: SIGNAL_NAMES[int(votes[k, i])] for k, s in enumerate(self.strategies)}
+            detail = " / ".join(f"{name} {v}" for name, v in self.last_votes[symbol].items())
+            print(f"[{self.name}] {symbol}：{detail} -> {signals[symbol]}")
+        return signals
+
+    def get_signal(self, symbol, bars=None):
+        return self.get_signals([symbol], bars)[symbol]
+
+    def generate_signals(self, bars, symbols=None):
+        """整块历史的合并信号矩阵（时间 × 标的），各策略共用一个 IndicatorPanel"""
+        panel = IndicatorPanel(price_matrix(bars, symbols=symbols))
+        votes = np.stack([s.generate_signals(bars, panel=panel).to_numpy() for s in self.strategies])
+        combined = self.vote(votes, self.weights).astype(np.int8)
+        return pd.DataFrame(combined, index=panel.closes.index, columns=panel.closes.columns)
@@ -0,0 +1,120 @@
+import numpy as np
+
+from data.ring_buffer import bar_arrays
+from strategies.indicators import RollingSMA, WilderRSI, _new_bars, _ts_ns, rsi_frame, sma_frame
+
+NODE_TYPES = {"sma": RollingSMA, "rsi": WilderRSI}
+
+
+class SymbolGraph:
+    def __init__(self, nodes):
+        self.nodes = {key: NODE_TYPES[key[0]](key[1]) for key in nodes}
+        self.last_timestamp = None
+        self.last_close = None
+        self.count = 0
+
+
+class IndicatorGraph:
+    """
+    多个策略共享的增量指标图：每个 (指标, 窗口) 只建一个节点，
+    比如 SMA 策略和混合策略都用到 SMA(20) 时只算一次。每根新 K 线对每个节点做一次 O(1) 更新，
+    策略只读取节点的最新值，所以多加一个策略的成本基本就是它自己的判断逻辑。
+    """
+
+    def __init__(self):
+        self.required = set()
+        self.states = {}
+
+    def require(self, kind, window):
+        if window and (kind, window) not in self.required:
+            self.required.add((kind, window))
+            # 新节点没有历史，清空状态，下一次 sync 时从头补算
+            self.states.clear()
+
+    def add_strategy(self, strategy):
+        self.require("sma", strategy.sma_window)
+        self.require("rsi", strategy.rsi_window)
+
+    def _state(self, symbol):
+        symbol = symbol.upper()
+        state = self.states.get(symbol)
+        if state is None:
+            state = SymbolGraph(self.required)
+            self.states[symbol] = state
+        return state
+
+    def update(self, symbol, close, timestamp=None):
+        """喂入一根 K 线或当前 K 线的最新价；时间戳相同替换最后一根，更早的忽略"""
+        state = self._state(symbol)
+        timestamp = _ts_ns(timestamp)
+        replace_last = False
+        if timestamp is not None and state.last_timestamp is not None:
+            if timestamp < state.last_timestamp:
+                return
+            replace_last = timestamp == state.last_timestamp
+        for node in state.nodes.values():
+            node.update(close, replace_last=replace_last)
+        if not replace_last:
+            state.count += 1
+        state.last_close = float(close)
+        if timestamp is not None:
+            state.last_timestamp = timestamp
+
+    def sync(self, symbol, bars):
+        """与 IndicatorEngine.sync 相同：只处理上次之后（含最后一根）的 K 线"""
+        self.sync_arrays(symbol, *bar_arrays(bars))
+
+    def sync_arrays(self, symbol, times, closes):
+        """与 IndicatorEngine.sync_arrays 相同：输入 UTC 纳秒时间戳和收盘价数组（可以是环形缓冲的视图）"""
+        start = _new_bars(times, self._state(symbol).last_timestamp)
+        for ts, close in zip(times[start:].tolist(), closes[start:].tolist()):
+            self.update(symbol, close, timestamp=ts)
+
+    def closes(self, symbols):
+        return np.array([_nan(self._state(s).last_close) for s in symbols], dtype="float64")
+
+    def counts(self, symbols):
+        return np.array([self._state(s).count for s in symbols])
+
+    def latest(self, symbols, kind, window):
+        """一组标的某个节点的最新值数组，window 为空或数据不足时为 NaN"""
+        if not window:
+            return np.full(len(symbols), np.nan)
+        return np.array([_nan(self._state(s).nodes[(kind, window)].value) for s in symbols], dtype="float64")
+
+
+class IndicatorPanel:
+    """
+    整块历史（时间 × 标的 收盘价矩阵）上的指标缓存：同一个 (指标, 窗口) 只计算一次，
+    多个策略在同一块 K 线上生成信号时共用。
+    """
+
+    def __init__(self, closes):
+        self.closes = closes
+        self.cache = {}
+
+    def _get(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def prices(self):
+        return self._get(("close",), lambda: self.closes.to_numpy(dtype="float64"))
+
+    def counts(self):
+        # 每个标的截至每个时间点的 K 线根数
+        return self._get(("count",), lambda: self.closes.notna().cumsum().to_numpy())
+
+    def sma(self, window):
+        if not window:
+            return np.nan
+        return self._get(("sma", window), lambda: sma_frame(self.closes, window).to_numpy())
+
+    def rsi(self, window):
+        if not window:
+            return np.nan
+        return self._get(("rsi", window), lambda: rsi_frame(self.closes, window).to_numpy())
+
+
+def _nan(value):
+    return np.nan if value is None else value
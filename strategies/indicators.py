@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+from data.ring_buffer import bar_arrays
+
+
+class RollingSMA:
+    """滚动均线，增量更新 O(1)：窗口内的值放在定长 NumPy 数组里循环覆盖，维护累加和"""
+
+    __slots__ = ("window", "values", "pos", "count", "total", "updates")
+
+    def __init__(self, window=20):
+        self.window = window
+        self.values = np.zeros(window)
+        # 下一个写入的位置和窗口内已有的值数
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value, replace_last=False):
+        value = float(value)
+        if replace_last and self.count:
+            # 同一根 K 线价格变化（盘中成交），替换最后一个值
+            last = (self.pos - 1) % self.window
+            self.total += value - self.values[last]
+            self.values[last] = value
+        else:
+            if self.count == self.window:
+                self.total -= self.values[self.pos]
+            else:
+                self.count += 1
+            self.values[self.pos] = value
+            self.pos = (self.pos + 1) % self.window
+            self.total += value
+
+        # 累加和长期运行会有浮点误差，每隔一段时间按窗口重算一次（摊销后仍是 O(1)）
+        self.updates += 1
+        if self.updates % (self.window * 100) == 0:
+            self.total = float(self.values[:self.count].sum())
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return None
+        return self.total / self.window
+
+
+class WilderRSI:
+    """
+    Wilder 平滑 RSI，增量更新 O(1)。
+    计算方式与 ta.momentum.RSIIndicator 一致：ewm(alpha=1/window, adjust=False)，
+    第一根 K 线的涨跌记为 0，满 window 根后才有值。
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.alpha = 1.0 / window
+        self.count = 0
+        self.prev_close = None
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+        self.last_close = None
+        # 最后一根 K 线之前的状态，用于同一根 K 线价格更新时回滚
+        self._before_last = None
+
+    def update(self, close, replace_last=False):
+        close = float(close)
+        if replace_last and self._before_last is not None:
+            self.count, self.prev_close, self.avg_up, self.avg_down = self._before_last
+        else:
+            self.prev_close = self.last_close
+        self._before_last = (self.count, self.prev_close, self.avg_up, self.avg_down)
+
+        if self.prev_close is None:
+            up = down = 0.0
+        else:
+            diff = close - self.prev_close
+            up = diff if diff > 0 else 0.0
+            down = -diff if diff < 0 else 0.0
+
+        if self.count == 0:
+            self.avg_up, self.avg_down = up, down
+        else:
+            self.avg_up += self.alpha * (up - self.avg_up)
+            self.avg_down += self.alpha * (down - self.avg_down)
+        self.count += 1
+        self.last_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return None
+        if self.avg_down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_up / self.avg_down)
+
+
+class SymbolIndicators:
+    def __init__(self, sma_window, rsi_window):
+        self.sma = RollingSMA(sma_window)
+        self.rsi = WilderRSI(rsi_window)
+        self.last_timestamp = None
+        self.last_close = None
+
+
+class IndicatorEngine:
+    """
+    按标的维护 SMA / RSI 的增量状态。新 K 线或新成交到来时 O(1) 更新，
+    不管保留多少历史，每个 tick 的计算量都不变。
+    RSI 的平滑状态从第一次同步的 K 线开始一直往后累积，结果等于在所有已见 K 线上算的 Wilder RSI，
+    而不是每轮只用最近 lookback 天重新算：两者只差窗口起点的种子，差异按 (1 - 1/window)^n 衰减。
+    """
+
+    def __init__(self, sma_window=20, rsi_window=14):
+        self.sma_window = sma_window
+        self.rsi_window = rsi_window
+        self.states = {}
+
+    def _state(self, symbol):
+        symbol = symbol.upper()
+        state = self.states.get(symbol)
+        if state is None:
+            state = SymbolIndicators(self.sma_window, self.rsi_window)
+            self.states[symbol] = state
+        return state
+
+    def update(self, symbol, close, timestamp=None):
+        """
+        喂入一根 K 线（或当前 K 线的最新成交价）。
+        timestamp（UTC 纳秒或任意时间类型）与上一次相同 -> 替换最后一根；比上一次早 -> 忽略。
+        返回 (sma, rsi)，数据不足时对应值为 None。
+        """
+        state = self._state(symbol)
+        timestamp = _ts_ns(timestamp)
+        replace_last = False
+        if timestamp is not None and state.last_timestamp is not None:
+            if timestamp < state.last_timestamp:
+                return state.sma.value, state.rsi.value
+            replace_last = timestamp == state.last_timestamp
+
+        state.sma.update(close, replace_last=replace_last)
+        state.rsi.update(close, replace_last=replace_last)
+        state.last_close = float(close)
+        if timestamp is not None:
+            state.last_timestamp = timestamp
+        return state.sma.value, state.rsi.value
+
+    def sync(self, symbol, bars):
+        """
+        用一段 K 线追上最新状态：只处理上次之后（含最后一根）的 K 线，
+        所以每轮重复传入整段历史也只会增量计算。
+        """
+        return self.sync_arrays(symbol, *bar_arrays(bars))
+
+    def sync_arrays(self, symbol, times, closes):
+        """
+        与 sync 相同，输入为升序的 UTC 纳秒时间戳和收盘价数组，
+        可以直接传 BarRing / BarProvider.get_window 的视图，不需要构造 DataFrame。
+        """
+        state = self._state(symbol)
+        start = _new_bars(times, state.last_timestamp)
+        for ts, close in zip(times[start:].tolist(), closes[start:].tolist()):
+            self.update(symbol, close, timestamp=ts)
+        return state.sma.value, state.rsi.value
+
+    def latest(self, symbol):
+        """返回 (close, sma, rsi)"""
+        state = self._state(symbol)
+        return state.last_close, state.sma.value, state.rsi.value
+
+    def reset(self, symbol=None):
+        if symbol is None:
+            self.states.clear()
+        else:
+            self.states.pop(symbol.upper(), None)
+
+
+def _ts_ns(timestamp):
+    # 时间戳统一成 UTC 纳秒整数，DataFrame 和环形缓冲两种输入可以混用
+    if timestamp is None or isinstance(timestamp, (int, np.integer)):
+        return timestamp
+    return pd.Timestamp(timestamp).value
+
+
+def _new_bars(times, last_timestamp):
+    # 需要处理的第一根 K 线下标：上次的最后一根（可能有变化）及之后
+    if last_timestamp is None or not len(times):
+        return 0
+    return int(np.searchsorted(times, last_timestamp, side="left"))
+
+
+# ---------- 批量版本（回测用），与增量版本公式一致 ----------
+def sma_series(closes, window=20):
+    return pd.Series(closes).rolling(window=window).mean()
+
+
+def rsi_series(closes, window=14):
+    closes = pd.Series(closes)
+    diff = closes.diff(1)
+    up = diff.where(diff > 0, 0.0)
+    down = -diff.where(diff < 0, 0.0)
+    avg_up = up.ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    avg_down = down.ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    return pd.Series(rsi, index=closes.index)
+
+
+def rsi_frame(closes, window=14):
+    """
+    时间 × 标的 矩阵按列计算 RSI，一次向量运算完成。
+    NaN 视为该标的在这个时间点没有 K 线：跳过它，结果与对每个标的单独调用 rsi_series 一致。
+    """
+    missing = closes.isna()
+    diff = closes - closes.ffill().shift(1)
+    # 每列第一根 K 线的涨跌记为 0（与 rsi_series 相同）
+    diff = diff.mask(diff.isna() & ~missing, 0.0)
+    up = diff.clip(lower=0.0)
+    down = (-diff).clip(lower=0.0)
+    avg_up = up.ewm(alpha=1 / window, min_periods=window, adjust=False, ignore_na=True).mean()
+    avg_down = down.ewm(alpha=1 / window, min_periods=window, adjust=False, ignore_na=True).mean()
+    rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    rsi[avg_down.isna().to_numpy() | missing.to_numpy()] = np.nan
+    return pd.DataFrame(rsi, index=closes.index, columns=closes.columns)
+
+
+def sma_frame(closes, window=20):
+    """时间 × 标的 矩阵按列计算 SMA，NaN（没有 K 线）跳过，与逐个标的调用 sma_series 一致"""
+    if not closes.isna().values.any():
+        return closes.rolling(window=window).mean()
+    return closes.apply(lambda col: col.dropna().rolling(window=window).mean().reindex(col.index))
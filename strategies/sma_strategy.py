@@ -1,34 +1,14 @@
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.timeframe import TimeFrame
-from datetime import datetime, timedelta
+import numpy as np
 
+from strategies.base_strategy import BaseStrategy
 
-class SMAStrategy:
-    def __init__(self, api_key, api_secret):
-        self.client = StockHistoricalDataClient(api_key, api_secret)
 
-    def get_signal(self, symbol: str) -> str:
-        end = datetime.now()
-        start = end - timedelta(days=20)
+class SMAStrategy(BaseStrategy):
+    name = "SMA策略"
+    sma_window = 5
+    lookback_days = 20
+    min_bars = 5
 
-        request = StockBarsRequest(
-            symbol_or_symbols=symbol,
-            timeframe=TimeFrame.Day,
-            start=start,
-            end=end
-        )
-
-        bars = self.client.get_stock_bars(request).df
-        closes = bars['close'].tail(5)
-        sma = closes.mean()
-        latest = closes.iloc[-1]
-
-        print(f"[SMA策略] 当前: {latest:.2f}, SMA(5): {sma:.2f}")
-
-        if latest > sma:
-            return "BUY"
-        elif latest < sma:
-            return "SELL"
-        else:
-            return "HOLD"
\ No newline at end of file
+    def rule(self, price, sma, rsi):
+        # 价格在 SMA(5) 之上买入，之下卖出
+        return np.select([price > sma, price < sma], [1, -1], 0)
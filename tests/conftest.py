@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接从仓库根目录导入各模块（与 python main.py / python -m benchmarks.run 的导入方式相同）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
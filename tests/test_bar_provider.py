@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_bars
+from data.ring_buffer import BAR_FIELDS, utc_ns
+
+pytest.importorskip("alpaca")
+
+from data.bar_provider import BarProvider  # noqa: E402
+from data.fake_data_client import FakeDataClient  # noqa: E402
+from strategies.rsi_strategy import RSIStrategy  # noqa: E402
+from strategies.sma_strategy import SMAStrategy  # noqa: E402
+
+
+@pytest.fixture
+def bars():
+    end = pd.Timestamp(datetime.now()).tz_localize("UTC")
+    return make_bars(n_symbols=3, n_bars=120, end=end, seed=1)
+
+
+def test_one_request_shared_by_all_strategies(bars):
+    client = FakeDataClient(bars)
+    symbols = sorted(bars.index.get_level_values(0).unique())
+    provider = BarProvider(client, symbols, days=200)
+    provider.refresh()
+
+    rsi = RSIStrategy(bar_provider=provider).get_signals(symbols)
+    sma = SMAStrategy(bar_provider=provider).get_signals(symbols)
+    assert set(rsi) == set(sma) == set(symbols)
+    # 一轮只发一次多标的请求，各策略读本地切片
+    assert client.calls == 1
+
+
+def test_window_matches_frame(bars):
+    symbols = sorted(bars.index.get_level_values(0).unique())
+    provider = BarProvider(FakeDataClient(bars), symbols, days=200)
+    provider.refresh()
+
+    for symbol in symbols:
+        expected = bars.loc[[symbol], BAR_FIELDS]
+        expected_times = utc_ns(expected.index.get_level_values(-1))
+        df = provider.get_bars(symbol)
+        np.testing.assert_array_equal(utc_ns(df.index.get_level_values(-1)), expected_times)
+        np.testing.assert_array_equal(df.to_numpy(), expected.to_numpy())
+
+        times, window = provider.get_window(symbol)
+        np.testing.assert_array_equal(times, expected_times)
+        np.testing.assert_array_equal(window.T, expected.to_numpy())
+        # days 只取最近一段，与 get_bars 的切片相同
+        assert len(provider.get_window(symbol, days=10)[0]) == len(provider.get_bars(symbol, days=10))
+    assert provider.get_bars("MISSING").empty
+
+
+def test_ingest_overwrites_last_bar_and_skips_stale(bars):
+    symbol = bars.index.get_level_values(0)[0]
+    provider = BarProvider(None, [symbol], days=200)
+    one = bars.loc[[symbol]]
+    provider.set_bars(one.iloc[:-1])
+
+    # 与最后一根相同时间戳的 K 线覆盖它，更早的忽略，更新的追加
+    changed = one.iloc[-2:-1].assign(close=1.0)
+    provider.ingest(pd.concat([one.iloc[:3], changed, one.iloc[-1:]]))
+    closes = provider.get_window(symbol)[1][3]
+    assert len(closes) == len(one)
+    assert closes[-2] == 1.0
+    assert closes[-1] == one["close"].iloc[-1]
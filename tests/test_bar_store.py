@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_bars
+
+pytest.importorskip("alpaca")
+
+from data.bar_store import BarStore  # noqa: E402
+from data.fake_data_client import FakeDataClient  # noqa: E402
+
+
+@pytest.fixture
+def bars():
+    return make_bars(n_symbols=3, n_bars=60, seed=2)
+
+
+def test_append_and_load_roundtrip(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    symbol = "S0000"
+    one = bars.loc[[symbol]]
+    assert store.append(symbol, one) == len(one)
+
+    loaded = store.load(symbol)
+    np.testing.assert_array_equal(loaded.to_numpy(), one.to_numpy())
+    np.testing.assert_array_equal(loaded.index.get_level_values(-1).asi8, one.index.get_level_values(-1).as_unit("ns").asi8)
+    assert store.last_timestamp(symbol) == one.index.get_level_values(-1)[-1]
+
+    # 按时间截取
+    start = one.index.get_level_values(-1)[10]
+    assert len(store.load(symbol, start=start)) == len(one) - 10
+    assert store.load("MISSING").empty
+
+
+def test_append_overwrites_from_first_new_bar(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    one = bars.loc[["S0001"]]
+    store.append("S0001", one.iloc[:40])
+    # 重新拉到的最后一根（收盘前会变）替换旧值，之后的追加
+    changed = one.iloc[39:].copy()
+    changed.iloc[0, changed.columns.get_loc("close")] = 123.0
+    store.append("S0001", changed)
+
+    loaded = store.load("S0001")
+    assert len(loaded) == len(one)
+    assert loaded["close"].iloc[39] == 123.0
+    assert loaded["close"].iloc[-1] == one["close"].iloc[-1]
+
+
+def test_meta_bounds_rows_after_partial_write(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    one = bars.loc[["S0002"]]
+    store.append("S0002", one.iloc[:20])
+    # 模拟写到一半：列文件已经变长，meta.json 还是旧的
+    folder = store._dir("S0002", "1Day")
+    np.save(f"{folder}/close.npy", np.arange(30, dtype="float64"))
+    np.save(f"{folder}/timestamp.npy", np.arange(30, dtype="int64"))
+    assert len(store.load("S0002")) == 20
+
+
+def test_sync_only_requests_new_bars(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    times = bars.index.get_level_values(-1)
+    cutoff = times[45]
+    client = FakeDataClient(bars[times <= cutoff])
+    symbols = ["S0000", "S0001", "S0002"]
+    start = times.min().tz_localize(None).to_pydatetime()
+    end = times.max().tz_localize(None).to_pydatetime()
+    store.sync(client, symbols, start, end=end)
+    assert client.calls == 1
+
+    # 之后只从各自最后一根开始拉；起点相同的标的合并成一个请求
+    client = FakeDataClient(bars)
+    fetched = store.sync(client, symbols, start, end=end)
+    assert client.calls == 1
+    assert fetched == 3 * (len(bars.loc[["S0000"]]) - 45)
+    for symbol in symbols:
+        pd.testing.assert_series_equal(
+            store.load(symbol)["close"].reset_index(drop=True),
+            bars.loc[symbol, "close"].reset_index(drop=True),
+        )
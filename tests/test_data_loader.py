@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.data_loader import load_csv_bars, load_csv_columns, load_csv_data
+
+
+def _write_csv(path, symbols=("aaa", "bbb"), n=25):
+    times = pd.date_range("2024-01-02 14:30", periods=n, freq="1min")
+    rows = []
+    for k, symbol in enumerate(symbols):
+        for j, ts in enumerate(times):
+            price = 10.0 * (k + 1) + j
+            rows.append([ts.strftime("%Y-%m-%d %H:%M:%S"), symbol, price, price + 1, price - 1, price + 0.5, 100 + j])
+    frame = pd.DataFrame(rows, columns=["Date", "Symbol", "Open", "High", "Low", "Close", "Volume"])
+    frame.sort_values("Date", kind="stable").to_csv(path, index=False)
+    return frame
+
+
+def test_chunked_columns_match_row_reader(tmp_path):
+    path = tmp_path / "bars.csv"
+    _write_csv(path)
+    rows = load_csv_data(path)
+
+    # chunksize 很小，跨块拼接的结果应与逐行读取一致
+    cols = load_csv_columns(path, cache_root=None, chunksize=7)
+    assert len(cols["timestamp"]) == len(rows)
+    np.testing.assert_array_equal(cols["close"], [r["close"] for r in rows])
+    np.testing.assert_array_equal(cols["volume"], [r["volume"] for r in rows])
+    assert cols["volume"].dtype == np.int64
+    assert set(cols["symbol"]) == {"AAA", "BBB"}
+    expected = pd.to_datetime([r["date"] for r in rows], utc=True).tz_localize(None).to_numpy("datetime64[ns]")
+    np.testing.assert_array_equal(cols["timestamp"], expected.view("int64"))
+
+
+def test_memmap_cache_reused_and_invalidated(tmp_path, capsys):
+    path = tmp_path / "bars.csv"
+    _write_csv(path)
+    cache = tmp_path / "cache"
+    plain = load_csv_columns(path, cache_root=None)
+
+    first = load_csv_columns(path, cache_root=str(cache), chunksize=10)
+    assert "已缓存" in capsys.readouterr().out
+    second = load_csv_columns(path, cache_root=str(cache))
+    assert "已缓存" not in capsys.readouterr().out
+    assert isinstance(second["close"], np.memmap)
+    for name in plain:
+        np.testing.assert_array_equal(first[name], plain[name])
+        np.testing.assert_array_equal(second[name], plain[name])
+
+    # 源文件变化后重建缓存
+    _write_csv(path, symbols=("aaa",), n=5)
+    third = load_csv_columns(path, cache_root=str(cache))
+    assert "已缓存" in capsys.readouterr().out
+    assert len(third["timestamp"]) == 5
+
+
+def test_load_csv_bars_index_and_range(tmp_path):
+    path = tmp_path / "spy.csv"
+    frame = _write_csv(path, symbols=("x",), n=10).drop(columns="Symbol")
+    frame.to_csv(path, index=False)
+
+    bars = load_csv_bars(path, cache_root=str(tmp_path / "cache"))
+    assert bars.index.names == ["symbol", "timestamp"]
+    assert set(bars.index.get_level_values("symbol")) == {"SPY"}
+    assert str(bars.index.get_level_values("timestamp").tz) == "UTC"
+    assert list(bars.columns) == ["open", "high", "low", "close", "volume"]
+
+    window = load_csv_bars(path, cache_root=str(tmp_path / "cache"), start="2024-01-02 14:33", end="2024-01-02 14:35")
+    assert len(window) == 3
+    assert window["close"].tolist() == pytest.approx([13.5, 14.5, 15.5])
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from backtest.engine import _position_state_loop, position_state, run_rsi_backtest, trade_stats
+from benchmarks.synthetic import make_bars
+
+
+def _loop_rsi_backtest(closes, sma, rsi, buy_thresh, sell_thresh):
+    """逐行循环的参考实现（向量化之前 backtest_and_plot 的写法）"""
+    position = None
+    buys, sells = [], []
+    for i in range(len(closes)):
+        if np.isnan(sma[i]) or np.isnan(rsi[i]):
+            continue
+        if position is None and rsi[i] < buy_thresh:
+            position = closes[i]
+            buys.append(i)
+        elif position is not None and rsi[i] > sell_thresh:
+            sells.append(i)
+            position = None
+    return buys, sells
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_position_state_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    entry = rng.random(500) < 0.1
+    exit = (rng.random(500) < 0.1) & ~entry
+    np.testing.assert_array_equal(position_state(entry, exit), _position_state_loop(entry, exit))
+
+
+def test_position_state_with_overlapping_signals():
+    entry = np.array([1, 1, 0, 1, 0, 1], dtype=bool)
+    exit = np.array([0, 1, 1, 1, 0, 1], dtype=bool)
+    assert position_state(entry, exit).tolist() == [True, False, False, True, True, False]
+
+
+@pytest.mark.parametrize("buy, sell", [(30, 70), (40, 60), (45, 50)])
+def test_vectorized_backtest_matches_loop(buy, sell):
+    df = make_bars(n_symbols=1, n_bars=600, seed=11, volatility=0.03)[["close"]].reset_index()
+    result = run_rsi_backtest(df, rsi_buy_thresh=buy, rsi_sell_thresh=sell)
+
+    closes = df["close"].to_numpy()
+    buys, sells = _loop_rsi_backtest(closes, df["sma"].to_numpy(), df["rsi"].to_numpy(), buy, sell)
+    assert result["buy_prices"] == list(closes[buys])
+    assert result["sell_prices"] == list(closes[sells])
+    assert result["total_trades"] == len(sells)
+    assert result["total_profit"] == pytest.approx((closes[sells] - closes[buys][:len(sells)]).sum())
+
+
+def test_trade_stats_ignores_open_trade_and_tracks_drawdown():
+    stats = trade_stats([10, 10, 10, 10], [12, 9, 8])
+    assert stats["total_trades"] == 3
+    assert stats["win_trades"] == 1
+    assert stats["total_profit"] == pytest.approx(-1.0)
+    assert stats["max_drawdown"] == pytest.approx(3.0)
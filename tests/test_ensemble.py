@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_bars
+from strategies.ensemble import StrategyEnsemble, WeightedVote, any_vote, majority_vote, unanimous_vote
+from strategies.hybrid_strategy import HybridStrategy
+from strategies.rsi_strategy import RSIStrategy
+from strategies.sma_strategy import SMAStrategy
+
+
+VOTES = np.array([
+    [1, 1, -1, 0, 1],
+    [1, -1, -1, 0, 0],
+    [0, -1, -1, 1, 0],
+])
+
+
+def test_vote_rules():
+    assert majority_vote(VOTES).tolist() == [1, -1, -1, 0, 0]
+    assert unanimous_vote(VOTES).tolist() == [0, 0, -1, 0, 0]
+    assert any_vote(VOTES).tolist() == [1, -1, -1, 1, 1]
+    assert WeightedVote(0.5)(VOTES, [3, 1, 1]).tolist() == [1, 0, -1, 0, 1]
+
+
+def _strategies():
+    return [SMAStrategy(), RSIStrategy(rsi_buy_thresh=45, rsi_sell_thresh=55), HybridStrategy()]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_latest_signals_match_member_strategies(seed):
+    bars = make_bars(n_symbols=12, n_bars=120, seed=seed, volatility=0.04)
+    members = _strategies()
+    ensemble = StrategyEnsemble(members)
+    signals = ensemble.get_signals(bars=bars)
+
+    codes = {"BUY": 1, "SELL": -1, "HOLD": 0}
+    own = [s.get_signals(bars=bars) for s in members]
+    for symbol, signal in signals.items():
+        expected = {s.name: o[symbol] for s, o in zip(members, own)}
+        assert ensemble.last_votes[symbol] == expected
+        votes = np.array([[codes[v]] for v in expected.values()])
+        assert codes[signal] == majority_vote(votes)[0]
+    # 传入的 bars 用新的指标图计算，不污染实盘路径的增量状态
+    assert ensemble.graph.states == {}
+
+
+def test_generate_signals_is_vote_over_members():
+    bars = make_bars(n_symbols=5, n_bars=200, seed=7, volatility=0.04)
+    members = _strategies()
+    ensemble = StrategyEnsemble(members, vote="majority")
+    combined = ensemble.generate_signals(bars)
+
+    stacked = np.stack([s.generate_signals(bars).to_numpy() for s in members])
+    np.testing.assert_array_equal(combined.to_numpy(), majority_vote(stacked))
+    assert (combined.to_numpy() != 0).any()
+
+
+def test_mixed_timeframes_rejected():
+    intraday = SMAStrategy()
+    intraday.timeframe = "5Min"
+    with pytest.raises(ValueError):
+        StrategyEnsemble([intraday, RSIStrategy()])
@@ -0,0 +1,69 @@
+import json
+
+from risk.basic_risk import BasicRiskManager
+from risk.entry_journal import EntryPriceJournal
+
+
+def test_updates_survive_restart(tmp_path):
+    entry_file = str(tmp_path / "entry_price.json")
+    risk = BasicRiskManager(entry_file=entry_file)
+    risk.record_entry_price("AAA", 10.0)
+    risk.record_entry_price("BBB", 20.0)
+    risk.clear_entry_price("AAA")
+    risk.record_entry_price("BBB", 21.0)
+
+    # 只追加日志，没有重写快照
+    assert not (tmp_path / "entry_price.json").exists()
+    assert BasicRiskManager(entry_file=entry_file).entry_price == {"BBB": 21.0}
+
+
+def test_torn_last_line_is_dropped_and_truncated(tmp_path):
+    entry_file = str(tmp_path / "entry_price.json")
+    journal = EntryPriceJournal(entry_file)
+    journal.append([{"op": "set", "symbol": "AAA", "price": 1.5}])
+    # 崩溃在写最后一条的中途
+    with open(journal.journal_file, "a") as f:
+        f.write('{"op": "set", "symbol": "BB')
+
+    assert EntryPriceJournal(entry_file).load() == {"AAA": 1.5}
+    # 坏尾巴截掉后，新追加的记录不会接在坏行后面
+    journal = EntryPriceJournal(entry_file)
+    journal.load()
+    journal.append([{"op": "set", "symbol": "CCC", "price": 3.0}])
+    assert EntryPriceJournal(entry_file).load() == {"AAA": 1.5, "CCC": 3.0}
+
+
+def test_corrupt_middle_line_is_skipped(tmp_path):
+    entry_file = str(tmp_path / "entry_price.json")
+    with open(entry_file + ".journal", "w") as f:
+        f.write('{"op": "set", "symbol": "AAA", "price": 1.0}\n')
+        f.write("garbage\n")
+        f.write('{"op": "set", "symbol": "BBB", "price": 2.0}\n')
+    assert EntryPriceJournal(entry_file).load() == {"AAA": 1.0, "BBB": 2.0}
+
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    entry_file = str(tmp_path / "entry_price.json")
+    risk = BasicRiskManager(entry_file=entry_file)
+    risk.journal.compact_every = 5
+    for i in range(5):
+        risk.record_entry_price(f"S{i}", float(i))
+
+    with open(entry_file) as f:
+        assert json.load(f) == {f"S{i}": float(i) for i in range(5)}
+    assert (tmp_path / "entry_price.json.journal").read_text() == ""
+
+    # 快照之后的更新继续走日志，重启时快照 + 日志一起恢复
+    risk.clear_entry_price("S0")
+    assert BasicRiskManager(entry_file=entry_file).entry_price == {f"S{i}": float(i) for i in range(1, 5)}
+
+
+def test_batch_writes_once(tmp_path):
+    entry_file = str(tmp_path / "entry_price.json")
+    risk = BasicRiskManager(entry_file=entry_file)
+    with risk.batch():
+        risk.record_entry_price("AAA", 1.0)
+        risk.record_entry_price("BBB", 2.0)
+        # with 块结束前还没有写盘
+        assert not (tmp_path / "entry_price.json.journal").exists()
+    assert len((tmp_path / "entry_price.json.journal").read_text().splitlines()) == 2
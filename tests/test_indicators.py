@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_bars
+from data.ring_buffer import bar_arrays
+from strategies.indicators import IndicatorEngine, RollingSMA, WilderRSI, rsi_series, sma_series
+
+ta = pytest.importorskip("ta")
+
+
+@pytest.fixture
+def closes():
+    return make_bars(n_symbols=1, n_bars=400, seed=3)["close"].to_numpy()
+
+
+def _ta_rsi(closes, window=14):
+    return ta.momentum.RSIIndicator(pd.Series(closes), window=window).rsi().to_numpy()
+
+
+@pytest.mark.parametrize("window", [6, 14, 21])
+def test_incremental_rsi_matches_ta(closes, window):
+    rsi = WilderRSI(window)
+    got = np.array([np.nan if v is None else v for v in map(rsi.update, closes)])
+    np.testing.assert_allclose(got[window:], _ta_rsi(closes, window)[window:], rtol=1e-9)
+    assert np.isnan(got[:window - 1]).all()
+
+
+def test_batch_rsi_matches_ta(closes):
+    np.testing.assert_allclose(rsi_series(closes, 14).to_numpy()[14:], _ta_rsi(closes)[14:], rtol=1e-9)
+
+
+def test_rolling_sma_matches_pandas(closes):
+    sma = RollingSMA(20)
+    got = np.array([np.nan if v is None else v for v in map(sma.update, closes)])
+    np.testing.assert_allclose(got, sma_series(closes, 20).to_numpy(), rtol=1e-9)
+
+
+def test_replace_last_equals_fresh_computation(closes):
+    # 同一根 K 线多次更新（盘中成交）后的结果，与只喂最终价格的结果相同
+    rsi, sma = WilderRSI(14), RollingSMA(20)
+    for close in closes[:-1]:
+        rsi.update(close)
+        sma.update(close)
+    rsi.update(closes[-1] * 1.03)
+    sma.update(closes[-1] * 1.03)
+    rsi.update(closes[-1] * 0.97, replace_last=True)
+    sma.update(closes[-1] * 0.97, replace_last=True)
+    rsi.update(closes[-1], replace_last=True)
+    sma.update(closes[-1], replace_last=True)
+
+    assert rsi.value == pytest.approx(rsi_series(closes, 14).iloc[-1], rel=1e-9)
+    assert sma.value == pytest.approx(sma_series(closes, 20).iloc[-1], rel=1e-9)
+
+
+def test_sync_is_incremental():
+    bars = make_bars(n_symbols=1, n_bars=300, seed=5)
+    symbol = bars.index.get_level_values(0)[0]
+    engine = IndicatorEngine()
+    engine.sync(symbol, bars.iloc[:250])
+    # 重复传入整段历史只处理新增的 K 线，结果与一次算完相同
+    engine.sync(symbol, bars.iloc[:250])
+    sma, rsi = engine.sync_arrays(symbol, *bar_arrays(bars))
+
+    closes = bars["close"].to_numpy()
+    assert sma == pytest.approx(sma_series(closes, 20).iloc[-1], rel=1e-9)
+    assert rsi == pytest.approx(rsi_series(closes, 14).iloc[-1], rel=1e-9)
+    assert engine.states[symbol].rsi.count == len(bars)
+
+
+def test_persistent_rsi_vs_trailing_window_recompute(closes):
+    """
+    增量 RSI 跨轮保留状态：等于在所有已见 K 线上算的 ta RSI；
+    与每轮只用最近 n 根重新算的 ta RSI（原来的做法）只差窗口起点的种子，n 越大差得越少。
+    """
+    engine = IndicatorEngine()
+    times = np.arange(len(closes), dtype=np.int64)
+    # 每轮看到最近 30 根（一次同步一根新 K 线）
+    for end in range(30, len(closes) + 1):
+        _, rsi = engine.sync_arrays("X", times[end - 30:end], closes[end - 30:end])
+
+    assert rsi == pytest.approx(_ta_rsi(closes)[-1], rel=1e-9)
+    diffs = [abs(rsi - _ta_rsi(closes[-n:])[-1]) for n in (30, 60, 120)]
+    assert diffs[0] > diffs[1] > diffs[2]
+    assert diffs[2] < 1e-2
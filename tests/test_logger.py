@@ -0,0 +1,68 @@
+import json
+import threading
+
+import pytest
+
+from utils import logger
+
+
+@pytest.fixture(autouse=True)
+def _isolate_logger():
+    yield
+    logger.stop_async_logging()
+    logger._sinks.clear()
+
+
+def _records(log_dir):
+    records = []
+    for path in sorted(log_dir.glob("*.jsonl")):
+        records += [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    return records
+
+
+def test_async_logging_writes_text_jsonl_and_sinks(tmp_path):
+    batches = []
+    logger.add_log_sink(batches.append)
+    logger.start_async_logging(str(tmp_path), flush_interval=0.05)
+
+    main_thread = threading.current_thread()
+    writer_threads = []
+    logger.add_log_sink(lambda records: writer_threads.append(threading.current_thread()))
+
+    logger.log_trade("BUY", "AAA", 10.0, reason="test", log_dir=str(tmp_path), qty=3)
+    logger.log_pnl(10.0, 11.0, "AAA", log_dir=str(tmp_path))
+    logger.flush_logs()
+
+    records = _records(tmp_path)
+    assert [r["type"] for r in records] == ["trade", "pnl"]
+    assert records[0]["qty"] == 3 and records[0]["price"] == 10.0
+    assert records[1]["pnl_pct"] == pytest.approx(10.0)
+    assert len(list(tmp_path.glob("*.txt"))) == 1
+    assert sum(len(b) for b in batches) == 2
+    # 文件 I/O 和 sink 都在后台线程里执行
+    assert writer_threads and all(t is not main_thread for t in writer_threads)
+
+
+def test_writes_synchronously_without_writer(tmp_path):
+    logger.log_trade("SELL", "BBB", 5.0, log_dir=str(tmp_path))
+    assert [r["action"] for r in _records(tmp_path)] == ["SELL"]
+
+
+def test_failing_sink_does_not_lose_file_records(tmp_path):
+    def broken(records):
+        raise RuntimeError("boom")
+
+    logger.add_log_sink(broken)
+    logger.log_trade("BUY", "CCC", 1.0, log_dir=str(tmp_path))
+    assert len(_records(tmp_path)) == 1
+
+
+def test_clean_old_logs_keeps_recent(tmp_path):
+    (tmp_path / "2000-01-01.txt").write_text("old")
+    (tmp_path / "2000-01-01.jsonl").write_text("{}")
+    (tmp_path / "notes.txt").write_text("keep")
+    logger.log_trade("BUY", "AAA", 1.0, log_dir=str(tmp_path))
+    logger.clean_old_logs(str(tmp_path), keep_days=15)
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert "2000-01-01.txt" not in names and "2000-01-01.jsonl" not in names
+    assert "notes.txt" in names
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_bars
+from data.ring_buffer import BAR_FIELDS, utc_ns
+
+pytest.importorskip("alpaca")
+
+from data.fake_data_client import FakeDataClient  # noqa: E402
+from data.multi_timeframe import FEED_DELAY, MultiTimeframeBars  # noqa: E402
+
+AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+
+def _recent_bars(n_symbols, n_bars, timeframe):
+    end = pd.Timestamp(datetime.now()).tz_localize("UTC")
+    return make_bars(n_symbols=n_symbols, n_bars=n_bars, timeframe=timeframe, end=end, seed=1)
+
+
+def _resample(df, timeframe):
+    df = df.droplevel(0)[BAR_FIELDS]
+    if timeframe == "1Day":
+        day = df.index.tz_convert("America/New_York").normalize().tz_convert("UTC")
+        return df.groupby(day).agg(AGG)
+    rule = {"5Min": "5min", "15Min": "15min", "1Hour": "1h"}[timeframe]
+    return df.resample(rule, label="left", closed="left").agg(AGG).dropna()
+
+
+@pytest.mark.parametrize("timeframe", ["5Min", "15Min", "1Hour", "1Day"])
+def test_multi_timeframe_matches_resample(timeframe):
+    bars = _recent_bars(2, 3 * 390, "1Min")
+    mtf = MultiTimeframeBars(FakeDataClient(bars), ["S0000", "S0001"], days=5)
+    # 前一半整块并入，后一半逐根推送，两种路径的结果都应与 pandas resample 一致
+    times = bars.index.get_level_values(-1)
+    half = times[len(times) // 4]
+    mtf.ingest(bars[times < half])
+    for (symbol, ts), row in bars[times >= half].iterrows():
+        mtf._symbol(symbol).update(pd.Timestamp(ts).value, row[BAR_FIELDS].to_numpy(dtype="float64"))
+
+    for symbol in ("S0000", "S0001"):
+        expected = _resample(bars.loc[[symbol]], timeframe)
+        got = mtf.get_bars(symbol, timeframe=timeframe).droplevel(0)
+        np.testing.assert_array_equal(utc_ns(got.index), utc_ns(expected.index))
+        np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+def test_multi_timeframe_refresh_is_incremental():
+    bars = _recent_bars(2, 2 * 390, "1Min")
+    client = FakeDataClient(bars)
+    mtf = MultiTimeframeBars(client, ["S0000", "S0001"], days=5)
+    first = mtf.refresh()
+    assert len(first) == len(bars)
+    assert client.calls == 1
+
+    # 第二轮只拉最后一根之后（含最后一根）的数据
+    second = mtf.refresh()
+    assert len(second) <= 2
+    assert len(mtf.get_window("S0000", timeframe="1Min")[0]) == 2 * 390
+
+
+def test_multi_timeframe_rejects_too_small_capacity():
+    with pytest.raises(ValueError):
+        MultiTimeframeBars(None, ["AAA"], days=5, capacity={"1Min": 1000})
+
+
+def test_illiquid_symbol_does_not_drag_request_start():
+    bars = _recent_bars(2, 2 * 390, "1Min")
+    times = bars.index.get_level_values(-1)
+    # S0001 只在最早的 100 分钟有成交
+    illiquid = (bars.index.get_level_values(0) == "S0001") & (times > times.min() + pd.Timedelta(minutes=99))
+    mtf = MultiTimeframeBars(FakeDataClient(bars[~illiquid]), ["S0000", "S0001"], days=5)
+    mtf.refresh()
+
+    now = datetime.now()
+    assert mtf._start("S0001", now) >= mtf.fetched["S0001"] - FEED_DELAY
+    last = pd.Timestamp(mtf.by_symbol["S0000"].last_ts, tz="UTC").tz_localize(None)
+    assert mtf._start("S0000", now) >= last.to_pydatetime()
+
+
+def test_capacity_follows_lookback_days():
+    bars = _recent_bars(1, 8 * 390, "1Min")
+    mtf = MultiTimeframeBars(FakeDataClient(bars), ["S0000"], days=30)
+    mtf.refresh()
+    assert len(mtf.get_window("S0000", days=30, timeframe="1Min")[0]) == len(bars)
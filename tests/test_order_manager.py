@@ -0,0 +1,138 @@
+import pytest
+
+from broker.portfolio_broker import BpsSlippage, PortfolioBroker
+
+pytest.importorskip("alpaca")
+
+from broker.order_manager import ManagedOrder, OrderManager, make_client_order_id  # noqa: E402
+
+
+class _Recorder:
+    def __init__(self):
+        self.fills = []
+        self.rejects = []
+
+    def on_fill(self, order, qty, price):
+        self.fills.append((order.symbol, order.side, qty, price))
+
+    def on_reject(self, order, qty):
+        self.rejects.append((order.symbol, order.status, qty))
+
+
+class _FlakyClient:
+    """第一次下单请求送达券商后仍然抛出超时，模拟回报丢失"""
+
+    def __init__(self, broker, failures=1, reachable=True):
+        self.broker = broker
+        self.failures = failures
+        self.reachable = reachable
+        self.submits = 0
+
+    def submit_order(self, request):
+        self.submits += 1
+        if self.failures > 0:
+            self.failures -= 1
+            if self.reachable:
+                self.broker.submit_order(request)
+            raise TimeoutError("timeout")
+        return self.broker.submit_order(request)
+
+    def get_order_by_client_id(self, client_id):
+        return self.broker.get_order_by_client_id(client_id)
+
+    def get_orders(self, filter=None):
+        return self.broker.get_orders(filter)
+
+
+def _broker(cash=100_000, prices=None):
+    prices = prices or {"AAA": 100.0, "BBB": 50.0}
+    broker = PortfolioBroker(cash, list(prices), slippage=BpsSlippage(10))
+    broker.update_prices(broker.indices(list(prices)), list(prices.values()))
+    return broker
+
+
+def _manager(client, recorder, **kwargs):
+    return OrderManager(client, on_fill=recorder.on_fill, on_reject=recorder.on_reject, retry_delay=0, **kwargs)
+
+
+def test_same_key_submits_once():
+    broker, recorder = _broker(), _Recorder()
+    manager = _manager(broker, recorder)
+    first = manager.submit("aaa", "BUY", 3, price=100.0, key="k1")
+    assert manager.submit("AAA", "BUY", 3, price=100.0, key="k1") is first
+    manager.flush(timeout=1)
+    assert list(broker.orders) == [make_client_order_id("AAA", "BUY", "k1")]
+    assert recorder.fills == [("AAA", "BUY", 3.0, pytest.approx(100.1))]
+    manager.shutdown()
+
+
+def test_fills_applied_only_in_poll_thread():
+    broker, recorder = _broker(), _Recorder()
+    manager = _manager(broker, recorder)
+    order = manager.submit("BBB", "BUY", 4, price=50.0, key="k1")
+    for future in list(manager.futures.values()):
+        future.result()
+
+    # 线程池只把回报放进队列，订单字段留给 poll 更新
+    assert (order.status, order.filled_qty, order.submitted_at) == ("pending_submit", 0.0, None)
+    manager.poll()
+    assert (order.status, order.filled_qty, order.settled) == ("filled", 4.0, True)
+    assert order.submitted_at is not None
+    assert recorder.fills == [("BBB", "BUY", 4.0, pytest.approx(50.05))]
+    manager.shutdown()
+
+
+def test_partial_fill_and_reject():
+    # 现金只够买 2 股 AAA；CCC 没有价格，直接拒单
+    broker, recorder = _broker(cash=250, prices={"AAA": 100.0, "CCC": 0.0}), _Recorder()
+    manager = _manager(broker, recorder)
+    partial = manager.submit("AAA", "BUY", 5, price=100.0, key="k1")
+    rejected = manager.submit("CCC", "BUY", 5, price=10.0, key="k1")
+    manager.flush(timeout=0.2, interval=0.05)
+
+    assert (partial.status, partial.filled_qty) == ("partially_filled", 2.0)
+    assert recorder.fills == [("AAA", "BUY", 2.0, pytest.approx(100.1))]
+    assert rejected.settled
+    assert recorder.rejects == [("CCC", "rejected", 5.0)]
+    # 部分成交的订单不会结束，不走 shutdown 里的 flush 等待
+    manager.pool.shutdown()
+
+
+def test_timeout_retry_finds_existing_order():
+    broker, recorder = _broker(), _Recorder()
+    client = _FlakyClient(broker)
+    manager = _manager(client, recorder)
+    order = manager.submit("AAA", "BUY", 2, price=100.0, key="k1")
+    manager.flush(timeout=1)
+
+    # 第一次请求已经到达券商，按 client_order_id 查到后不再重复下单
+    assert client.submits == 1
+    assert len(broker.orders) == 1
+    assert order.status == "filled"
+    assert [f[2] for f in recorder.fills] == [2.0]
+    manager.shutdown()
+
+
+def test_submit_failure_after_retries():
+    broker, recorder = _broker(), _Recorder()
+    client = _FlakyClient(broker, failures=10, reachable=False)
+    manager = _manager(client, recorder, retries=2)
+    order = manager.submit("AAA", "BUY", 2, price=100.0, key="k1")
+    manager.flush(timeout=1)
+
+    assert client.submits == 3
+    assert order.status == "failed"
+    assert isinstance(order.error, TimeoutError)
+    assert recorder.rejects == [("AAA", "failed", 2.0)]
+    manager.shutdown()
+
+
+def test_stale_update_ignored():
+    class _Report:
+        def __init__(self, status, filled_qty):
+            self.id, self.status, self.filled_qty, self.filled_avg_price = "1", status, filled_qty, 10.0
+
+    order = ManagedOrder("cid", "AAA", "BUY", 5)
+    assert order.update(_Report("partially_filled", 3))
+    assert not order.update(_Report("accepted", 0))
+    assert (order.status, order.filled_qty) == ("partially_filled", 3.0)
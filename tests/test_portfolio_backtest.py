@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.portfolio_backtest import run_portfolio_backtest
+from benchmarks.synthetic import make_bars
+from broker.portfolio_broker import BpsSlippage, PercentCommission
+from risk.position_sizing import PositionSizer
+
+
+def test_portfolio_backtest_accounting():
+    bars = make_bars(n_symbols=6, n_bars=300, seed=2, volatility=0.03)
+    result = run_portfolio_backtest(
+        bars, max_position_size=3, commission=PercentCommission(0.001), slippage=BpsSlippage(5),
+    )
+    broker = result["broker"]
+    last = bars["close"].groupby(level=0).last()
+
+    # 最后的净值 = 现金 + 持仓按最后收盘价计价
+    held = sum(qty * last[symbol] for symbol, qty in result["positions"].items())
+    assert result["equity"].iloc[-1] == pytest.approx(broker.cash + held)
+    assert broker.cash >= 0
+    assert len(result["positions"]) <= 3
+
+    # 入场价记的是含滑点的成交价
+    trades = result["trades"]
+    buys = trades[trades["action"] == "BUY"]
+    closes = bars["close"]
+    for row in buys.itertuples():
+        assert row.price == pytest.approx(closes.loc[(row.symbol, row.timestamp)] * 1.0005)
+
+
+def test_portfolio_backtest_sizer_respects_exposure():
+    bars = make_bars(n_symbols=8, n_bars=250, seed=4, volatility=0.03)
+    sizer = PositionSizer(max_exposure=0.5)
+    result = run_portfolio_backtest(bars, sizer=sizer, max_position_size=8)
+    closes = bars["close"].unstack(level=0)
+    trades = result["trades"]
+    assert not trades.empty
+    assert (trades["qty"] > 0).all()
+
+    # 每个时间点的持仓市值不超过 净值 × max_exposure（买入时按成交价算，允许之后价格波动）
+    signed = trades.assign(q=np.where(trades["action"] == "BUY", trades["qty"], -trades["qty"]))
+    holdings = signed.pivot_table(index="timestamp", columns="symbol", values="q", aggfunc="sum")
+    holdings = holdings.reindex(closes.index).fillna(0).cumsum().reindex(columns=closes.columns, fill_value=0)
+    exposure = (holdings * closes).sum(axis=1)
+    buy_times = pd.DatetimeIndex(trades.loc[trades["action"] == "BUY", "timestamp"].unique())
+    assert (exposure[buy_times] <= result["equity"][buy_times] * 0.5 * 1.01).all()
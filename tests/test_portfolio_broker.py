@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from broker.portfolio_broker import BpsSlippage, PerShareCommission, PortfolioBroker
+
+
+class _Order:
+    def __init__(self, symbol, side, qty, client_order_id=None):
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.client_order_id = client_order_id
+
+
+def test_buy_sell_updates_cash_cost_and_pnl():
+    broker = PortfolioBroker(10_000, ["AAA", "BBB"])
+    broker.buy("AAA", 100.0, qty=10)
+    broker.buy("AAA", 110.0, qty=10)
+    assert broker.get_entry_price("AAA") == pytest.approx(105.0)
+    assert broker.cash == pytest.approx(10_000 - 2100)
+
+    broker.sell("AAA", 120.0, qty=5)
+    assert broker.realized_pnl() == pytest.approx(5 * 15.0)
+    assert broker.get_entry_price("AAA") == pytest.approx(105.0)
+    broker.sell("AAA", 100.0)
+    assert not broker.has_position("AAA")
+    assert broker.realized_pnl() == pytest.approx(75.0 - 15 * 5.0)
+    assert broker.cash == pytest.approx(10_000 + broker.realized_pnl())
+
+
+def test_execute_no_short_and_no_overdraft():
+    broker = PortfolioBroker(1_000, ["AAA", "BBB"])
+    filled = broker.execute(broker.indices(["AAA", "BBB"]), [-5, 20], [10.0, 100.0])
+    # 没有持仓不能卖空；现金只够买 10 股
+    assert filled.tolist() == [0.0, 10.0]
+    assert broker.cash == pytest.approx(0.0)
+    with pytest.raises(ValueError):
+        broker.execute(broker.indices(["AAA", "AAA"]), [1, 1], [10.0, 10.0])
+
+
+def test_commission_slippage_and_volume_limit():
+    broker = PortfolioBroker(
+        100_000, ["AAA"], commission=PerShareCommission(0.01, minimum=1.0), slippage=BpsSlippage(10),
+        max_volume_pct=0.1,
+    )
+    filled = broker.execute(broker.indices(["AAA"]), [500], [50.0], volumes=[2_000])
+    assert filled.tolist() == [200.0]
+    assert broker.get_entry_price("AAA") == pytest.approx(50.05)
+    assert broker.total_commission == pytest.approx(2.0)
+    assert broker.realized_pnl() == pytest.approx(-2.0)
+
+
+def test_submit_order_matches_alpaca_interface():
+    broker = PortfolioBroker(10_000, ["AAA"], slippage=BpsSlippage(20))
+    broker.update_prices(broker.indices(["AAA"]), [100.0])
+
+    order = broker.submit_order(_Order("aaa", "buy", 5, client_order_id="c1"))
+    assert (order.status, order.filled_qty) == ("filled", 5.0)
+    assert order.filled_avg_price == pytest.approx(100.2)
+    assert broker.get_order_by_client_id("c1") is order
+    with pytest.raises(ValueError):
+        broker.submit_order(_Order("AAA", "buy", 1, client_order_id="c1"))
+
+    position, = broker.get_all_positions()
+    assert (position.symbol, position.qty) == ("AAA", 5.0)
+    account = broker.get_account()
+    assert float(account.equity) == pytest.approx(broker.cash + 5 * 100.0)
+    assert np.isclose(broker.mark_to_market(), float(account.equity))
+
+
+@pytest.mark.parametrize("price", [None, 0.0, float("nan")])
+def test_submit_order_rejects_unpriced_symbol(price):
+    broker = PortfolioBroker(10_000, ["AAA"])
+    if price is not None:
+        broker.update_prices(broker.indices(["AAA"]), [price])
+
+    order = broker.submit_order(_Order("AAA", "buy", 5, client_order_id="c1"))
+    assert (order.status, order.filled_qty, order.filled_avg_price) == ("rejected", 0.0, None)
+    assert broker.get_order_by_client_id("c1") is order
+    assert not broker.has_position("AAA")
+    assert broker.cash == pytest.approx(10_000)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_bars
+from data.ring_buffer import BarRing, utc_ns
+from risk.position_sizing import PositionSizer, size_positions
+
+
+def test_size_positions_caps_risk_and_room():
+    # 风险预算 2000 / 每股 2 = 1000 股，单个标的不超过 20% 净值 -> 200 股
+    assert size_positions([100.0], [2.0], equity=100_000).tolist() == [200]
+    # 按顺序占用 room：第一个截断到 15000 / 100 股，之后的分不到；止损距离无效的为 0
+    qty = size_positions([100.0, 50.0, 10.0], [2.0, 1.0, 0.0], equity=100_000, room=15_000)
+    assert qty.tolist() == [150, 0, 0]
+
+
+def test_size_positions_gives_rounding_leftover_to_later_symbols():
+    # 第一个截断到 150 股后还剩 30：50 元的买不起，10 元的还能买 3 股
+    qty = size_positions([100.0, 50.0, 10.0], [2.0, 1.0, 0.5], equity=100_000, room=15_030)
+    assert qty.tolist() == [150, 0, 3]
+    assert qty @ np.array([100.0, 50.0, 10.0]) <= 15_030
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_size_positions_matches_sequential_allocation(seed):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(5, 500, 40)
+    prices[rng.random(40) < 0.1] = np.nan
+    stops = prices * rng.uniform(0.01, 0.1, 40)
+    room = rng.uniform(10_000, 60_000)
+    qty = size_positions(prices, stops, equity=100_000, room=room)
+
+    # 逐个分配的参考实现
+    left = room
+    for i, p in enumerate(prices):
+        want = 0 if np.isnan(p) else min(np.floor(2_000 / stops[i]), np.floor(20_000 / p))
+        take = 0 if np.isnan(p) else min(want, np.floor(left / p))
+        assert qty[i] == take
+        left -= take * (0 if np.isnan(p) else p)
+
+
+def test_size_uses_fixed_stop_without_atr():
+    sizer = PositionSizer(max_risk_per_trade=0.01, stop_loss_pct=0.05, max_position_pct=1.0)
+    # 没有 ATR 时每股止损距离 = 5% × 价格
+    assert sizer.size(["AAA"], [100.0], equity=10_000) == {"AAA": 20}
+
+
+def test_size_respects_exposure_and_cash():
+    sizer = PositionSizer(max_exposure=0.5)
+    sizer.atr = {"AAA": 1.0, "BBB": 1.0}
+    # 风险预算都是 1000 股，单个上限 200 股；总敞口 50000 - 已有 40000 = 10000
+    assert sizer.size(["AAA", "BBB"], [100.0, 100.0], equity=100_000, exposure=40_000) == {"AAA": 100, "BBB": 0}
+    assert sizer.size(["AAA", "BBB"], [100.0, 100.0], equity=100_000, cash=2_500) == {"AAA": 25, "BBB": 0}
+    assert sizer.size(["AAA"], [100.0], equity=100_000, exposure=60_000) == {"AAA": 0}
+
+
+@pytest.mark.parametrize("method", ["atr", "std"])
+def test_sync_matches_batch_volatility(method):
+    bars = make_bars(n_symbols=1, n_bars=300, seed=7)
+    symbol = bars.index.get_level_values(0)[0]
+    expected = PositionSizer(method=method).volatility(bars).ffill().iloc[-1][symbol]
+
+    # 实盘路径：从环形缓冲的视图增量刷新，盘中价格之后再修正成收盘值，结果与整块计算一致
+    sizer = PositionSizer(method=method)
+    ring = BarRing(400)
+    times = utc_ns(bars.index.get_level_values(-1))
+    data = bars[["open", "high", "low", "close", "volume"]].to_numpy()
+    ring.extend(times[:200], data[:200])
+    sizer.sync(symbol, *ring.window())
+    for i in range(200, len(times)):
+        ring.append(times[i], data[i] * np.array([1, 1.02, 0.98, 1.01, 1]))
+        sizer.sync(symbol, *ring.window())
+        ring.set_last(data[i])
+        sizer.sync(symbol, *ring.window())
+    assert sizer.atr[symbol] == pytest.approx(expected, rel=1e-9)
+
+
+def test_sync_only_reads_new_bars_after_wraparound():
+    bars = make_bars(n_symbols=1, n_bars=500, seed=9)
+    symbol = bars.index.get_level_values(0)[0]
+    expected = PositionSizer().volatility(bars).ffill().iloc[-1][symbol]
+
+    # 缓冲只保留 50 根，ATR 的增量状态不受旧 K 线被覆盖的影响
+    sizer = PositionSizer()
+    ring = BarRing(50)
+    times = utc_ns(bars.index.get_level_values(-1))
+    data = bars[["open", "high", "low", "close", "volume"]].to_numpy()
+    for start in range(0, len(times), 20):
+        ring.extend(times[start:start + 20], data[start:start + 20])
+        sizer.sync(symbol, *ring.window())
+    assert sizer.atr[symbol] == pytest.approx(expected, rel=1e-9)
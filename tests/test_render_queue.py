@@ -0,0 +1,76 @@
+import os
+import queue
+
+import pytest
+
+from backtest.render_queue import RenderQueue
+from benchmarks.synthetic import make_bars
+
+
+class _LocalQueue(RenderQueue):
+    """不启动子进程：任务放进普通队列，只测去重逻辑"""
+
+    def _start_process(self):
+        self.jobs = queue.Queue(maxsize=self.max_pending)
+        self.process = _AliveProcess()
+
+
+class _AliveProcess:
+    def is_alive(self):
+        return True
+
+
+@pytest.fixture
+def bars():
+    return make_bars(n_symbols=1, n_bars=80, seed=4)
+
+
+def test_submit_only_when_bars_or_params_change(tmp_path, bars):
+    render = _LocalQueue(save_dir=str(tmp_path))
+    symbol = "S0000"
+    assert render.submit(symbol, bars)
+    assert not render.submit(symbol, bars)
+
+    # 最后一根的收盘价变化（盘中）不重画
+    changed = bars.copy()
+    changed.iloc[-1, changed.columns.get_loc("close")] *= 1.05
+    assert not render.submit(symbol, changed)
+
+    # 新 K 线或新参数才重画
+    assert render.submit(symbol, make_bars(n_symbols=1, n_bars=81, seed=4))
+    assert render.submit(symbol, bars, rsi_buy_thresh=25)
+    assert render.jobs.qsize() == 3
+
+
+def test_skip_when_same_chart_on_disk(tmp_path, bars):
+    first = _LocalQueue(save_dir=str(tmp_path))
+    first.submit("S0000", bars)
+    symbol, df, buy, sell, filepath, digest = first.jobs.get_nowait()
+    with open(filepath, "wb") as f:
+        f.write(b"png")
+    with open(filepath + ".md5", "w") as f:
+        f.write(digest)
+
+    # 重启后第一次提交：磁盘上已有相同数据生成的图
+    second = _LocalQueue(save_dir=str(tmp_path))
+    assert not second.submit("S0000", bars)
+    assert second.jobs is None
+
+
+def test_full_queue_drops_without_recording(tmp_path, bars):
+    render = _LocalQueue(save_dir=str(tmp_path), max_pending=1)
+    assert render.submit("S0000", bars)
+    assert not render.submit("S0000", bars, rsi_buy_thresh=25)
+    render.jobs.get_nowait()
+    # 丢弃的任务没有记下摘要，下一次还会提交
+    assert render.submit("S0000", bars, rsi_buy_thresh=25)
+
+
+def test_worker_process_renders_chart(tmp_path, bars):
+    pytest.importorskip("backtest.plot")
+    render = RenderQueue(save_dir=str(tmp_path))
+    assert render.submit("S0000", bars)
+    render.stop(timeout=60)
+    path = tmp_path / "S0000_b30_s70.png"
+    assert path.exists() and os.path.getsize(path) > 0
+    assert (tmp_path / "S0000_b30_s70.png.md5").exists()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from data.ring_buffer import BAR_FIELDS, BarRing
+
+
+def test_ring_buffer_wraps_and_keeps_latest():
+    ring = BarRing(5)
+    data = np.arange(40, dtype="float64").reshape(8, 5)
+    ring.extend(np.arange(3), data[:3])
+    for i in range(3, 8):
+        ring.append(i, data[i])
+    times, window = ring.window()
+    assert times.tolist() == [3, 4, 5, 6, 7]
+    np.testing.assert_array_equal(window.T, data[3:])
+    np.testing.assert_array_equal(ring.values(), data[3:])
+    np.testing.assert_array_equal(ring.column("close", 2), data[6:, 3])
+    assert ring.since(6) == 2
+    assert ring.last_ts == 7
+    # 视图直接指向缓冲，不复制
+    assert np.shares_memory(ring.column("close"), ring.data)
+    assert np.shares_memory(times, ring.ts)
+
+
+def test_memory_is_bounded_over_many_writes():
+    ring = BarRing(100)
+    nbytes = ring.nbytes
+    rng = np.random.default_rng(0)
+    data = rng.random((10_000, 5))
+    for start in range(0, 10_000, 37):
+        ring.extend(np.arange(start, min(start + 37, 10_000)), data[start:start + 37])
+    assert (len(ring), ring.nbytes) == (100, nbytes)
+    times, window = ring.window()
+    assert times.tolist() == list(range(9_900, 10_000))
+    np.testing.assert_array_equal(window.T, data[-100:])
+
+    # 一次写入超过 capacity 时只保留最后 capacity 根
+    ring.extend(np.arange(10_000, 10_250), data[:250])
+    np.testing.assert_array_equal(ring.values(), data[150:250])
+
+
+def test_set_last_and_merge_last():
+    ring = BarRing(3)
+    ring.extend([1, 2, 3, 4], np.ones((4, 5)))
+    ring.set_last(np.array([2.0, 5.0, 1.0, 4.0, 10.0]))
+    ring.merge_last(high=6.0, low=0.5, close=3.0, volume=2.0)
+    assert ring.last().tolist() == [2.0, 6.0, 0.5, 3.0, 12.0]
+    assert ring.times().tolist() == [2, 3, 4]
+    # 两份副本保持一致：绕回后最后一根的视图也是修正后的值
+    ring.append(5, np.zeros(5))
+    np.testing.assert_array_equal(ring.window(2)[1][:, 0], [2.0, 6.0, 0.5, 3.0, 12.0])
+
+
+def test_frame_copies_and_clear():
+    ring = BarRing(4)
+    ring.extend(np.array([1, 2], dtype=np.int64) * 86_400 * 10**9, np.arange(10.0).reshape(2, 5))
+    frame = ring.frame("AAA")
+    assert list(frame.columns) == BAR_FIELDS
+    assert frame.index.get_level_values(0).tolist() == ["AAA", "AAA"]
+    assert not np.shares_memory(frame.to_numpy(), ring.data)
+    version = ring.version
+    ring.clear()
+    assert (len(ring), ring.last_ts, ring.version) == (0, None, version + 1)
+    assert ring.window()[0].size == 0
+    with pytest.raises(ValueError):
+        BarRing(0)
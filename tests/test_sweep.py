@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from backtest.engine import run_rsi_backtest
+from backtest.sweep import RESULT_COLUMNS, run_sweep
+from benchmarks.synthetic import make_bars
+
+
+def test_sweep_matches_single_backtests():
+    bars = make_bars(n_symbols=3, n_bars=300, seed=8, volatility=0.03)
+    results = run_sweep(bars, buy_threshs=(30, 40), sell_threshs=(60, 70), windows=(10, 14), max_workers=2)
+
+    assert list(results.columns) == RESULT_COLUMNS
+    assert len(results) == 3 * 2 * 2 * 2
+    # 按总收益、胜率降序
+    assert (np.diff(results["total_profit"].to_numpy()) <= 1e-12).all()
+
+    # 子进程从共享内存读到的收盘价与逐个单独回测的结果一致
+    for row in results.itertuples(index=False):
+        df = bars.loc[[row.symbol], ["close"]].reset_index()
+        expected = run_rsi_backtest(df, row.rsi_buy_thresh, row.rsi_sell_thresh, rsi_window=row.window)
+        assert row.total_trades == expected["total_trades"]
+        assert row.total_profit == pytest.approx(expected["total_profit"])
+
+
+def test_sweep_empty_bars():
+    results = run_sweep(make_bars(n_symbols=1, n_bars=10).iloc[0:0])
+    assert results.empty
+    assert list(results.columns) == RESULT_COLUMNS
@@ -0,0 +1,67 @@
+import pytest
+
+from utils.trade_store import TradeStore
+
+
+def _trade(ts, action, symbol, price, qty=1):
+    return {"type": "trade", "ts": ts, "action": action, "symbol": symbol, "price": price, "qty": qty}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TradeStore(str(tmp_path / "trades.db"))
+    yield store
+    store.close()
+
+
+def test_realized_pnl_and_summary(store):
+    store.record_trades([
+        _trade("2024-03-01T10:00:00", "BUY", "aaa", 10.0, qty=10),
+        _trade("2024-03-01T11:00:00", "BUY", "AAA", 20.0, qty=10),
+        {"type": "pnl", "ts": "2024-03-01T11:30:00", "symbol": "AAA"},
+        _trade("2024-03-02T10:00:00", "SELL", "AAA", 18.0, qty=5),
+        _trade("2024-03-02T11:00:00", "BUY", "BBB", 5.0, qty=4),
+        _trade("2024-03-03T10:00:00", "SELL", "AAA", 14.0, qty=15),
+    ])
+
+    day2 = store.summary("2024-03-02", "2024-03-02")
+    assert day2["trade_count"] == 2
+    assert day2["realized_pnl"] == pytest.approx(5 * (18.0 - 15.0))
+    assert day2["win_rate"] == 1.0
+    # 区间结束时的敞口：AAA 剩 15 股 @ 15，BBB 4 股 @ 5
+    assert day2["exposure"] == pytest.approx(15 * 15.0 + 4 * 5.0)
+
+    total = store.summary("2024-03-01", "2024-03-03")
+    assert total["closed_trades"] == 2
+    assert total["realized_pnl"] == pytest.approx(15.0 - 15.0)
+    assert total["win_rate"] == 0.5
+    assert store.exposure("2024-03-03") == pytest.approx(4 * 5.0)
+    assert store.summary("2024-03-01", "2024-03-03", symbol="bbb")["trade_count"] == 1
+
+    days = [tuple(row) for row in store.daily_summary("2024-03-01", "2024-03-03")]
+    assert days == [("2024-03-01", 2, 0, 0, 0), ("2024-03-02", 2, 15.0, 1, 1), ("2024-03-03", 1, -15.0, 1, 0)]
+
+
+def test_trades_newest_first_with_limit(store):
+    store.record_trades([_trade(f"2024-03-01T10:0{i}:00", "BUY", "AAA", float(i)) for i in range(5)])
+    rows = store.trades("2024-03-01", "2024-03-01", limit=2)
+    assert [r["price"] for r in rows] == [4.0, 3.0]
+
+
+def test_positions_restored_from_latest_row(tmp_path):
+    path = str(tmp_path / "trades.db")
+    store = TradeStore(path)
+    store.record_trades([
+        _trade("2024-03-01T10:00:00", "BUY", "AAA", 10.0, qty=2),
+        _trade("2024-03-01T11:00:00", "BUY", "AAA", 16.0, qty=1),
+        _trade("2024-03-01T12:00:00", "BUY", "BBB", 3.0, qty=1),
+        _trade("2024-03-01T13:00:00", "SELL", "BBB", 4.0, qty=1),
+    ])
+    store.close()
+
+    # 重启后每个标的的持仓 / 成本取自它最新的一行，卖出盈亏接着按它计算
+    reopened = TradeStore(path)
+    assert reopened.positions == {"AAA": (3.0, 12.0), "BBB": (0.0, 0.0)}
+    reopened.record_trades([_trade("2024-03-02T10:00:00", "SELL", "AAA", 15.0, qty=3)])
+    assert reopened.summary("2024-03-02", "2024-03-02")["realized_pnl"] == pytest.approx(9.0)
+    reopened.close()
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from backtest.engine import rsi_signals, simulate, trade_stats
+from backtest.walk_forward import STAT_COLUMNS, evaluate_segments, make_folds, run_walk_forward, summarize
+from benchmarks.synthetic import make_bars
+from strategies.base_strategy import price_matrix
+from strategies.indicators import rsi_frame, sma_frame
+
+
+def test_make_folds_rolling_and_anchored():
+    assert make_folds(100, 50, 20) == [(0, 50, 50, 70), (20, 70, 70, 90)]
+    assert make_folds(100, 50, 20, step=30) == [(0, 50, 50, 70), (30, 80, 80, 100)]
+    assert make_folds(100, 50, 20, anchored=True) == [(0, 50, 50, 70), (0, 70, 70, 90)]
+    assert make_folds(60, 50, 20) == []
+
+
+def test_segments_match_direct_backtest(tmp_path):
+    bars = make_bars(n_symbols=3, n_bars=200, seed=5, volatility=0.04)
+    evals = evaluate_segments(bars, [(20, 120), (120, 200)], [(14, 35, 65)], max_workers=2, cache_dir=str(tmp_path))
+    assert len(evals) == 2 * 3
+
+    # 指标在整段历史上算好再切片，与在同一区间上直接回测一致
+    closes = price_matrix(bars)
+    sma, rsi = sma_frame(closes, 20), rsi_frame(closes, 14)
+    for row in evals.itertuples(index=False):
+        c = closes[row.symbol].to_numpy()[row.start:row.end]
+        entry, exit = rsi_signals(c, rsi[row.symbol].to_numpy()[row.start:row.end],
+                                  sma[row.symbol].to_numpy()[row.start:row.end], 35, 65)
+        _, buys, sells = simulate(entry, exit)
+        expected = trade_stats(c[buys], c[sells])
+        assert [getattr(row, k) for k in STAT_COLUMNS] == pytest.approx([expected[k] for k in STAT_COLUMNS])
+
+
+def test_cache_reused_for_repeated_and_extended_runs(tmp_path, capsys):
+    bars = make_bars(n_symbols=2, n_bars=180, seed=3, volatility=0.04)
+    kwargs = dict(buy_threshs=(30, 40), sell_threshs=(60,), train_size=60, test_size=30, max_workers=2,
+                  cache_dir=str(tmp_path))
+    first = run_walk_forward(bars, **kwargs)
+    assert "滚动回测" in capsys.readouterr().out
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    # 同样的数据和参数：全部命中缓存，不再启动回测
+    second = run_walk_forward(bars, **kwargs)
+    assert "滚动回测" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(first, second)
+
+    # 加一个参数：只算缺的那部分
+    run_walk_forward(bars, **{**kwargs, "buy_threshs": (30, 40, 45)})
+    out = capsys.readouterr().out
+    n_segments = len({(a, b) for a, b, _, _ in make_folds(180, 60, 30)} | {(c, d) for _, _, c, d in make_folds(180, 60, 30)})
+    assert f"{n_segments * 2} 次回测" in out
+
+
+def test_summarize_weights_win_rate_by_trades():
+    results = pd.DataFrame({
+        "symbol": ["AAA", "AAA", "BBB"],
+        "fold": [0, 1, 0],
+        "total_trades": [1, 3, 0],
+        "win_rate": [1.0, 1 / 3, 0.0],
+        "total_profit": [5.0, -2.0, 0.0],
+    })
+    summary = summarize(results)
+    assert summary.index.tolist() == ["AAA", "BBB"]
+    assert summary.loc["AAA", "oos_win_rate"] == pytest.approx(0.5)
+    assert summary.loc["AAA", "oos_profit"] == pytest.approx(3.0)
+    assert summary.loc["AAA", "worst_fold_profit"] == pytest.approx(-2.0)
+    assert summary.loc["BBB", "oos_win_rate"] == 0.0
+    assert summary["folds"].tolist() == [2, 1]
@@ -1,13 +1,156 @@
+import atexit
+import json
 import os
 import datetime
+import queue
+import threading
 
-def log_trade(action, symbol, price, reason="", broker=None, log_dir="logs", keep_days=15):
+
+class LogWriter:
+    """
+    后台日志线程：记录先放进队列，攒够一批或到时间后一次性写入。
+    每条记录同时写成人能读的 {date}.txt 和结构化的 {date}.jsonl；
+    旧日志清理每天只跑一次。
+    """
+
+    def __init__(self, log_dir="logs", keep_days=15, flush_interval=1.0, batch_size=200):
+        self.log_dir = log_dir
+        self.keep_days = keep_days
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self.thread.start()
+        return self
+
+    def put(self, date_str, text, record):
+        self.queue.put((date_str, text, record))
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = []
+            stopping = item is None
+            if not stopping:
+                batch.append(item)
+            # 在 flush_interval 内尽量多攒一些记录
+            deadline = datetime.datetime.now() + datetime.timedelta(seconds=self.flush_interval)
+            while not stopping and len(batch) < self.batch_size:
+                timeout = (deadline - datetime.datetime.now()).total_seconds()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            # 停止时把队列里剩下的也写掉
+            while stopping:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            if batch:
+                try:
+                    self.flush(batch)
+                except Exception as e:
+                    print(f"⚠️ 日志写入失败：{e}")
+            if stopping:
+                break
+
+    def flush(self, batch):
+        _write_batch(self.log_dir, batch)
+        clean_old_logs_daily(self.log_dir, self.keep_days)
+
+
+_writer = None
+_sinks = []
+
+
+def add_log_sink(sink):
+    """注册额外的记录接收方（如 TradeStore.record_trades），每批结构化记录都会传给它"""
+    _sinks.append(sink)
+
+
+def remove_log_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def start_async_logging(log_dir="logs", keep_days=15, flush_interval=1.0):
+    """开启后台日志线程，之后 log_trade / log_pnl 不再在调用方线程里做文件 I/O"""
+    global _writer
+    if _writer is None:
+        _writer = LogWriter(log_dir, keep_days, flush_interval).start()
+        atexit.register(stop_async_logging)
+    return _writer
+
+
+def flush_logs():
+    """等后台线程把队列里的记录全部写完（生成报告前调用）"""
+    if _writer is not None:
+        _writer.stop()
+        _writer.start()
+
+
+def stop_async_logging():
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def _write_batch(log_dir, batch):
+    # 按日期分组，每个文件每批只打开一次
+    os.makedirs(log_dir, exist_ok=True)
+    by_date = {}
+    for date_str, text, record in batch:
+        lines = by_date.setdefault(date_str, ([], []))
+        lines[0].append(text)
+        lines[1].append(json.dumps(record, ensure_ascii=False) + "\n")
+    for date_str, (texts, records) in by_date.items():
+        with open(os.path.join(log_dir, f"{date_str}.txt"), "a", encoding="utf-8") as f:
+            f.write("".join(texts))
+        with open(os.path.join(log_dir, f"{date_str}.jsonl"), "a", encoding="utf-8") as f:
+            f.write("".join(records))
+    for sink in _sinks:
+        try:
+            sink([record for _, _, record in batch])
+        except Exception as e:
+            print(f"⚠️ 日志接收方处理失败：{e}")
+
+
+def _emit(log_dir, date_str, text, record, keep_days=15):
+    if _writer is not None and _writer.log_dir == log_dir:
+        _writer.put(date_str, text, record)
+    else:
+        _write_batch(log_dir, [(date_str, text, record)])
+        clean_old_logs_daily(log_dir, keep_days)
+
+
+def log_trade(action, symbol, price, reason="", broker=None, log_dir="logs", keep_days=15, qty=1):
     now = datetime.datetime.now()
     timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
     date_str = now.strftime("%Y-%m-%d")
 
     # 构建账户信息（可选）
     equity_str = ""
+    cash = equity = None
     if broker:
         try:
             account = broker.get_account()
@@ -20,21 +163,17 @@ def log_trade(action, symbol, price, reason="", broker=None, log_dir="logs", kee
 
     # 日志内容
     log_entry = f"[{timestamp}] {action} {symbol} @ {price:.2f} - {reason} {equity_str}\n"
+    record = {
+        "type": "trade", "ts": now.isoformat(timespec="seconds"), "action": action, "symbol": symbol,
+        "price": float(price), "qty": qty, "reason": reason, "cash": cash, "equity": equity,
+    }
 
-    # 创建 logs 目录
-    os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, f"{date_str}.txt")
-
-    # 写入日志文件
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+    # 写入日志文件（开启后台线程时只是入队）
+    _emit(log_dir, date_str, log_entry, record, keep_days)
 
     # 同步输出到控制台
     print("📘 日志记录:", log_entry.strip())
 
-    # 清理旧日志
-    clean_old_logs(log_dir, keep_days)
-
 def log_pnl(entry_price, current_price, symbol, log_dir="logs"):
     now = datetime.datetime.now()
     timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
@@ -44,24 +183,38 @@ def log_pnl(entry_price, current_price, symbol, log_dir="logs"):
     direction = "浮盈" if pnl >= 0 else "浮亏"
     message = f"📊 持仓中，入场价: {entry_price:.2f}, 当前价: {current_price:.2f}, {direction}: {pnl:.2%}"
     log_entry = f"[{timestamp}] {message}\n"
+    record = {
+        "type": "pnl", "ts": now.isoformat(timespec="seconds"), "symbol": symbol,
+        "entry_price": float(entry_price), "price": float(current_price), "pnl_pct": pnl * 100,
+    }
 
-    # 确保目录存在
-    os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, f"{date_str}.txt")
-
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+    _emit(log_dir, date_str, log_entry, record)
 
     print(log_entry.strip())
     print(f"✅ 已调用 log_pnl()，entry: {entry_price}, price: {current_price}")
 
+_last_clean = {}
+
+
+def clean_old_logs_daily(log_dir="logs", keep_days=15):
+    """同一个目录每天最多清理一次"""
+    today = datetime.date.today()
+    if _last_clean.get(log_dir) != today:
+        _last_clean[log_dir] = today
+        clean_old_logs(log_dir, keep_days)
+
+
 def clean_old_logs(log_dir="logs", keep_days=15):
     now = datetime.datetime.now()
+    if not os.path.isdir(log_dir):
+        return
     for filename in os.listdir(log_dir):
         file_path = os.path.join(log_dir, filename)
         if os.path.isfile(file_path):
             try:
-                file_date_str = filename.replace(".txt", "")
+                file_date_str, ext = os.path.splitext(filename)
+                if ext not in (".txt", ".jsonl"):
+                    continue
                 file_date = datetime.datetime.strptime(file_date_str, "%Y-%m-%d")
                 age = (now - file_date).days
                 if age > keep_days:
@@ -0,0 +1,227 @@
+import cProfile
+import datetime
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class Metrics:
+    """
+    轻量级耗时统计：
+    - span(name)：记录一段代码的耗时（毫秒），每个阶段保留最近 max_samples 个样本，汇总时算 p50 / p95 / p99；
+    - count(name)：计数器（如 API 调用次数），同时累计到当前轮次；
+    - cycle()：包住 main() 一轮，结束时记录整轮耗时和本轮各类 API 调用次数。
+    多线程安全（evaluate_symbol 在线程池里运行）。
+    """
+
+    def __init__(self, max_samples=5000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counters = {}
+        self.cycle_counters = {}
+        self.last_cycle = {}
+        self.cycles = 0
+        self.started = time.time()
+        self._last_report = time.monotonic()
+
+    # ---------- 记录 ----------
+    def observe(self, name, ms):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.max_samples)
+            samples.append(ms)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000.0)
+
+    def timed(self, name):
+        """装饰器版本的 span"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            self.cycle_counters[name] = self.cycle_counters.get(name, 0) + n
+
+    @contextmanager
+    def cycle(self, name="cycle"):
+        with self.lock:
+            self.cycle_counters = {}
+        try:
+            with self.span(name):
+                yield
+        finally:
+            with self.lock:
+                self.last_cycle = dict(self.cycle_counters)
+                self.cycles += 1
+            self.observe("api_calls_per_cycle", sum(
+                v for k, v in self.last_cycle.items() if k.startswith("api.")
+            ))
+
+    # ---------- 汇总 ----------
+    def summary(self):
+        with self.lock:
+            samples = {name: np.fromiter(values, dtype="float64") for name, values in self.samples.items()}
+            counters = dict(self.counters)
+            last_cycle = dict(self.last_cycle)
+            cycles = self.cycles
+        stages = {}
+        for name, values in sorted(samples.items()):
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[name] = {
+                "count": int(len(values)),
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(values.max()),
+            }
+        return {
+            "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+            "uptime_s": round(time.time() - self.started, 1),
+            "cycles": cycles,
+            "stages_ms": stages,
+            "counters": counters,
+            "last_cycle": last_cycle,
+        }
+
+    def format_summary(self, summary=None):
+        summary = summary or self.summary()
+        lines = [f"⏱️ 耗时统计（{summary['cycles']} 轮，单位 ms）"]
+        lines.append(f"{'阶段':<34}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+        for name, s in summary["stages_ms"].items():
+            lines.append(f"{name:<36}{s['count']:>8}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+        if summary["last_cycle"]:
+            calls = "，".join(f"{k} {v}" for k, v in sorted(summary["last_cycle"].items()))
+            lines.append(f"📡 上一轮调用次数：{calls}")
+        return "\n".join(lines)
+
+    def write_summary(self, path="logs/metrics.json"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def maybe_report(self, interval=300, path="logs/metrics.json"):
+        """距离上次汇总超过 interval 秒时打印并写入 path"""
+        if time.monotonic() - self._last_report < interval:
+            return False
+        self._last_report = time.monotonic()
+        summary = self.summary()
+        print(self.format_summary(summary))
+        self.write_summary(path)
+        return True
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counters.clear()
+            self.cycle_counters = {}
+            self.last_cycle = {}
+            self.cycles = 0
+
+    # ---------- 本地查询接口 ----------
+    def serve(self, port=9100, host="127.0.0.1"):
+        """在后台线程开一个 HTTP 接口：GET /metrics 返回 JSON 汇总，GET /metrics.txt 返回表格"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.txt"):
+                    body = metrics.format_summary().encode("utf-8")
+                    content_type = "text/plain; charset=utf-8"
+                elif self.path.startswith("/metrics"):
+                    body = json.dumps(metrics.summary(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📊 耗时统计接口：http://{host}:{server.server_port}/metrics")
+        return server
+
+
+class InstrumentedClient:
+    """
+    包一层 Alpaca 客户端：每次方法调用计数（api.<prefix>.<方法名>）并记录耗时，
+    其他属性原样转发，调用方不需要改动。
+    """
+
+    def __init__(self, client, prefix, registry=None):
+        self._client = client
+        self._prefix = prefix
+        self._metrics = registry or metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        key = f"api.{self._prefix}.{name}"
+        metrics = self._metrics
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            metrics.count(key)
+            with metrics.span(key):
+                return attr(*args, **kwargs)
+        return call
+
+
+@contextmanager
+def profile_cycle(enabled=False, out_dir="logs/profile", top=15):
+    """开启时用 cProfile 记录这一轮，保存 .prof 文件并打印累计耗时最高的函数"""
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, datetime.datetime.now().strftime("cycle-%Y%m%d-%H%M%S.prof"))
+        profiler.dump_stats(path)
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(top)
+        print(f"🔬 本轮 profile 已保存：{path}")
+        print(buf.getvalue())
+
+
+# 全局实例，各模块直接 from utils.metrics import metrics 使用
+metrics = Metrics()
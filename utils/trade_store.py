@@ -0,0 +1,154 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id           INTEGER PRIMARY KEY,
+    ts           TEXT NOT NULL,
+    date         TEXT NOT NULL,
+    symbol       TEXT NOT NULL,
+    action       TEXT NOT NULL,
+    qty          REAL NOT NULL,
+    price        REAL NOT NULL,
+    realized_pnl REAL,
+    position_qty REAL NOT NULL,
+    avg_cost     REAL NOT NULL,
+    reason       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_date ON trades(date);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_ts ON trades(symbol, ts);
+"""
+
+
+class TradeStore:
+    """
+    交易历史库（SQLite），按日期和标的建索引。
+    写入时按平均成本算好卖出的已实现盈亏和成交后的持仓，
+    查询任意区间的盈亏、交易次数、胜率、敞口都只走索引，不再扫文本日志。
+    """
+
+    def __init__(self, db_path="logs/trades.db"):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+        self.positions = self._load_positions()
+
+    def _load_positions(self):
+        # SQLite 中 MAX() 聚合时其余列取自最大值所在行，即每个标的最新一笔成交后的持仓
+        rows = self.conn.execute(
+            "SELECT symbol, position_qty, avg_cost, MAX(id) FROM trades GROUP BY symbol"
+        ).fetchall()
+        return {r["symbol"]: (r["position_qty"], r["avg_cost"]) for r in rows}
+
+    # ---------- 写 ----------
+    def record_trades(self, records):
+        """写入一批日志记录（utils.logger 的结构化记录），只处理 BUY / SELL"""
+        rows = []
+        for r in records:
+            if r.get("type") != "trade" or r.get("action") not in ("BUY", "SELL"):
+                continue
+            symbol = r["symbol"].upper()
+            qty = float(r.get("qty") or 1)
+            price = float(r["price"])
+            held, avg = self.positions.get(symbol, (0.0, 0.0))
+            realized = None
+            if r["action"] == "BUY":
+                new_qty = held + qty
+                avg = (held * avg + qty * price) / new_qty
+            else:
+                closed = min(qty, held) if held > 0 else qty
+                realized = (price - avg) * closed if held > 0 else None
+                new_qty = max(held - qty, 0.0)
+                if new_qty == 0:
+                    avg = 0.0
+            self.positions[symbol] = (new_qty, avg)
+            rows.append((r["ts"], r["ts"][:10], symbol, r["action"], qty, price, realized, new_qty, avg, r.get("reason")))
+
+        if rows:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO trades (ts, date, symbol, action, qty, price, realized_pnl, position_qty, avg_cost, reason) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    # ---------- 查询 ----------
+    def trades(self, start_date, end_date, symbol=None, limit=None):
+        """区间内的成交（按时间倒序）"""
+        sql = "SELECT * FROM trades WHERE date BETWEEN ? AND ?"
+        params = [_date_str(start_date), _date_str(end_date)]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol.upper())
+        sql += " ORDER BY ts DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def summary(self, start_date, end_date, symbol=None):
+        """区间汇总：交易次数、已实现盈亏、胜率（按平仓笔数算）、区间结束时的持仓敞口"""
+        sql = (
+            "SELECT COUNT(*) AS trade_count, "
+            "COALESCE(SUM(realized_pnl), 0) AS realized_pnl, "
+            "COUNT(realized_pnl) AS closed_trades, "
+            "COALESCE(SUM(realized_pnl > 0), 0) AS win_trades "
+            "FROM trades WHERE date BETWEEN ? AND ?"
+        )
+        params = [_date_str(start_date), _date_str(end_date)]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol.upper())
+        with self.lock:
+            row = self.conn.execute(sql, params).fetchone()
+        closed = row["closed_trades"]
+        return {
+            "trade_count": row["trade_count"],
+            "realized_pnl": row["realized_pnl"],
+            "closed_trades": closed,
+            "win_rate": row["win_trades"] / closed if closed else 0,
+            "exposure": self.exposure(end_date, symbol),
+        }
+
+    def daily_summary(self, start_date, end_date):
+        """按天汇总，返回 [(date, 交易次数, 已实现盈亏, 平仓次数, 盈利次数), ...]"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, COUNT(*), COALESCE(SUM(realized_pnl), 0), COUNT(realized_pnl), "
+                "COALESCE(SUM(realized_pnl > 0), 0) FROM trades WHERE date BETWEEN ? AND ? "
+                "GROUP BY date ORDER BY date",
+                [_date_str(start_date), _date_str(end_date)],
+            ).fetchall()
+
+    def exposure(self, as_of_date, symbol=None):
+        """as_of_date 收盘时各标的按成本计的持仓金额之和"""
+        sql = (
+            "SELECT symbol, position_qty * avg_cost AS cost, MAX(id) FROM trades "
+            "WHERE date <= ?"
+        )
+        params = [_date_str(as_of_date)]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol.upper())
+        sql += " GROUP BY symbol"
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return float(sum(r["cost"] for r in rows))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def _date_str(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)